@@ -3,9 +3,37 @@ import socket
 import time
 import argparse
 import threading
+import asyncio
 import csv
+import json
+import math
+import struct
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 
+try:
+    import resource
+except ImportError:
+    resource = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Header paket QoS open-loop: nomor urut + waktu kirim (perf_counter_ns)
+QOS_HEADER = struct.Struct("!QQ")
+
+# Log per paket: CSV atau biner (.bin) dengan record seq, size, send_ns, recv_ns (-1 = hilang)
+PACKET_LOG_MAGIC = b"QOSLOG1\n"
+PACKET_LOG_RECORD = struct.Struct("<IIqq")
+PACKET_LOG_COLUMNS = ["seq", "size", "send_ns", "recv_ns", "rtt_ms"]
+PACKET_LOG_BUFFER = 1 << 20
+
+# Analisis trace: persentil RTT dan ukuran blok filter jitter RFC 3550
+ANALYSIS_PERCENTILES = (50, 90, 99, 99.9)
+JITTER_BLOCK = 256
+
 # UTILITIES
 
 def format_timestamp(epoch_time: float) -> str:
@@ -14,13 +42,139 @@ def format_timestamp(epoch_time: float) -> str:
 
 
 def export_csv(file_path, data_rows, column_header):
-    """Menyimpan hasil pengukuran QoS ke file CSV."""
-    with open(file_path, "w", newline="") as csv_file:
-        csv_writer = csv.writer(csv_file)
-        csv_writer.writerow(column_header)
-        csv_writer.writerows(data_rows)
+    """Menyimpan hasil pengukuran ke file CSV (atau JSON jika berakhiran .json)."""
+    if file_path.endswith(".json"):
+        with open(file_path, "w") as json_file:
+            json.dump([dict(zip(column_header, row)) for row in data_rows], json_file, indent=2)
+    else:
+        with open(file_path, "w", newline="") as csv_file:
+            csv_writer = csv.writer(csv_file)
+            csv_writer.writerow(column_header)
+            csv_writer.writerows(data_rows)
     print(f"[+] File QoS berhasil disimpan: {file_path}")
 
+
+def positive_float(text):
+    """Tipe argparse: bilangan lebih besar dari 0."""
+    try:
+        value = float(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{text}' bukan angka")
+    if not (math.isfinite(value) and value > 0):
+        raise argparse.ArgumentTypeError(f"nilai harus lebih besar dari 0, bukan {text}")
+    return value
+
+
+def positive_int(text):
+    """Tipe argparse: bilangan bulat lebih besar dari 0."""
+    try:
+        value = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{text}' bukan bilangan bulat")
+    if value <= 0:
+        raise argparse.ArgumentTypeError(f"nilai harus lebih besar dari 0, bukan {text}")
+    return value
+
+
+def derived_path(file_path, suffix, extension=None):
+    """Nama file turunan, mis. hasil.csv -> hasil_summary.csv."""
+    base_name, dot, original_extension = file_path.rpartition(".")
+    if not dot or "/" in original_extension:
+        base_name, original_extension = file_path, "csv"
+    return f"{base_name}{suffix}.{extension or original_extension}"
+
+
+def percentile(sorted_values, percent):
+    """Persentil (nearest-rank) dari list yang sudah terurut."""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(percent / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+class RunningStats:
+    """Statistik RTT inkremental dengan memori konstan (Welford + jitter berurutan)."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.minimum = None
+        self.maximum = None
+        self.jitter_total = 0.0
+        self.previous = None
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.minimum = value if self.minimum is None else min(self.minimum, value)
+        self.maximum = value if self.maximum is None else max(self.maximum, value)
+        if self.previous is not None:
+            self.jitter_total += abs(value - self.previous)
+        self.previous = value
+
+    @property
+    def stddev(self):
+        return (self.m2 / (self.count - 1)) ** 0.5 if self.count >= 2 else 0.0
+
+    @property
+    def jitter(self):
+        """Rata-rata selisih absolut RTT berurutan."""
+        return self.jitter_total / (self.count - 1) if self.count >= 2 else 0.0
+
+
+class PacketLogWriter:
+    """
+    Menulis log per paket langsung ke disk selama pengujian (buffered).
+    Format CSV, atau biner ringkas jika nama file berakhiran .bin.
+    Waktu disimpan dalam perf_counter_ns; anchor jam dinding ditulis ke file _meta.json.
+    """
+
+    def __init__(self, file_path, buffer_size=PACKET_LOG_BUFFER):
+        self.file_path = file_path
+        self.binary = file_path.endswith(".bin")
+        self.records = 0
+        self.anchor_wall_ns = time.time_ns()
+        self.anchor_perf_ns = time.perf_counter_ns()
+
+        if self.binary:
+            self.handle = open(file_path, "wb", buffering=buffer_size)
+            self.handle.write(PACKET_LOG_MAGIC)
+        else:
+            self.handle = open(file_path, "w", newline="", buffering=buffer_size)
+            self.csv_writer = csv.writer(self.handle)
+            self.csv_writer.writerow(PACKET_LOG_COLUMNS)
+
+    def write(self, seq_num, size, send_ns, recv_ns=-1):
+        self.records += 1
+        if self.binary:
+            self.handle.write(PACKET_LOG_RECORD.pack(seq_num, size, send_ns, recv_ns))
+        elif recv_ns >= 0:
+            self.csv_writer.writerow([seq_num, size, send_ns, recv_ns, f"{(recv_ns - send_ns) / 1e6:.6f}"])
+        else:
+            self.csv_writer.writerow([seq_num, size, send_ns, recv_ns, ""])
+
+    def close(self):
+        self.handle.close()
+        print(f"[+] Log per paket disimpan: {self.file_path} ({self.records} record)")
+
+        # Waktu wall = wall_ns + (send_ns - perf_ns); anchor akhir untuk mendeteksi drift jam
+        export_csv(
+            derived_path(self.file_path, "_meta", "json"),
+            [[
+                "binary" if self.binary else "csv",
+                self.records,
+                self.anchor_wall_ns,
+                self.anchor_perf_ns,
+                time.time_ns(),
+                time.perf_counter_ns(),
+                format_timestamp(self.anchor_wall_ns / 1e9)
+            ]],
+            ["format", "records", "start_wall_ns", "start_perf_ns", "end_wall_ns", "end_perf_ns", "start_time"]
+        )
+
+
 # TCP/HTTP MODE
 
 def send_http_request(target_ip, target_port, resource_path="/"):
@@ -57,6 +211,149 @@ def send_http_request(target_ip, target_port, resource_path="/"):
     except Exception as err:
         print(f"[ERROR] HTTP gagal: {err}")
 
+def timed_http_request(target_ip, target_port, resource_path="/", timeout=5.0):
+    """
+    Mengirim satu HTTP GET dan mengukur waktu connect, TTFB dan total.
+    Mengembalikan dict hasil; "error" berisi kategori error atau None.
+    """
+    result = {"connect": None, "ttfb": None, "total": None, "bytes": 0, "status": None, "error": None}
+    time_start = time.perf_counter()
+    tcp_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    tcp_socket.settimeout(timeout)
+    stage = "connect"
+
+    try:
+        tcp_socket.connect((target_ip, target_port))
+        result["connect"] = time.perf_counter() - time_start
+
+        stage = "send"
+        http_message = (
+            f"GET {resource_path} HTTP/1.1\r\n"
+            f"Host: {target_ip}\r\n"
+            f"Connection: close\r\n\r\n"
+        )
+        tcp_socket.sendall(http_message.encode())
+
+        stage = "recv"
+        first_buffer = tcp_socket.recv(65536)
+        if not first_buffer:
+            result["error"] = "recv:empty_response"
+            return result
+        result["ttfb"] = time.perf_counter() - time_start
+        received_bytes = len(first_buffer)
+
+        while True:
+            buffer = tcp_socket.recv(65536)
+            if not buffer:
+                break
+            received_bytes += len(buffer)
+        result["total"] = time.perf_counter() - time_start
+        result["bytes"] = received_bytes
+
+        # Status code dari baris pertama respons
+        status_line = first_buffer.split(b"\r\n", 1)[0].split()
+        if len(status_line) >= 2 and status_line[1].isdigit():
+            result["status"] = int(status_line[1])
+            if result["status"] >= 400:
+                result["error"] = f"http:{result['status']}"
+        else:
+            result["error"] = "http:invalid_status"
+
+    except socket.timeout:
+        result["error"] = f"{stage}:timeout"
+    except OSError as err:
+        result["error"] = f"{stage}:{type(err).__name__}"
+    finally:
+        tcp_socket.close()
+
+    return result
+
+
+async def send_http_request_async(target_ip, target_port, resource_path="/"):
+    """
+    Mengirim HTTP GET request ke server/proxy (engine asyncio).
+    """
+    print(f"\n[HTTP] Mengakses {target_ip}:{target_port}{resource_path}")
+
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(target_ip, target_port), 5.0)
+
+        http_message = (
+            f"GET {resource_path} HTTP/1.1\r\n"
+            f"Host: {target_ip}\r\n"
+            f"Connection: close\r\n\r\n"
+        )
+        writer.write(http_message.encode())
+        await writer.drain()
+
+        response_bytes = await asyncio.wait_for(reader.read(), 5.0)
+        writer.close()
+
+        print(f"[HTTP] Total data diterima: {len(response_bytes)} bytes")
+        print("[HTTP] Preview data:")
+        print(response_bytes[:300].decode(errors="replace"))
+
+    except Exception as err:
+        print(f"[ERROR] HTTP gagal: {err}")
+
+
+async def timed_http_request_async(target_ip, target_port, resource_path="/", timeout=5.0):
+    """
+    Versi asyncio dari timed_http_request (hasil dengan format yang sama).
+    """
+    result = {"connect": None, "ttfb": None, "total": None, "bytes": 0, "status": None, "error": None}
+    time_start = time.perf_counter()
+    writer = None
+    stage = "connect"
+
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(target_ip, target_port), timeout)
+        result["connect"] = time.perf_counter() - time_start
+
+        stage = "send"
+        http_message = (
+            f"GET {resource_path} HTTP/1.1\r\n"
+            f"Host: {target_ip}\r\n"
+            f"Connection: close\r\n\r\n"
+        )
+        writer.write(http_message.encode())
+        await asyncio.wait_for(writer.drain(), timeout)
+
+        stage = "recv"
+        first_buffer = await asyncio.wait_for(reader.read(65536), timeout)
+        if not first_buffer:
+            result["error"] = "recv:empty_response"
+            return result
+        result["ttfb"] = time.perf_counter() - time_start
+        received_bytes = len(first_buffer)
+
+        while True:
+            buffer = await asyncio.wait_for(reader.read(65536), timeout)
+            if not buffer:
+                break
+            received_bytes += len(buffer)
+        result["total"] = time.perf_counter() - time_start
+        result["bytes"] = received_bytes
+
+        # Status code dari baris pertama respons
+        status_line = first_buffer.split(b"\r\n", 1)[0].split()
+        if len(status_line) >= 2 and status_line[1].isdigit():
+            result["status"] = int(status_line[1])
+            if result["status"] >= 400:
+                result["error"] = f"http:{result['status']}"
+        else:
+            result["error"] = "http:invalid_status"
+
+    except asyncio.TimeoutError:
+        result["error"] = f"{stage}:timeout"
+    except OSError as err:
+        result["error"] = f"{stage}:{type(err).__name__}"
+    finally:
+        if writer is not None:
+            writer.close()
+
+    return result
+
 # UDP/QOS MODE
 
 def udp_qos_test(
@@ -80,65 +377,48 @@ def udp_qos_test(
     udp_socket.settimeout(2.0)
 
     data_payload = b"x" * data_size
-    rtt_list = []
+    rtt_stats = RunningStats()
     received_packets = 0
-    csv_records = []
+    packet_log = PacketLogWriter(csv_file) if csv_file else None
 
-    test_start = time.time()
+    test_start = time.perf_counter_ns()
 
     for seq_num in range(total_packets):
-        time_sent = time.time()
+        time_sent = time.perf_counter_ns()
         packet_data = f"{seq_num}".encode() + data_payload
 
         try:
             udp_socket.sendto(packet_data, (target_ip, target_port))
             response, _ = udp_socket.recvfrom(65535)
-            time_received = time.time()
+            time_received = time.perf_counter_ns()
 
-            rtt_value = time_received - time_sent
-            rtt_list.append(rtt_value)
+            rtt_value = (time_received - time_sent) / 1e9
+            rtt_stats.add(rtt_value)
             received_packets += 1
 
             print(f"[#{seq_num}] RTT = {rtt_value*1000:.3f} ms")
 
-            csv_records.append([
-                seq_num,
-                data_size,
-                format_timestamp(time_sent),
-                format_timestamp(time_received),
-                rtt_value
-            ])
+            if packet_log:
+                packet_log.write(seq_num, data_size, time_sent, time_received)
 
         except (socket.timeout, ConnectionResetError):
             print(f"[#{seq_num}] Timeout / packet hilang")
-            csv_records.append([
-                seq_num,
-                data_size,
-                format_timestamp(time_sent),
-                "TIMEOUT",
-                "LOSS"
-            ])
+            if packet_log:
+                packet_log.write(seq_num, data_size, time_sent)
             time.sleep(delay_interval)
             continue
 
 
-    test_end = time.time()
-    test_duration = test_end - test_start
+    test_end = time.perf_counter_ns()
+    test_duration = (test_end - test_start) / 1e9
 
     loss_percentage = (total_packets - received_packets) / total_packets * 100
 
-    if len(rtt_list) >= 2:
-        jitter_samples = [
-            abs(rtt_list[i] - rtt_list[i - 1])
-            for i in range(1, len(rtt_list))
-        ]
-        avg_jitter = sum(jitter_samples) / len(jitter_samples)
-    else:
-        avg_jitter = 0.0
+    avg_jitter = rtt_stats.jitter
 
     bit_throughput = (received_packets * data_size * 8) / test_duration
 
-    avg_latency = (sum(rtt_list) / len(rtt_list)) if rtt_list else 0.0
+    avg_latency = rtt_stats.mean
 
     qos_summary = [[
         bit_throughput / 1000,      # Kbps
@@ -152,14 +432,18 @@ def udp_qos_test(
     print(f"Jumlah paket dikirim     : {total_packets}")
     print(f"Paket diterima           : {received_packets}")
     print(f"Packet Loss              : {loss_percentage:.2f}%")
-    print(f"Latency rata-rata        : {(sum(rtt_list)/len(rtt_list))*1000 if rtt_list else 0:.3f} ms")
+    print(f"Latency rata-rata        : {avg_latency*1000:.3f} ms")
+    if rtt_stats.count:
+        print(f"Latency min / max / sd   : {rtt_stats.minimum*1000:.3f} / {rtt_stats.maximum*1000:.3f}"
+              f" / {rtt_stats.stddev*1000:.3f} ms")
     print(f"Jitter                   : {avg_jitter*1000:.3f} ms")
     print(f"Throughput               : {bit_throughput/1000:.3f} Kbps")
 
     if csv_file:
+        packet_log.close()
 
         # CSV ringkasan QoS
-        summary_file = csv_file.replace(".csv", "_summary.csv")
+        summary_file = derived_path(csv_file, "_summary", "csv")
         export_csv(
             summary_file,
             qos_summary,
@@ -169,25 +453,698 @@ def udp_qos_test(
 
     udp_socket.close()
 
+def udp_qos_open_loop(
+    target_ip,
+    target_port,
+    data_size,
+    total_packets,
+    packet_rate,
+    csv_file=None,
+    drain_timeout=2.0
+):
+    """
+    Pengujian QoS UDP open-loop:
+    - thread pengirim mengirim paket sesuai target rate tanpa menunggu balasan
+    - thread penerima mencocokkan balasan berdasarkan nomor urut
+    - throughput, latency, jitter, packet loss, reordering dan duplikat
+    """
+    print("        MODE QOS (UDP, OPEN-LOOP):")
+
+    packet_size = max(data_size, QOS_HEADER.size)
+    padding = b"x" * (packet_size - QOS_HEADER.size)
+    interval_ns = int(1e9 / packet_rate)
+    target_address = (target_ip, target_port)
+
+    udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        udp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+    except OSError:
+        pass
+    udp_socket.settimeout(0.2)
+
+    # Status per nomor urut (1 byte per paket), diisi thread penerima
+    seen_flags = bytearray(total_packets)
+    rtt_stats = RunningStats()
+    packet_log = PacketLogWriter(csv_file) if csv_file else None
+
+    recv_state = {
+        "received": 0,
+        "bytes": 0,
+        "duplicates": 0,
+        "reordered": 0,
+        "invalid": 0,
+        "highest_seq": -1,
+        "first_recv": None,
+        "last_recv": None,
+    }
+    send_state = {"sent": 0, "errors": 0, "start": None, "end": None}
+    stop_event = threading.Event()
+
+    def receiver():
+        while not stop_event.is_set():
+            try:
+                response, _ = udp_socket.recvfrom(65535)
+            except socket.timeout:
+                continue
+            except OSError:
+                # ICMP port unreachable dari paket sebelumnya
+                continue
+            time_received = time.perf_counter_ns()
+
+            if len(response) < QOS_HEADER.size:
+                recv_state["invalid"] += 1
+                continue
+            seq_num, time_sent = QOS_HEADER.unpack_from(response)
+            if seq_num >= total_packets:
+                recv_state["invalid"] += 1
+                continue
+
+            if seen_flags[seq_num]:
+                recv_state["duplicates"] += 1
+                continue
+            seen_flags[seq_num] = 1
+
+            if seq_num < recv_state["highest_seq"]:
+                recv_state["reordered"] += 1
+            else:
+                recv_state["highest_seq"] = seq_num
+
+            rtt_stats.add((time_received - time_sent) / 1e9)
+            if packet_log:
+                packet_log.write(seq_num, len(response), time_sent, time_received)
+            recv_state["received"] += 1
+            recv_state["bytes"] += len(response)
+            if recv_state["first_recv"] is None:
+                recv_state["first_recv"] = time_received
+            recv_state["last_recv"] = time_received
+
+    def sender():
+        send_start = time.perf_counter_ns()
+        send_state["start"] = send_start
+        for seq_num in range(total_packets):
+            # Jadwal tetap: paket ke-n dikirim pada start + n * interval, tidak menunggu balasan
+            delay_ns = send_start + seq_num * interval_ns - time.perf_counter_ns()
+            if delay_ns > 0:
+                time.sleep(delay_ns / 1e9)
+
+            try:
+                udp_socket.sendto(QOS_HEADER.pack(seq_num, time.perf_counter_ns()) + padding, target_address)
+                send_state["sent"] += 1
+            except OSError:
+                send_state["errors"] += 1
+        send_state["end"] = time.perf_counter_ns()
+
+    receiver_thread = threading.Thread(target=receiver, name="QoS-Receiver", daemon=True)
+    sender_thread = threading.Thread(target=sender, name="QoS-Sender")
+    receiver_thread.start()
+    sender_thread.start()
+    sender_thread.join()
+
+    # Tunggu balasan yang masih di jalan
+    drain_deadline = time.time() + drain_timeout
+    while time.time() < drain_deadline and recv_state["received"] < send_state["sent"]:
+        time.sleep(0.05)
+    stop_event.set()
+    receiver_thread.join()
+    udp_socket.close()
+
+    sent_packets = send_state["sent"]
+    received_packets = recv_state["received"]
+    send_duration = max((send_state["end"] - send_state["start"]) / 1e9, 1e-9)
+    loss_percentage = (total_packets - received_packets) / total_packets * 100
+
+    # Throughput diukur dari balasan yang benar-benar diterima
+    if received_packets:
+        recv_duration = max((recv_state["last_recv"] - send_state["start"]) / 1e9, 1e-9)
+        bit_throughput = recv_state["bytes"] * 8 / recv_duration
+    else:
+        bit_throughput = 0.0
+    offered_pps = sent_packets / send_duration
+
+    # Latency dan jitter (selisih RTT berurutan menurut urutan kedatangan)
+    avg_latency = rtt_stats.mean
+    avg_jitter = rtt_stats.jitter
+
+    print("                 RINGKASAN QOS (OPEN-LOOP):")
+    print(f"Target rate              : {packet_rate:.1f} pps ({packet_rate * packet_size * 8 / 1e6:.3f} Mbps)")
+    print(f"Rate kirim tercapai      : {offered_pps:.1f} pps")
+    print(f"Jumlah paket dikirim     : {sent_packets} (gagal kirim: {send_state['errors']})")
+    print(f"Paket diterima           : {received_packets}")
+    print(f"Packet Loss              : {loss_percentage:.2f}%")
+    print(f"Duplikat                 : {recv_state['duplicates']}")
+    print(f"Reordering               : {recv_state['reordered']}")
+    print(f"Latency rata-rata        : {avg_latency * 1000:.3f} ms")
+    if rtt_stats.count:
+        print(f"Latency min / max / sd   : {rtt_stats.minimum * 1000:.3f} / {rtt_stats.maximum * 1000:.3f}"
+              f" / {rtt_stats.stddev * 1000:.3f} ms")
+    print(f"Jitter                   : {avg_jitter * 1000:.3f} ms")
+    print(f"Throughput               : {bit_throughput / 1000:.3f} Kbps")
+
+    if csv_file:
+
+        # Paket yang tidak pernah dibalas dicatat sebagai hilang (waktu kirim dari jadwal)
+        for seq_num in range(total_packets):
+            if not seen_flags[seq_num]:
+                packet_log.write(seq_num, packet_size, send_state["start"] + seq_num * interval_ns)
+        packet_log.close()
+
+        # CSV ringkasan QoS
+        summary_file = derived_path(csv_file, "_summary", "csv")
+        export_csv(
+            summary_file,
+            [[
+                bit_throughput / 1000,      # Kbps
+                avg_latency * 1000,         # ms
+                loss_percentage,            # %
+                avg_jitter * 1000,          # ms
+                offered_pps,
+                recv_state["duplicates"],
+                recv_state["reordered"]
+            ]],
+            ["throughput_kbps", "avg_latency_ms", "packet_loss_percent", "jitter_ms",
+             "sent_pps", "duplicates", "reordered"]
+        )
+
 # MULTI CLIENT MODE
 
-def start_parallel_clients(client_total, target_ip, target_port, resource_path="/"):
+LOAD_PERCENTILES = (50, 90, 99, 99.9)
+
+
+def new_load_stats():
+    """Wadah statistik load test (bisa digabung antar worker)."""
+    return {
+        "requests": 0,
+        "ok": 0,
+        "bytes": 0,
+        "errors": {},
+        "status": {},
+        "connect": [],
+        "ttfb": [],
+        "total": [],
+    }
+
+
+def record_load_result(load_stats, result, latency_total=None):
+    """Mencatat hasil satu request ke statistik."""
+    load_stats["requests"] += 1
+    load_stats["bytes"] += result["bytes"]
+    if result["status"] is not None:
+        load_stats["status"][result["status"]] = load_stats["status"].get(result["status"], 0) + 1
+    if result["error"]:
+        load_stats["errors"][result["error"]] = load_stats["errors"].get(result["error"], 0) + 1
+        return
+
+    load_stats["ok"] += 1
+    load_stats["connect"].append(result["connect"])
+    load_stats["ttfb"].append(result["ttfb"])
+    load_stats["total"].append(latency_total if latency_total is not None else result["total"])
+
+
+def merge_load_stats(target_stats, source_stats):
+    """Menggabungkan statistik worker ke statistik total."""
+    for key in ("requests", "ok", "bytes"):
+        target_stats[key] += source_stats[key]
+    for key in ("errors", "status"):
+        for name, count in source_stats[key].items():
+            target_stats[key][name] = target_stats[key].get(name, 0) + count
+    for key in ("connect", "ttfb", "total"):
+        target_stats[key].extend(source_stats[key])
+    return target_stats
+
+
+def report_load_stats(load_stats, measured_duration, csv_file=None):
+    """Menampilkan ringkasan load test dan ekspor ke CSV/JSON."""
+    measured_duration = max(measured_duration, 1e-9)
+    request_rate = load_stats["requests"] / measured_duration
+    byte_rate = load_stats["bytes"] / measured_duration
+    error_total = load_stats["requests"] - load_stats["ok"]
+
+    print("                 RINGKASAN LOAD TEST:")
+    print(f"Durasi pengukuran        : {measured_duration:.2f} s")
+    print(f"Total request            : {load_stats['requests']} (sukses: {load_stats['ok']}, error: {error_total})")
+    print(f"Requests/sec             : {request_rate:.1f}")
+    print(f"Throughput               : {byte_rate / 1024:.1f} KB/s")
+    if load_stats["status"]:
+        status_text = ", ".join(f"{code}={count}" for code, count in sorted(load_stats["status"].items()))
+        print(f"Status code              : {status_text}")
+    for name, count in sorted(load_stats["errors"].items(), key=lambda item: -item[1]):
+        print(f"  error {name:<18}: {count}")
+
+    latency_rows = []
+    header = "Latency (ms)".ljust(12) + "".join(f"{'p' + format(p, 'g'):>10}" for p in LOAD_PERCENTILES)
+    print(header + f"{'mean':>10}{'max':>10}")
+    for metric in ("connect", "ttfb", "total"):
+        values = sorted(load_stats[metric])
+        points = [percentile(values, p) * 1000 for p in LOAD_PERCENTILES]
+        mean = (sum(values) / len(values) * 1000) if values else 0.0
+        peak = (values[-1] * 1000) if values else 0.0
+        print(metric.ljust(12) + "".join(f"{point:>10.3f}" for point in points) + f"{mean:>10.3f}{peak:>10.3f}")
+        latency_rows.append([metric, len(values)] + points + [mean, peak])
+
+    if csv_file:
+        # Ringkasan, persentil latency dan rincian error
+        export_csv(
+            derived_path(csv_file, "_summary"),
+            [[measured_duration, load_stats["requests"], load_stats["ok"], error_total,
+              request_rate, byte_rate]],
+            ["duration_s", "requests", "ok", "errors", "requests_per_sec", "bytes_per_sec"]
+        )
+        export_csv(
+            derived_path(csv_file, "_latency"),
+            latency_rows,
+            ["metric", "count"] + [f"p{format(p, 'g')}_ms" for p in LOAD_PERCENTILES] + ["mean_ms", "max_ms"]
+        )
+        export_csv(
+            derived_path(csv_file, "_errors"),
+            sorted(load_stats["errors"].items(), key=lambda item: -item[1]),
+            ["error", "count"]
+        )
+
+
+def raise_fd_limit(wanted):
+    """Menaikkan batas file descriptor agar ribuan koneksi bisa dibuka."""
+    if resource is None:
+        return
+    soft_limit, hard_limit = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft_limit >= wanted:
+        return
+    new_limit = wanted if hard_limit == resource.RLIM_INFINITY else min(wanted, hard_limit)
+    try:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (new_limit, hard_limit))
+    except (ValueError, OSError):
+        pass
+
+
+def make_load_schedule(duration, request_total, target_rps, warmup):
     """
-    Menjalankan banyak HTTP client secara paralel.
+    Penjadwal giliran request bersama untuk semua worker.
+    Mengembalikan (next_ticket, waktu mulai, waktu mulai pengukuran).
     """
+    time_start = time.perf_counter()
+    measure_start = time_start + warmup
+    time_end = measure_start + duration if duration else None
+    ticket_lock = threading.Lock()
+    schedule = {"issued": 0, "measured": 0}
+
+    def next_ticket():
+        """Mengambil giliran request berikutnya; None jika sudah selesai."""
+        with ticket_lock:
+            slot = schedule["issued"]
+            schedule["issued"] += 1
+            scheduled_at = time_start + slot / target_rps if target_rps else time.perf_counter()
+            if time_end is not None and scheduled_at >= time_end:
+                return None
+            if scheduled_at >= measure_start:
+                if request_total is not None and schedule["measured"] >= request_total:
+                    return None
+                schedule["measured"] += 1
+                return scheduled_at, True
+            return scheduled_at, False
+
+    return next_ticket, time_start, measure_start
+
+
+def record_timed_result(load_stats, result, scheduled_at, target_rps):
+    """Mencatat hasil request; mode target rps menghitung latency dari jadwal kirim."""
+    latency_total = None
+    if target_rps and result["total"] is not None:
+        latency_total = time.perf_counter() - scheduled_at
+    record_load_result(load_stats, result, latency_total)
+
+
+def run_load_threads(client_total, target_ip, target_port, resource_path, next_ticket, timeout, target_rps):
+    """Load test dengan satu thread per client."""
+    worker_stats = [new_load_stats() for _ in range(client_total)]
+
+    def worker(load_stats):
+        while True:
+            ticket = next_ticket()
+            if ticket is None:
+                break
+            scheduled_at, measured = ticket
+            delay = scheduled_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+            result = timed_http_request(target_ip, target_port, resource_path, timeout)
+            if measured:
+                record_timed_result(load_stats, result, scheduled_at, target_rps)
+
     worker_threads = []
 
     for idx in range(client_total):
-        worker = threading.Thread(
-            target=send_http_request,
-            args=(target_ip, target_port, resource_path),
+        worker_thread = threading.Thread(
+            target=worker,
+            args=(worker_stats[idx],),
             name=f"HTTP-Client-{idx}"
         )
-        worker.start()
-        worker_threads.append(worker)
+        worker_thread.start()
+        worker_threads.append(worker_thread)
+
+    for worker_thread in worker_threads:
+        worker_thread.join()
+
+    return worker_stats
+
+
+async def run_load_asyncio(client_total, target_ip, target_port, resource_path, next_ticket, timeout, target_rps):
+    """Load test dengan satu coroutine per client (ribuan koneksi dalam satu proses)."""
+    worker_stats = [new_load_stats() for _ in range(client_total)]
+
+    async def worker(load_stats):
+        while True:
+            ticket = next_ticket()
+            if ticket is None:
+                break
+            scheduled_at, measured = ticket
+            delay = scheduled_at - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            result = await timed_http_request_async(target_ip, target_port, resource_path, timeout)
+            if measured:
+                record_timed_result(load_stats, result, scheduled_at, target_rps)
+
+    await asyncio.gather(*(worker(load_stats) for load_stats in worker_stats))
+    return worker_stats
+
+
+def run_load_share(
+    engine,
+    client_total,
+    target_ip,
+    target_port,
+    resource_path,
+    duration,
+    request_total,
+    target_rps,
+    warmup,
+    timeout
+):
+    """
+    Menjalankan bagian load test di proses ini.
+    Mengembalikan (statistik gabungan, durasi pengukuran).
+    """
+    raise_fd_limit(client_total + 256)
+    next_ticket, time_start, measure_start = make_load_schedule(duration, request_total, target_rps, warmup)
+
+    if engine == "asyncio":
+        worker_stats = asyncio.run(run_load_asyncio(
+            client_total, target_ip, target_port, resource_path, next_ticket, timeout, target_rps
+        ))
+    else:
+        worker_stats = run_load_threads(
+            client_total, target_ip, target_port, resource_path, next_ticket, timeout, target_rps
+        )
+
+    measured_duration = time.perf_counter() - measure_start
+    load_stats = new_load_stats()
+    for stats in worker_stats:
+        merge_load_stats(load_stats, stats)
+    return load_stats, measured_duration
+
+
+def split_evenly(total, parts):
+    """Membagi total ke beberapa bagian sebesar mungkin sama rata."""
+    return [total // parts + (1 if idx < total % parts else 0) for idx in range(parts)]
+
+
+def start_parallel_clients(
+    client_total,
+    target_ip,
+    target_port,
+    resource_path="/",
+    duration=None,
+    request_total=None,
+    target_rps=None,
+    warmup=0.0,
+    timeout=5.0,
+    csv_file=None,
+    engine="threads",
+    process_total=1
+):
+    """
+    Load generator HTTP:
+    - concurrency tetap (client_total worker) atau target requests/sec
+    - berjalan selama durasi tertentu atau sampai jumlah request tercapai
+    - request selama warmup tidak dihitung
+    - engine threads atau asyncio, opsional dibagi ke beberapa proses
+    """
+    process_total = max(1, min(process_total, client_total))
+    print(f"\n[LOAD] {target_ip}:{target_port}{resource_path} | engine={engine} | worker={client_total}"
+          + (f" | proses={process_total}" if process_total > 1 else "")
+          + (f" | target={target_rps:.1f} rps" if target_rps else "")
+          + (f" | durasi={duration}s" if duration else f" | request={request_total}")
+          + (f" | warmup={warmup}s" if warmup else ""))
+
+    if process_total == 1:
+        load_stats, measured_duration = run_load_share(
+            engine, client_total, target_ip, target_port, resource_path,
+            duration, request_total, target_rps, warmup, timeout
+        )
+        report_load_stats(load_stats, measured_duration, csv_file)
+        return load_stats
+
+    # Client, target rps dan jumlah request dibagi rata ke tiap proses
+    client_shares = split_evenly(client_total, process_total)
+    request_shares = split_evenly(request_total, process_total) if request_total is not None else [None] * process_total
+    rps_share = target_rps / process_total if target_rps else None
+
+    with ProcessPoolExecutor(max_workers=process_total) as executor:
+        futures = [
+            executor.submit(
+                run_load_share, engine, client_shares[idx], target_ip, target_port, resource_path,
+                duration, request_shares[idx], rps_share, warmup, timeout
+            )
+            for idx in range(process_total)
+        ]
+        results = [future.result() for future in futures]
+
+    load_stats = new_load_stats()
+    for stats, _ in results:
+        merge_load_stats(load_stats, stats)
+    measured_duration = max(share_duration for _, share_duration in results)
+    report_load_stats(load_stats, measured_duration, csv_file)
+    return load_stats
+
+# ANALISIS MODE
+
+def load_packet_trace(file_path):
+    """Memuat log per paket (CSV atau .bin) ke array NumPy."""
+    if file_path.endswith(".bin"):
+        with open(file_path, "rb") as log_file:
+            if log_file.read(len(PACKET_LOG_MAGIC)) != PACKET_LOG_MAGIC:
+                raise ValueError(f"Bukan file log QoS: {file_path}")
+        records = np.fromfile(
+            file_path,
+            dtype=np.dtype([("seq", "<u4"), ("size", "<u4"), ("send_ns", "<i8"), ("recv_ns", "<i8")]),
+            offset=len(PACKET_LOG_MAGIC)
+        )
+        columns = [records["seq"], records["size"], records["send_ns"], records["recv_ns"]]
+    else:
+        columns = np.loadtxt(file_path, delimiter=",", skiprows=1, usecols=(0, 1, 2, 3),
+                             dtype=np.int64, ndmin=2).T
+
+    return {
+        "seq": columns[0].astype(np.int64),
+        "size": columns[1].astype(np.int64),
+        "send_ns": columns[2].astype(np.int64),
+        "recv_ns": columns[3].astype(np.int64),
+    }
+
+
+def rfc3550_jitter(send_ns, recv_ns):
+    """
+    Interarrival jitter RFC 3550 (J += (|D| - J) / 16) untuk paket urut kedatangan.
+    Filter dihitung per blok: J[i] = w^(i+1) * J_awal + sum(w^(i-k) * |D[k]| / 16), w = 15/16.
+    """
+    transit_delta = np.abs(np.diff(recv_ns - send_ns).astype(np.float64))
+    jitter = np.empty_like(transit_delta)
+    decay = 15 / 16
+    powers = decay ** np.arange(1, JITTER_BLOCK + 1)
+    inverse_powers = decay ** -np.arange(JITTER_BLOCK)
+    current = 0.0
+
+    for block_start in range(0, len(transit_delta), JITTER_BLOCK):
+        block = transit_delta[block_start:block_start + JITTER_BLOCK]
+        length = len(block)
+        weighted = np.cumsum(block * inverse_powers[:length]) / 16
+        jitter[block_start:block_start + length] = powers[:length] * current + powers[:length] / decay * weighted
+        current = jitter[block_start + length - 1]
+
+    return jitter
+
+
+def run_lengths(mask):
+    """Panjang setiap deret True berurutan pada array boolean."""
+    edges = np.diff(np.concatenate(([0], mask.view(np.int8), [0])))
+    return np.flatnonzero(edges == -1) - np.flatnonzero(edges == 1)
 
-    for worker in worker_threads:
-        worker.join()
+
+def load_trace_anchor(trace_file):
+    """Anchor jam dinding dari file _meta.json (jika ada)."""
+    try:
+        with open(derived_path(trace_file, "_meta", "json")) as meta_file:
+            meta = json.load(meta_file)[0]
+        return meta["start_wall_ns"], meta["start_perf_ns"]
+    except (OSError, ValueError, KeyError, IndexError):
+        return None
+
+
+def analyze_qos_trace(trace_file, window_seconds=1.0, histogram_bins=50, output_file=None):
+    """
+    Analisis trace QoS per paket (vectorized dengan NumPy):
+    - persentil RTT dan jitter RFC 3550
+    - panjang burst loss dan jarak reordering
+    - time series per window dan histogram RTT
+    """
+    if np is None:
+        print("[ERROR] Mode analyze membutuhkan NumPy (pip install numpy)")
+        return None
+
+    print(f"\n[ANALYZE] Memuat trace {trace_file}")
+    trace = load_packet_trace(trace_file)
+    total_packets = len(trace["seq"])
+    if total_packets == 0:
+        print("[ERROR] Trace kosong")
+        return None
+
+    # Urut nomor urut untuk loss, urut kedatangan untuk jitter dan reordering
+    lost_mask = trace["recv_ns"][np.argsort(trace["seq"], kind="stable")] < 0
+    arrival_order = np.flatnonzero(trace["recv_ns"] >= 0)
+    arrival_order = arrival_order[np.argsort(trace["recv_ns"][arrival_order], kind="stable")]
+
+    send_ns = trace["send_ns"][arrival_order]
+    recv_ns = trace["recv_ns"][arrival_order]
+    arrival_seq = trace["seq"][arrival_order]
+    rtt_ms = (recv_ns - send_ns) / 1e6
+    received_packets = len(arrival_order)
+
+    rtt_points = np.percentile(rtt_ms, ANALYSIS_PERCENTILES) if received_packets else np.zeros(len(ANALYSIS_PERCENTILES))
+    jitter_ms = rfc3550_jitter(send_ns, recv_ns) / 1e6 if received_packets >= 2 else np.zeros(0)
+
+    loss_bursts = run_lengths(lost_mask)
+    duplicates = total_packets - len(np.unique(trace["seq"]))
+
+    # Reordering: jarak ke nomor urut tertinggi yang sudah diterima sebelumnya
+    if received_packets:
+        highest_before = np.maximum.accumulate(np.concatenate(([-1], arrival_seq[:-1])))
+        reorder_distance = highest_before - arrival_seq
+        reorder_distance = reorder_distance[reorder_distance > 0]
+    else:
+        reorder_distance = np.zeros(0, dtype=np.int64)
+
+    # Time series per window berdasarkan waktu kirim
+    window_ns = int(window_seconds * 1e9)
+    first_send = trace["send_ns"].min()
+    window_index = (trace["send_ns"] - first_send) // window_ns
+    window_total = int(window_index.max()) + 1
+    sent_per_window = np.bincount(window_index, minlength=window_total)
+    received_window = window_index[arrival_order]
+    received_per_window = np.bincount(received_window, minlength=window_total)
+    bytes_per_window = np.bincount(received_window, weights=trace["size"][arrival_order], minlength=window_total)
+    rtt_sum_window = np.bincount(received_window, weights=rtt_ms, minlength=window_total)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rtt_mean_window = np.where(received_per_window > 0, rtt_sum_window / received_per_window, np.nan)
+        loss_window = (sent_per_window - received_per_window) / np.maximum(sent_per_window, 1) * 100
+
+    # p99 per window: urutkan (window, rtt) lalu ambil indeks persentil tiap kelompok
+    rtt_p99_window = np.full(window_total, np.nan)
+    if received_packets:
+        sorted_rtt = rtt_ms[np.lexsort((rtt_ms, received_window))]
+        group_start = np.concatenate(([0], np.cumsum(received_per_window)[:-1]))
+        has_rtt = received_per_window > 0
+        rank = group_start + np.maximum(np.ceil(0.99 * received_per_window).astype(np.int64) - 1, 0)
+        rtt_p99_window[has_rtt] = sorted_rtt[rank[has_rtt]]
+
+    jitter_window = np.full(window_total, np.nan)
+    if len(jitter_ms):
+        jitter_count = np.bincount(received_window[1:], minlength=window_total)
+        jitter_sum = np.bincount(received_window[1:], weights=jitter_ms, minlength=window_total)
+        jitter_window[jitter_count > 0] = jitter_sum[jitter_count > 0] / jitter_count[jitter_count > 0]
+
+    anchor = load_trace_anchor(trace_file)
+    window_start_ns = first_send + np.arange(window_total) * window_ns
+
+    loss_percentage = (total_packets - received_packets) / total_packets * 100
+    duration = max((trace["send_ns"].max() - first_send) / 1e9, 1e-9)
+    bit_throughput = trace["size"][arrival_order].sum() * 8 / duration
+
+    print("                 ANALISIS TRACE QOS:")
+    print(f"Jumlah paket             : {total_packets} (diterima: {received_packets}, duplikat: {duplicates})")
+    print(f"Packet Loss              : {loss_percentage:.2f}%")
+    print(f"Burst loss               : {len(loss_bursts)} (rata-rata: {loss_bursts.mean() if len(loss_bursts) else 0:.2f}, "
+          f"maks: {loss_bursts.max() if len(loss_bursts) else 0})")
+    print(f"Reordering               : {len(reorder_distance)} paket (jarak maks: "
+          f"{reorder_distance.max() if len(reorder_distance) else 0})")
+    print(f"Throughput               : {bit_throughput / 1000:.3f} Kbps")
+    if received_packets:
+        print(f"Latency min / mean / max : {rtt_ms.min():.3f} / {rtt_ms.mean():.3f} / {rtt_ms.max():.3f} ms")
+        print("Latency persentil        : " + ", ".join(
+            f"p{format(p, 'g')}={value:.3f}" for p, value in zip(ANALYSIS_PERCENTILES, rtt_points)) + " ms")
+    print(f"Jitter RFC 3550 (akhir)  : {jitter_ms[-1] if len(jitter_ms) else 0:.3f} ms")
+    print(f"Jitter RFC 3550 (maks)   : {jitter_ms.max() if len(jitter_ms) else 0:.3f} ms")
+    print(f"Window                   : {window_total} x {window_seconds}s")
+
+    if output_file:
+        export_csv(
+            derived_path(output_file, "_summary"),
+            [[
+                total_packets, received_packets, duplicates, loss_percentage, bit_throughput / 1000,
+                float(rtt_ms.mean()) if received_packets else 0.0,
+                *[float(value) for value in rtt_points],
+                float(jitter_ms[-1]) if len(jitter_ms) else 0.0,
+                len(loss_bursts), int(loss_bursts.max()) if len(loss_bursts) else 0,
+                len(reorder_distance), int(reorder_distance.max()) if len(reorder_distance) else 0
+            ]],
+            ["packets", "received", "duplicates", "packet_loss_percent", "throughput_kbps", "avg_latency_ms"]
+            + [f"p{format(p, 'g')}_ms" for p in ANALYSIS_PERCENTILES]
+            + ["jitter_rfc3550_ms", "loss_bursts", "max_loss_burst", "reordered", "max_reorder_distance"]
+        )
+
+        window_rows = []
+        for idx in range(window_total):
+            start_time = ""
+            if anchor:
+                start_time = format_timestamp((anchor[0] + int(window_start_ns[idx]) - anchor[1]) / 1e9)
+            window_rows.append([
+                idx, start_time, int(sent_per_window[idx]), int(received_per_window[idx]),
+                float(loss_window[idx]), float(bytes_per_window[idx]) * 8 / window_seconds / 1000,
+                None if np.isnan(rtt_mean_window[idx]) else float(rtt_mean_window[idx]),
+                None if np.isnan(rtt_p99_window[idx]) else float(rtt_p99_window[idx]),
+                None if np.isnan(jitter_window[idx]) else float(jitter_window[idx])
+            ])
+        export_csv(
+            derived_path(output_file, "_windows"),
+            window_rows,
+            ["window", "start_time", "sent", "received", "packet_loss_percent", "throughput_kbps",
+             "avg_latency_ms", "p99_latency_ms", "jitter_rfc3550_ms"]
+        )
+
+        if received_packets:
+            histogram_counts, bin_edges = np.histogram(rtt_ms, bins=histogram_bins)
+            export_csv(
+                derived_path(output_file, "_histogram"),
+                [[float(bin_edges[idx]), float(bin_edges[idx + 1]), int(count)]
+                 for idx, count in enumerate(histogram_counts)],
+                ["rtt_from_ms", "rtt_to_ms", "count"]
+            )
+
+        burst_lengths = np.bincount(loss_bursts)
+        export_csv(
+            derived_path(output_file, "_loss_bursts"),
+            [[length, int(count)] for length, count in enumerate(burst_lengths) if count],
+            ["burst_length", "count"]
+        )
+
+        reorder_counts = np.bincount(reorder_distance)
+        export_csv(
+            derived_path(output_file, "_reorder"),
+            [[distance, int(count)] for distance, count in enumerate(reorder_counts) if count],
+            ["reorder_distance", "count"]
+        )
+
+    return trace
 
 # MAIN
 
@@ -202,26 +1159,68 @@ def entry_point():
     http_mode.add_argument("--ip", required=True)
     http_mode.add_argument("--port", type=int, required=True)
     http_mode.add_argument("--path", default="/")
+    http_mode.add_argument("--engine", choices=["threads", "asyncio"], default="threads")
 
     udp_mode = mode_parser.add_parser("udp", help="UDP QoS Testing")
     udp_mode.add_argument("--ip", required=True)
     udp_mode.add_argument("--port", type=int, required=True)
     udp_mode.add_argument("--size", type=int, default=100)
-    udp_mode.add_argument("--count", type=int, default=10)
+    udp_mode.add_argument("--count", type=positive_int, default=10)
     udp_mode.add_argument("--interval", type=float, default=0.1)
-    udp_mode.add_argument("--csv", default=None)
+    udp_mode.add_argument("--csv", default=None, help="Log per paket (.csv, atau .bin untuk format biner)")
+    udp_mode.add_argument("--open-loop", action="store_true",
+                          help="Kirim sesuai rate tanpa menunggu balasan (pengirim dan penerima terpisah)")
+    udp_mode.add_argument("--rate", type=positive_float, default=1000.0, help="Target paket per detik (open-loop)")
+    udp_mode.add_argument("--mbps", type=positive_float, default=None, help="Target Mbps, menggantikan --rate (open-loop)")
+    udp_mode.add_argument("--drain", type=float, default=2.0,
+                          help="Detik menunggu balasan terakhir setelah semua paket terkirim (open-loop)")
 
     multi_mode = mode_parser.add_parser("multi", help="Multiple HTTP Clients")
     multi_mode.add_argument("--ip", required=True)
     multi_mode.add_argument("--port", type=int, required=True)
     multi_mode.add_argument("--clients", type=int, default=5)
     multi_mode.add_argument("--path", default="/")
+    multi_mode.add_argument("--duration", type=float, default=None, help="Lama pengujian (detik)")
+    multi_mode.add_argument("--requests", type=int, default=None,
+                            help="Jumlah request yang diukur (default: satu per client)")
+    multi_mode.add_argument("--rps", type=positive_float, default=None,
+                            help="Target requests/sec (default: concurrency tetap)")
+    multi_mode.add_argument("--warmup", type=float, default=0.0, help="Durasi warmup (detik), tidak dihitung")
+    multi_mode.add_argument("--timeout", type=float, default=5.0)
+    multi_mode.add_argument("--csv", default=None, help="Prefix file hasil (.csv atau .json)")
+    multi_mode.add_argument("--engine", choices=["threads", "asyncio"], default="threads",
+                            help="threads: satu thread per client, asyncio: ribuan koneksi per proses")
+    multi_mode.add_argument("--processes", type=int, default=1,
+                            help="Jumlah proses worker; statistik digabung di akhir")
+
+    analyze_mode = mode_parser.add_parser("analyze", help="Analisis trace QoS per paket (NumPy)")
+    analyze_mode.add_argument("--trace", required=True, help="Log per paket dari mode udp --csv (.csv atau .bin)")
+    analyze_mode.add_argument("--window", type=float, default=1.0, help="Lebar window time series (detik)")
+    analyze_mode.add_argument("--bins", type=int, default=50, help="Jumlah bin histogram RTT")
+    analyze_mode.add_argument("--out", default=None, help="Prefix file hasil (.csv atau .json)")
 
     arguments = arg_parser.parse_args()
 
-    if arguments.run_mode == "http":
+    if arguments.run_mode == "http" and arguments.engine == "asyncio":
+        asyncio.run(send_http_request_async(arguments.ip, arguments.port, arguments.path))
+
+    elif arguments.run_mode == "http":
         send_http_request(arguments.ip, arguments.port, arguments.path)
 
+    elif arguments.run_mode == "udp" and arguments.open_loop:
+        packet_rate = arguments.rate
+        if arguments.mbps is not None:
+            packet_rate = arguments.mbps * 1e6 / (max(arguments.size, QOS_HEADER.size) * 8)
+        udp_qos_open_loop(
+            arguments.ip,
+            arguments.port,
+            arguments.size,
+            arguments.count,
+            packet_rate,
+            arguments.csv,
+            arguments.drain
+        )
+
     elif arguments.run_mode == "udp":
         udp_qos_test(
             arguments.ip,
@@ -233,15 +1232,29 @@ def entry_point():
         )
 
     elif arguments.run_mode == "multi":
+        request_total = arguments.requests
+        if request_total is None and arguments.duration is None:
+            request_total = arguments.clients
         start_parallel_clients(
             arguments.clients,
             arguments.ip,
             arguments.port,
-            arguments.path
+            arguments.path,
+            arguments.duration,
+            request_total,
+            arguments.rps,
+            arguments.warmup,
+            arguments.timeout,
+            arguments.csv,
+            arguments.engine,
+            arguments.processes
         )
 
+    elif arguments.run_mode == "analyze":
+        analyze_qos_trace(arguments.trace, arguments.window, arguments.bins, arguments.out)
+
     else:
-        print("Gunakan perintah: python client.py [http|udp|multi] --help")
+        print("Gunakan perintah: python client.py [http|udp|multi|analyze] --help")
 
 
 if __name__ == "__main__":
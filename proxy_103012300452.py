@@ -1,8 +1,20 @@
+import os
+import mmap
+import struct
 import socket
 import threading
 import time
 import logging
+import argparse
+import json
+import asyncio
+import selectors
+import hashlib
+import queue
+from bisect import bisect, bisect_left
+from collections import OrderedDict, deque
 from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
 
 # Konfigurasi
 
@@ -21,6 +33,56 @@ WEB_SERVER_UDP_PORT = 9000
 MAX_WORKERS = 20
 SOCKET_TIMEOUT = 5
 
+# Pool koneksi keep-alive ke Web Server
+UPSTREAM_POOL_SIZE = 16        # maksimum koneksi idle per upstream
+UPSTREAM_IDLE_TIMEOUT = 4.0    # detik, harus lebih kecil dari keep-alive timeout web server
+
+# Header hop-by-hop dari upstream yang tidak diteruskan ke client (dan tidak disimpan di cache)
+HOP_BY_HOP_HEADERS = ("Keep-Alive", "Proxy-Connection")
+
+# Request coalescing: batas waktu client menunggu fetch upstream milik request lain
+SINGLE_FLIGHT_TIMEOUT = SOCKET_TIMEOUT * 2
+
+# Cache HTTP
+CACHE_MAX_BYTES = 64 * 1024 * 1024   # budget total response yang di-cache
+CACHE_DEFAULT_TTL = 60               # detik, dipakai kalau response tidak punya Cache-Control/Expires
+CACHE_MAX_OBJECT_BYTES = 8 * 1024 * 1024   # response lebih besar dari ini di-stream tanpa di-cache
+CACHE_STALE_GRACE = 30          # detik entry kedaluwarsa masih dilayani sambil di-revalidate di background
+CACHE_STALE_IF_ERROR = 300      # detik entry kedaluwarsa masih dilayani kalau upstream error
+REFRESH_WORKERS = 4             # thread revalidasi background (engine threads)
+
+# Cache tier kedua di disk (opsional, aktif dengan --disk-cache DIR)
+DISK_CACHE_MAX_BYTES = 512 * 1024 * 1024
+DISK_CACHE_COMPACT_RATIO = 1.5   # compaction kalau file data melebihi budget x rasio ini
+DISK_CACHE_WRITE_QUEUE = 64      # job tulis yang menunggu thread writer; kalau penuh job dibuang
+DISK_INDEX_COMPACT_RECORDS = 4   # compaction kalau record index melebihi entry hidup x faktor ini (+1024)
+DISK_RECORD_HEADER = struct.Struct("<IH")    # di file data: panjang response, panjang key
+DISK_INDEX_RECORD = struct.Struct("<QIdH")   # di file index: offset record, panjang response (0 = hapus), expiresAt (epoch), panjang key
+
+# Session UDP (NAT-style): satu socket upstream persistent per alamat client
+UDP_SESSION_IDLE_TIMEOUT = 30.0   # detik tanpa trafik sebelum session ditutup
+UDP_SESSION_SWEEP_INTERVAL = 5.0  # interval pengecekan session idle
+UDP_MAX_SESSIONS = 4096           # session paling lama tidak aktif dibuang kalau penuh
+UDP_RECV_BATCH = 256              # datagram maksimum dibaca per event sebelum pindah ke socket lain
+UDP_SOCKET_BUFFER = 4 * 1024 * 1024   # SO_RCVBUF/SO_SNDBUF socket UDP proxy (dibatasi rmem_max/wmem_max kernel)
+
+# Load balancing ke beberapa Web Server (backend)
+LB_POLICIES = ("roundrobin", "leastconn", "hash")
+BACKEND_HASH_REPLICAS = 100       # virtual node per backend di ring consistent hashing
+BACKEND_MAX_FAILS = 3             # gagal berturut-turut sebelum backend di-eject (pasif)
+BACKEND_EJECT_TIME = 10.0         # detik backend di-eject setelah gagal berturut-turut
+BACKEND_MAX_TRIES = 2             # GET/HEAD yang gagal sebelum ada header dicoba ke backend lain
+HEALTH_CHECK_INTERVAL = 2.0       # detik antar health check aktif
+HEALTH_CHECK_PATH = "/"
+HEALTH_CHECK_TIMEOUT = 1.0
+
+# Metrics (admin port terpisah, JSON dan format teks Prometheus)
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9100
+UDP_UPSTREAM_LABELS = (("direction", "upstream"),)
+UDP_DOWNSTREAM_LABELS = (("direction", "downstream"),)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
 # Setup
 logging.basicConfig(
     level=logging.INFO,
@@ -28,16 +90,1666 @@ logging.basicConfig(
 )
 
 
+# Parse header "Nama: nilai" jadi dict (nama huruf kecil)
+def parseHeaderLines(lines) -> dict:
+    headers = {}
+    for line in lines:
+        name, sep, value = line.partition(":")
+        if sep:
+            headers[name.strip().lower()] = value.strip()
+    return headers
+
+
+# Parse request line + header. Return (method, path, version, headers)
+def parseHTTPRequest(rawRequest: bytes):
+    requestText = rawRequest.decode("utf-8", errors="ignore")
+    head = requestText.split("\r\n\r\n", 1)[0].split("\r\n")
+    parts = head[0].split()
+    if len(parts) < 3:
+        raise ValueError("Invalid request line")
+
+    method, path, version = parts[0], parts[1], parts[2]
+    return method, path, version, parseHeaderLines(head[1:])
+
+
+# Key cache: (method, path, encoding). Web server mengirim Vary: Accept-Encoding,
+# jadi client yang menerima gzip dan yang tidak dipisah
+def makeCacheKey(method: str, path: str, requestHeaders: dict):
+    acceptEncoding = "gzip" if "gzip" in requestHeaders.get("accept-encoding", "").lower() else ""
+    return (method, path, acceptEncoding)
+
+
+# Response error HTTP standar
+def buildHTTPError(status: str, message: str) -> bytes:
+    body = f"<html><body><h1>{status}</h1><p>{message}</p></body></html>"
+    response = (
+        f"HTTP/1.1 {status}\r\n"
+        f"Content-Type: text/html; charset=utf-8\r\n"
+        f"Content-Length: {len(body.encode('utf-8'))}\r\n"
+        f"Connection: close\r\n"
+        f"\r\n"
+        f"{body}"
+    )
+    return response.encode("utf-8")
+
+
+# Ambil status code + header dari response HTTP mentah
+def parseResponseHead(response: bytes):
+    head = response.split(b"\r\n\r\n", 1)[0].decode("iso-8859-1")
+    lines = head.split("\r\n")
+    parts = lines[0].split()
+    try:
+        statusCode = int(parts[1])
+    except (IndexError, ValueError):
+        statusCode = None
+    return statusCode, parseHeaderLines(lines[1:])
+
+
+# Status code dari response mentah tanpa parse header (dipakai di jalur HIT)
+def responseStatus(response: bytes):
+    parts = response[:16].split(b" ", 2)
+    if len(parts) >= 2 and parts[1].isdigit():
+        return int(parts[1])
+    return None
+
+
+# Ganti (atau tambah) satu header di request/response mentah, value None = hapus header
+def setHeader(rawMessage: bytes, name: str, value) -> bytes:
+    head, _, body = rawMessage.partition(b"\r\n\r\n")
+    lines = head.split(b"\r\n")
+    lowerName = name.lower().encode("ascii")
+    kept = [lines[0]] + [
+        line for line in lines[1:]
+        if line.split(b":", 1)[0].strip().lower() != lowerName
+    ]
+    if value is not None:
+        kept.append(f"{name}: {value}".encode("iso-8859-1"))
+    return b"\r\n".join(kept) + b"\r\n\r\n" + body
+
+
+# Head response untuk client: buang header hop-by-hop (termasuk yang disebut di Connection),
+# koneksi client selalu ditutup setelah satu response
+def clientResponseHead(head: bytes, headers: dict) -> bytes:
+    names = list(HOP_BY_HOP_HEADERS)
+    for token in headers.get("connection", "").split(","):
+        token = token.strip()
+        if token and token.lower() not in ("close", "keep-alive", "transfer-encoding"):
+            names.append(token)
+    for name in names:
+        head = setHeader(head, name, None)
+    return setHeader(head, "Connection", "close")
+
+
+# Request revalidasi: validator dari entry cache menggantikan header kondisional milik client
+def makeConditionalRequest(rawRequest: bytes, etag: str, lastModified: str) -> bytes:
+    for name in ("If-None-Match", "If-Modified-Since", "If-Range", "Range"):
+        rawRequest = setHeader(rawRequest, name, None)
+    if etag:
+        rawRequest = setHeader(rawRequest, "If-None-Match", etag)
+    if lastModified:
+        rawRequest = setHeader(rawRequest, "If-Modified-Since", lastModified)
+    return rawRequest
+
+
+def recvOrFail(sock: socket.socket, size: int) -> bytes:
+    chunk = sock.recv(size)
+    if not chunk:
+        raise ConnectionError("Upstream menutup koneksi sebelum response lengkap")
+    return chunk
+
+
+# Content-Length dari response upstream (None kalau tidak ada).
+# Nilai rusak dianggap kegagalan koneksi supaya ditangani seperti upstream putus
+def responseContentLength(headers):
+    value = headers.get("content-length")
+    if value is None:
+        return None
+    value = value.strip()
+    if not (value.isascii() and value.isdigit()):
+        raise ConnectionError(f"Content-Length upstream tidak valid: {value!r}")
+    return int(value)
+
+
+# Ukuran chunk dari baris "<hex>[;ext]\r\n"
+def parseChunkSize(sizeLine: bytes) -> int:
+    sizeField = sizeLine.split(b";", 1)[0].strip()
+    if not sizeField or sizeField.strip(b"0123456789abcdefABCDEF"):
+        raise ConnectionError(f"Ukuran chunk upstream tidak valid: {sizeField[:32]!r}")
+    return int(sizeField, 16)
+
+
+# Teruskan satu response HTTP dari upstream potongan demi potongan:
+# onHead(head, statusCode, headers) sekali, lalu onChunk(bytes) untuk body mentah.
+# Body dibatasi Content-Length / chunked (bukan EOF) supaya koneksinya bisa dipakai lagi.
+# Return reusable, atau None kalau upstream menutup koneksi sebelum mengirim apa pun
+def relayHTTPResponse(sock: socket.socket, method: str, onHead, onChunk):
+    data = b""
+    while b"\r\n\r\n" not in data:
+        chunk = sock.recv(4096)
+        if not chunk:
+            if data:
+                raise ConnectionError("Upstream menutup koneksi di tengah header")
+            return None
+        data += chunk
+
+    headEnd = data.index(b"\r\n\r\n") + 4
+    head, body = data[:headEnd], data[headEnd:]
+    statusCode, headers = parseResponseHead(head)
+    version = head.split(b" ", 1)[0]
+    reusable = version == b"HTTP/1.1" and "close" not in headers.get("connection", "").lower()
+    contentLength = responseContentLength(headers)
+
+    onHead(head, statusCode, headers)
+
+    # Response tanpa body
+    if method == "HEAD" or statusCode in (204, 304) or (statusCode is not None and statusCode < 200):
+        return reusable
+
+    if "chunked" in headers.get("transfer-encoding", "").lower():
+        relayChunkedBody(sock, body, onChunk)
+        return reusable
+
+    if contentLength is not None:
+        remaining = contentLength
+        if body:
+            onChunk(body[:remaining])
+            remaining -= len(body)
+        while remaining > 0:
+            chunk = recvOrFail(sock, min(remaining, 65536))
+            onChunk(chunk)
+            remaining -= len(chunk)
+        return reusable
+
+    # Tanpa framing: body berakhir saat koneksi ditutup
+    if body:
+        onChunk(body)
+    while True:
+        chunk = sock.recv(65536)
+        if not chunk:
+            break
+        onChunk(chunk)
+    return False
+
+
+# Teruskan body chunked apa adanya (ukuran chunk, isi, trailer), berhenti tepat di akhir body
+def relayChunkedBody(sock: socket.socket, data: bytes, onChunk):
+    while True:
+        # Baris ukuran chunk
+        while b"\r\n" not in data:
+            data += recvOrFail(sock, 65536)
+        lineEnd = data.index(b"\r\n") + 2
+        chunkSize = parseChunkSize(data[:lineEnd - 2])
+        onChunk(data[:lineEnd])
+        data = data[lineEnd:]
+
+        if chunkSize == 0:
+            # Trailer diakhiri baris kosong
+            while True:
+                while b"\r\n" not in data:
+                    data += recvOrFail(sock, 65536)
+                lineEnd = data.index(b"\r\n") + 2
+                onChunk(data[:lineEnd])
+                isEmpty = lineEnd == 2
+                data = data[lineEnd:]
+                if isEmpty:
+                    return
+
+        # Isi chunk + CRLF penutup
+        remaining = chunkSize + 2
+        while remaining > 0:
+            if not data:
+                data = recvOrFail(sock, min(remaining, 65536))
+            piece = data[:remaining]
+            onChunk(piece)
+            remaining -= len(piece)
+            data = data[len(piece):]
+
+
+# Versi asyncio dari relayHTTPResponse: callback onHead/onChunk berupa coroutine
+async def relayHTTPResponseAsync(reader: asyncio.StreamReader, method: str, onHead, onChunk):
+    try:
+        head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), SOCKET_TIMEOUT)
+    except asyncio.IncompleteReadError as e:
+        if e.partial:
+            raise ConnectionError("Upstream menutup koneksi di tengah header")
+        return None
+    except asyncio.LimitOverrunError:
+        raise ConnectionError("Header response upstream terlalu besar")
+
+    statusCode, headers = parseResponseHead(head)
+    version = head.split(b" ", 1)[0]
+    reusable = version == b"HTTP/1.1" and "close" not in headers.get("connection", "").lower()
+    contentLength = responseContentLength(headers)
+
+    await onHead(head, statusCode, headers)
+
+    # Response tanpa body
+    if method == "HEAD" or statusCode in (204, 304) or (statusCode is not None and statusCode < 200):
+        return reusable
+
+    try:
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            await relayChunkedBodyAsync(reader, onChunk)
+            return reusable
+
+        if contentLength is not None:
+            remaining = contentLength
+            while remaining > 0:
+                chunk = await asyncio.wait_for(reader.read(min(remaining, 65536)), SOCKET_TIMEOUT)
+                if not chunk:
+                    raise ConnectionError("Upstream menutup koneksi sebelum response lengkap")
+                await onChunk(chunk)
+                remaining -= len(chunk)
+            return reusable
+    except asyncio.IncompleteReadError:
+        raise ConnectionError("Upstream menutup koneksi sebelum response lengkap")
+    except asyncio.LimitOverrunError:
+        raise ConnectionError("Baris chunk upstream terlalu panjang")
+
+    # Tanpa framing: body berakhir saat koneksi ditutup
+    while True:
+        chunk = await asyncio.wait_for(reader.read(65536), SOCKET_TIMEOUT)
+        if not chunk:
+            break
+        await onChunk(chunk)
+    return False
+
+
+# Versi asyncio dari relayChunkedBody
+async def relayChunkedBodyAsync(reader: asyncio.StreamReader, onChunk):
+    while True:
+        sizeLine = await asyncio.wait_for(reader.readuntil(b"\r\n"), SOCKET_TIMEOUT)
+        chunkSize = parseChunkSize(sizeLine[:-2])
+        await onChunk(sizeLine)
+
+        if chunkSize == 0:
+            # Trailer diakhiri baris kosong
+            while True:
+                line = await asyncio.wait_for(reader.readuntil(b"\r\n"), SOCKET_TIMEOUT)
+                await onChunk(line)
+                if line == b"\r\n":
+                    return
+
+        # Isi chunk + CRLF penutup
+        remaining = chunkSize + 2
+        while remaining > 0:
+            piece = await asyncio.wait_for(reader.readexactly(min(remaining, 65536)), SOCKET_TIMEOUT)
+            await onChunk(piece)
+            remaining -= len(piece)
+
+
+# Estimasi persentil dari bucket histogram (interpolasi linear di dalam bucket)
+def histogramQuantile(buckets, counts, q: float):
+    total = sum(counts)
+    if total == 0:
+        return 0.0
+    rank = q * total
+    seen = 0
+    for i, count in enumerate(counts):
+        if seen + count >= rank and count > 0:
+            if i >= len(buckets):
+                return buckets[-1]
+            lower = buckets[i - 1] if i > 0 else 0.0
+            return lower + (buckets[i] - lower) * (rank - seen) / count
+        seen += count
+    return buckets[-1]
+
+
+def formatLabels(labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in labels) + "}"
+
+
+# Registry counter + histogram. Tiap thread menulis ke shard miliknya sendiri (tanpa lock),
+# shard baru dijumlahkan saat scrape. Engine asyncio cukup satu shard (thread event loop)
+class MetricsRegistry:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.local = threading.local()
+        self.shards = []
+        self.lock = threading.Lock()
+        self.descriptions = {}   # nama -> (tipe, help)
+        self.gauges = {}         # nama -> fungsi yang return list (labels, value)
+        self.startTime = time.time()
+
+    def describe(self, name: str, metricType: str, helpText: str):
+        self.descriptions[name] = (metricType, helpText)
+
+    def gauge(self, name: str, helpText: str, read):
+        self.describe(name, "gauge", helpText)
+        self.gauges[name] = read
+
+    def shard(self):
+        shard = getattr(self.local, "shard", None)
+        if shard is None:
+            shard = ({}, {})   # counters, histograms
+            self.local.shard = shard
+            with self.lock:
+                self.shards.append(shard)
+        return shard
+
+    # labels: tuple pasangan (nama, nilai), sebaiknya konstanta supaya tidak alokasi per request
+    def inc(self, name: str, labels=(), value=1):
+        counters = self.shard()[0]
+        key = (name, labels)
+        counters[key] = counters.get(key, 0) + value
+
+    def observe(self, name: str, labels, seconds: float):
+        histograms = self.shard()[1]
+        key = (name, labels)
+        values = histograms.get(key)
+        if values is None:
+            # Jumlah per bucket (non-kumulatif), bucket terakhir = +Inf, lalu total detik
+            values = histograms[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        values[bisect_left(self.buckets, seconds)] += 1
+        values[-1] += seconds
+
+    def snapshot(self):
+        with self.lock:
+            shards = list(self.shards)
+
+        counters = {}
+        histograms = {}
+        for shardCounters, shardHistograms in shards:
+            # dict(...) menyalin atomik terhadap thread penulis (GIL)
+            for key, value in dict(shardCounters).items():
+                counters[key] = counters.get(key, 0) + value
+            for key, values in dict(shardHistograms).items():
+                merged = histograms.setdefault(key, [0] * (len(self.buckets) + 1) + [0.0])
+                for i, value in enumerate(list(values)):
+                    merged[i] += value
+
+        gauges = {}
+        for name, read in self.gauges.items():
+            try:
+                gauges[name] = read()
+            except Exception as e:
+                logging.warning(f"[ADMIN] Gagal membaca gauge {name}: {e!r}")
+        return counters, histograms, gauges
+
+    def total(self, name: str, counters: dict) -> float:
+        return sum(value for (metricName, _), value in counters.items() if metricName == name)
+
+    def renderPrometheus(self) -> str:
+        counters, histograms, gauges = self.snapshot()
+        lines = []
+        for name, (metricType, helpText) in sorted(self.descriptions.items()):
+            lines.append(f"# HELP {name} {helpText}")
+            lines.append(f"# TYPE {name} {metricType}")
+            if metricType == "counter":
+                for (metricName, labels), value in sorted(counters.items()):
+                    if metricName == name:
+                        lines.append(f"{name}{formatLabels(labels)} {value}")
+            elif metricType == "histogram":
+                for (metricName, labels), values in sorted(histograms.items()):
+                    if metricName != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(self.buckets + ("+Inf",), values[:-1]):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{formatLabels(labels + (('le', bound),))} {cumulative}")
+                    lines.append(f"{name}_sum{formatLabels(labels)} {values[-1]:.6f}")
+                    lines.append(f"{name}_count{formatLabels(labels)} {cumulative}")
+            else:
+                for labels, value in gauges.get(name, []):
+                    lines.append(f"{name}{formatLabels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def renderJSON(self) -> str:
+        counters, histograms, gauges = self.snapshot()
+        result = {"uptime_seconds": round(time.time() - self.startTime, 3), "counters": {}, "histograms": {}, "gauges": {}}
+
+        for (name, labels), value in sorted(counters.items()):
+            result["counters"].setdefault(name, []).append({"labels": dict(labels), "value": value})
+
+        for (name, labels), values in sorted(histograms.items()):
+            counts = values[:-1]
+            count = sum(counts)
+            result["histograms"].setdefault(name, []).append({
+                "labels": dict(labels),
+                "count": count,
+                "sum": round(values[-1], 6),
+                "avg": round(values[-1] / count, 6) if count else 0.0,
+                "p50": round(histogramQuantile(self.buckets, counts, 0.50), 6),
+                "p90": round(histogramQuantile(self.buckets, counts, 0.90), 6),
+                "p99": round(histogramQuantile(self.buckets, counts, 0.99), 6),
+            })
+
+        for name, samples in gauges.items():
+            result["gauges"][name] = [{"labels": dict(labels), "value": value} for labels, value in samples]
+        return json.dumps(result, indent=2)
+
+
+# Pool koneksi persistent ke satu upstream (host, port)
+class UpstreamPool:
+    def __init__(self, host: str, port: int, maxIdle: int = UPSTREAM_POOL_SIZE,
+                 idleTimeout: float = UPSTREAM_IDLE_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.maxIdle = maxIdle
+        self.idleTimeout = idleTimeout
+        self.idle = deque()   # (socket, waktu terakhir dipakai)
+        self.lock = threading.Lock()
+
+        self.created = 0
+        self.reused = 0
+        self.discarded = 0
+
+    # Return (socket, reused). Koneksi idle dicek dulu sebelum dipakai
+    def acquire(self):
+        while True:
+            with self.lock:
+                if not self.idle:
+                    break
+                sock, lastUsed = self.idle.pop()
+
+            if time.monotonic() - lastUsed < self.idleTimeout and self.isHealthy(sock):
+                with self.lock:
+                    self.reused += 1
+                sock.settimeout(SOCKET_TIMEOUT)
+                return sock, True
+            self.discard(sock)
+
+        sock = socket.create_connection((self.host, self.port), timeout=SOCKET_TIMEOUT)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with self.lock:
+            self.created += 1
+        return sock, False
+
+    def release(self, sock: socket.socket):
+        with self.lock:
+            if len(self.idle) < self.maxIdle:
+                self.idle.append((sock, time.monotonic()))
+                return
+        self.discard(sock)
+
+    def discard(self, sock: socket.socket):
+        with self.lock:
+            self.discarded += 1
+        try:
+            sock.close()
+        except OSError:
+            pass
+
+    # Koneksi idle sehat kalau tidak ada data/EOF yang menunggu dibaca
+    @staticmethod
+    def isHealthy(sock: socket.socket) -> bool:
+        try:
+            sock.setblocking(False)
+            return not sock.recv(1, socket.MSG_PEEK)
+        except BlockingIOError:
+            return True
+        except OSError:
+            return False
+        finally:
+            try:
+                sock.setblocking(True)
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "idle": len(self.idle),
+                "created": self.created,
+                "reused": self.reused,
+                "discarded": self.discarded,
+            }
+
+
+# Versi asyncio dari UpstreamPool. Semua akses dari satu event loop, jadi tanpa lock
+class AsyncUpstreamPool:
+    def __init__(self, host: str, port: int, maxIdle: int = UPSTREAM_POOL_SIZE,
+                 idleTimeout: float = UPSTREAM_IDLE_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.maxIdle = maxIdle
+        self.idleTimeout = idleTimeout
+        self.idle = deque()   # (reader, writer, waktu terakhir dipakai)
+
+        self.created = 0
+        self.reused = 0
+        self.discarded = 0
+
+    # Return (reader, writer, reused). Koneksi idle yang sudah EOF/ditutup dibuang
+    async def acquire(self):
+        while self.idle:
+            reader, writer, lastUsed = self.idle.pop()
+            if (time.monotonic() - lastUsed < self.idleTimeout
+                    and not reader.at_eof() and not writer.is_closing()):
+                self.reused += 1
+                return reader, writer, True
+            self.discard(writer)
+
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), SOCKET_TIMEOUT
+        )
+        self.created += 1
+        return reader, writer, False
+
+    def release(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        if len(self.idle) < self.maxIdle:
+            self.idle.append((reader, writer, time.monotonic()))
+        else:
+            self.discard(writer)
+
+    def discard(self, writer: asyncio.StreamWriter):
+        self.discarded += 1
+        writer.close()
+
+    def stats(self) -> dict:
+        return {
+            "idle": len(self.idle),
+            "created": self.created,
+            "reused": self.reused,
+            "discarded": self.discarded,
+        }
+
+
+# Deduplikasi fetch yang sedang berjalan (single-flight): request pertama untuk satu key
+# melakukan fetch, request lain dengan key yang sama menunggu hasil (atau error upstream) yang sama.
+# fetch(release) boleh melepas waiter lebih awal lewat release() (hasil None = waiter fetch sendiri).
+# ConnectionAbortedError (client milik leader pergi) tidak diteruskan ke waiter
+class SingleFlight:
+    def __init__(self):
+        self.calls = {}   # key -> {"done", "result", "error"}
+        self.lock = threading.Lock()
+        self.leaders = 0
+        self.shared = 0
+
+    # Return (hasil, shared). shared=True kalau hasil diambil dari fetch request lain
+    def do(self, key, fetch, timeout: float = SINGLE_FLIGHT_TIMEOUT):
+        with self.lock:
+            call = self.calls.get(key)
+            isLeader = call is None
+            if isLeader:
+                call = {"done": threading.Event(), "result": None, "error": None}
+                self.calls[key] = call
+                self.leaders += 1
+            else:
+                self.shared += 1
+
+        if isLeader:
+            def release(result=None, error=None):
+                with self.lock:
+                    if self.calls.get(key) is call:
+                        del self.calls[key]
+                    if call["done"].is_set():
+                        return
+                    call["result"], call["error"] = result, error
+                    call["done"].set()
+
+            try:
+                result = fetch(release)
+            except ConnectionAbortedError:
+                release()
+                raise
+            except Exception as e:
+                release(error=e)
+                raise
+            release(result)
+            return result, False
+
+        if not call["done"].wait(timeout):
+            raise socket.timeout("Timeout menunggu fetch upstream yang sedang berjalan")
+        if call["error"] is not None:
+            raise call["error"]
+        return call["result"], True
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {"in_flight": len(self.calls), "leaders": self.leaders, "shared": self.shared}
+
+
+# Versi asyncio dari SingleFlight, waiter menunggu future milik leader
+class AsyncSingleFlight:
+    def __init__(self):
+        self.calls = {}   # key -> asyncio.Future
+        self.leaders = 0
+        self.shared = 0
+
+    async def do(self, key, fetch, timeout: float = SINGLE_FLIGHT_TIMEOUT):
+        call = self.calls.get(key)
+        if call is not None:
+            self.shared += 1
+            try:
+                return await asyncio.wait_for(asyncio.shield(call), timeout), True
+            except asyncio.TimeoutError:
+                raise asyncio.TimeoutError("Timeout menunggu fetch upstream yang sedang berjalan")
+
+        call = asyncio.get_running_loop().create_future()
+        self.calls[key] = call
+        self.leaders += 1
+
+        def release(result=None, error=None):
+            if self.calls.get(key) is call:
+                del self.calls[key]
+            if call.done():
+                return
+            if error is None:
+                call.set_result(result)
+            else:
+                call.set_exception(error)
+                # Tandai exception sudah diambil supaya asyncio tidak memberi peringatan kalau tidak ada waiter
+                call.exception()
+
+        try:
+            result = await fetch(release)
+        except ConnectionAbortedError:
+            release()
+            raise
+        except BaseException as e:
+            release(error=e if isinstance(e, Exception) else OSError("Fetch upstream dibatalkan"))
+            raise
+        release(result)
+        return result, False
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self.calls), "leaders": self.leaders, "shared": self.shared}
+
+
+# Satu Web Server di belakang proxy
+class Backend:
+    def __init__(self, host: str, tcpPort: int, udpPort: int):
+        self.host = host
+        self.tcpPort = tcpPort
+        self.udpPort = udpPort
+        self.name = f"{host}:{tcpPort}"
+
+        self.healthy = True        # hasil health check aktif terakhir
+        self.ejectedUntil = 0.0    # ejection pasif karena 502/504 berturut-turut
+        self.failures = 0
+        self.active = 0            # request / session UDP yang sedang berjalan
+
+        self.requests = 0
+        self.errors = 0
+        self.ejections = 0
+
+    def available(self, now: float) -> bool:
+        return self.healthy and now >= self.ejectedUntil
+
+
+def ringHash(key: str) -> int:
+    return int(hashlib.md5(key.encode("utf-8")).hexdigest()[:8], 16)
+
+
+# Parse "host:tcpPort[:udpPort]" dari argumen --backend
+def parseBackend(spec: str) -> Backend:
+    parts = spec.split(":")
+    if len(parts) not in (2, 3):
+        raise argparse.ArgumentTypeError(f"Format backend harus host:tcpPort[:udpPort], bukan '{spec}'")
+    try:
+        tcpPort = int(parts[1])
+        udpPort = int(parts[2]) if len(parts) == 3 else WEB_SERVER_UDP_PORT
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Port backend tidak valid: '{spec}'")
+    return Backend(parts[0], tcpPort, udpPort)
+
+
+# Daftar backend + policy pemilihan, health check aktif dan ejection pasif.
+# Dipakai dari thread worker maupun event loop, state dijaga satu lock
+class BackendPool:
+    def __init__(self, backends: list, policy: str = "roundrobin",
+                 maxFails: int = BACKEND_MAX_FAILS, ejectTime: float = BACKEND_EJECT_TIME):
+        self.backends = backends
+        self.policy = policy
+        self.maxFails = maxFails
+        self.ejectTime = ejectTime
+        self.lock = threading.Lock()
+        self.rrIndex = 0
+
+        # Ring consistent hashing: path yang sama selalu ke backend yang sama (cache backend tetap hangat),
+        # dan kalau satu backend hilang hanya path miliknya yang pindah
+        ring = sorted(
+            (ringHash(f"{backend.name}#{i}"), index)
+            for index, backend in enumerate(backends)
+            for i in range(BACKEND_HASH_REPLICAS)
+        )
+        self.ringKeys = [h for h, _ in ring]
+        self.ringBackends = [backends[index] for _, index in ring]
+
+    # Pilih backend yang tersedia (sehat dan tidak di-eject), None kalau tidak ada
+    def choose(self, key: str = "", exclude=()):
+        with self.lock:
+            now = time.monotonic()
+            candidates = [b for b in self.backends if b.available(now) and b not in exclude]
+            if not candidates:
+                return None
+
+            if self.policy == "leastconn":
+                return min(candidates, key=lambda b: (b.active, b.requests))
+
+            if self.policy == "hash":
+                start = bisect(self.ringKeys, ringHash(key))
+                for i in range(len(self.ringKeys)):
+                    backend = self.ringBackends[(start + i) % len(self.ringKeys)]
+                    if backend in candidates:
+                        return backend
+
+            backend = candidates[self.rrIndex % len(candidates)]
+            self.rrIndex += 1
+            return backend
+
+    def acquire(self, backend: Backend):
+        with self.lock:
+            backend.active += 1
+            backend.requests += 1
+
+    def release(self, backend: Backend):
+        with self.lock:
+            backend.active -= 1
+
+    def markSuccess(self, backend: Backend):
+        with self.lock:
+            backend.failures = 0
+
+    # Ejection pasif: backend yang menghasilkan 502/504 berturut-turut dikeluarkan sementara
+    def markFailure(self, backend: Backend):
+        with self.lock:
+            backend.errors += 1
+            backend.failures += 1
+            if backend.failures < self.maxFails:
+                return
+            backend.failures = 0
+            backend.ejections += 1
+            backend.ejectedUntil = time.monotonic() + self.ejectTime
+        logging.warning(f"[LB] Backend {backend.name} di-eject {self.ejectTime:.0f}s setelah {self.maxFails} kegagalan")
+
+    def setHealthy(self, backend: Backend, healthy: bool):
+        with self.lock:
+            changed = backend.healthy != healthy
+            backend.healthy = healthy
+            # Ejection pasif hanya dibatalkan kalau backend baru pulih dari gagal health check;
+            # probe sukses biasa tidak memperpendek BACKEND_EJECT_TIME
+            if changed and healthy:
+                backend.ejectedUntil = 0.0
+        if changed:
+            if healthy:
+                logging.info(f"[LB] Backend {backend.name} sehat kembali")
+            else:
+                logging.warning(f"[LB] Backend {backend.name} gagal health check, dikeluarkan dari rotasi")
+
+    # Health check aktif: GET ke tiap backend, status < 500 dianggap sehat
+    def probe(self, backend: Backend, path: str = HEALTH_CHECK_PATH) -> bool:
+        try:
+            with socket.create_connection((backend.host, backend.tcpPort), timeout=HEALTH_CHECK_TIMEOUT) as sock:
+                sock.sendall(
+                    f"GET {path} HTTP/1.1\r\nHost: {backend.host}\r\nConnection: close\r\n\r\n".encode()
+                )
+                statusLine = sock.recv(64).split(b"\r\n", 1)[0].split()
+                return len(statusLine) >= 2 and statusLine[1].isdigit() and int(statusLine[1]) < 500
+        except OSError:
+            return False
+
+    def startHealthChecks(self, interval: float = HEALTH_CHECK_INTERVAL, path: str = HEALTH_CHECK_PATH):
+        def healthLoop():
+            while True:
+                for backend in self.backends:
+                    self.setHealthy(backend, self.probe(backend, path))
+                time.sleep(interval)
+
+        threading.Thread(target=healthLoop, name="Backend-Health", daemon=True).start()
+
+    def stats(self) -> list:
+        with self.lock:
+            now = time.monotonic()
+            return [
+                {
+                    "backend": b.name,
+                    "available": b.available(now),
+                    "active": b.active,
+                    "requests": b.requests,
+                    "errors": b.errors,
+                    "ejections": b.ejections,
+                }
+                for b in self.backends
+            ]
+
+
+# Satu session UDP: alamat client <-> socket upstream (socket biasa atau DatagramTransport)
+class UdpSession:
+    def __init__(self, clientAddress, backend: Backend, upstream=None):
+        self.clientAddress = clientAddress
+        self.backend = backend
+        self.upstreamAddress = (backend.host, backend.udpPort)
+        self.upstream = upstream
+        self.pending = []   # datagram yang datang sebelum upstream siap (engine asyncio)
+
+        self.created = time.monotonic()
+        self.lastActive = self.created
+        self.lastSent = self.created
+
+        self.sentPackets = 0
+        self.sentBytes = 0
+        self.recvPackets = 0
+        self.recvBytes = 0
+
+    def markSent(self, size: int):
+        self.lastActive = self.lastSent = time.monotonic()
+        self.sentPackets += 1
+        self.sentBytes += size
+
+    def markReceived(self, size: int):
+        self.lastActive = time.monotonic()
+        self.recvPackets += 1
+        self.recvBytes += size
+
+
+# Tabel session UDP. Urutan OrderedDict = urutan aktivitas terakhir (LRU).
+# Hanya diakses dari satu thread / event loop, jadi tanpa lock
+class UdpSessionTable:
+    def __init__(self, idleTimeout: float = UDP_SESSION_IDLE_TIMEOUT, maxSessions: int = UDP_MAX_SESSIONS):
+        self.idleTimeout = idleTimeout
+        self.maxSessions = maxSessions
+        self.sessions = OrderedDict()
+
+        self.opened = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def get(self, clientAddress):
+        session = self.sessions.get(clientAddress)
+        if session is not None:
+            self.sessions.move_to_end(clientAddress)
+        return session
+
+    # Return list session yang dibuang supaya pemanggil bisa menutup socketnya
+    def add(self, session: UdpSession) -> list:
+        evicted = []
+        while len(self.sessions) >= self.maxSessions:
+            _, oldest = self.sessions.popitem(last=False)
+            evicted.append(oldest)
+            self.evicted += 1
+        self.sessions[session.clientAddress] = session
+        self.opened += 1
+        return evicted
+
+    def remove(self, clientAddress):
+        return self.sessions.pop(clientAddress, None)
+
+    # Keluarkan session yang backend-nya sudah tidak tersedia,
+    # paket berikutnya dari client tersebut membuka session ke backend lain
+    def detachUnavailable(self) -> list:
+        now = time.monotonic()
+        detached = []
+        for clientAddress, session in list(self.sessions.items()):
+            if session.backend.available(now):
+                continue
+            del self.sessions[clientAddress]
+            detached.append(session)
+        return detached
+
+    # Keluarkan session yang idle lebih lama dari idleTimeout
+    def expire(self) -> list:
+        now = time.monotonic()
+        expired = []
+        for clientAddress, session in list(self.sessions.items()):
+            if now - session.lastActive < self.idleTimeout:
+                continue
+            del self.sessions[clientAddress]
+            expired.append(session)
+            self.expired += 1
+        return expired
+
+    def stats(self) -> dict:
+        return {
+            "active": len(self.sessions),
+            "opened": self.opened,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
+
+
+# Perbesar buffer socket UDP supaya burst dari banyak client tidak langsung di-drop kernel
+def setUdpBuffers(sock: socket.socket):
+    for option in (socket.SO_RCVBUF, socket.SO_SNDBUF):
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, option, UDP_SOCKET_BUFFER)
+        except OSError:
+            pass
+
+
+def logUdpSessionClosed(session: UdpSession, reason: str):
+    clientIP, clientPort = session.clientAddress[:2]
+    logging.info(
+        f"[UDP] SESSION {reason} | {clientIP}:{clientPort} | "
+        f"up={session.sentPackets}pkt/{session.sentBytes}B | "
+        f"down={session.recvPackets}pkt/{session.recvBytes}B | "
+        f"durasi={session.lastActive - session.created:.1f}s"
+    )
+
+
+# Direktif Cache-Control jadi dict (nama huruf kecil -> nilai, "" kalau tanpa nilai)
+def parseCacheControl(headers: dict) -> dict:
+    directives = {}
+    for token in headers.get("cache-control", "").lower().split(","):
+        name, _, value = token.strip().partition("=")
+        if name:
+            directives[name.strip()] = value.strip().strip('"')
+    return directives
+
+
+# TTL (detik) sebuah response, atau None kalau tidak boleh di-cache.
+# Urutan: s-maxage/max-age, lalu Expires, lalu defaultTTL
+def responseTTL(statusCode, headers: dict, defaultTTL: float):
+    if statusCode != 200:
+        return None
+
+    directives = parseCacheControl(headers)
+
+    if "no-store" in directives or "no-cache" in directives or "private" in directives:
+        return None
+
+    # Cache key hanya membedakan Accept-Encoding, Vary lain tidak bisa dilayani
+    varyFields = [v.strip().lower() for v in headers.get("vary", "").split(",") if v.strip()]
+    if any(v != "accept-encoding" for v in varyFields):
+        return None
+
+    for directive in ("s-maxage", "max-age"):
+        if directive in directives:
+            try:
+                ttl = int(directives[directive])
+            except ValueError:
+                return None
+            return ttl if ttl > 0 else None
+
+    expires = headers.get("expires")
+    if expires:
+        try:
+            expiresAt = parsedate_to_datetime(expires).timestamp()
+        except (TypeError, ValueError):
+            # Expires tidak valid dianggap sudah kedaluwarsa
+            return None
+        try:
+            baseTime = parsedate_to_datetime(headers["date"]).timestamp()
+        except (KeyError, TypeError, ValueError):
+            baseTime = time.time()
+        ttl = expiresAt - baseTime
+        return ttl if ttl > 0 else None
+
+    return defaultTTL
+
+
+def encodeCacheKey(cacheKey) -> bytes:
+    return "\t".join(cacheKey).encode("utf-8")
+
+
+def decodeCacheKey(raw: bytes):
+    return tuple(raw.decode("utf-8").split("\t"))
+
+
+# Cache tier kedua di disk: file data append-only + file index append-only.
+# Index dibaca ulang saat start (entry terakhir per key menang, panjang 0 = dihapus),
+# isi response dibaca lewat mmap. Sampah dari entry lama dibersihkan dengan compaction.
+# Semua penulisan (write, flush, compaction) jalan di satu thread writer,
+# jadi pemanggil put/touch (termasuk event loop) tidak pernah menunggu disk
+class DiskCache:
+    def __init__(self, directory: str, maxBytes: int = DISK_CACHE_MAX_BYTES):
+        os.makedirs(directory, exist_ok=True)
+        self.dataPath = os.path.join(directory, "data.bin")
+        self.indexPath = os.path.join(directory, "index.bin")
+        self.maxBytes = maxBytes
+        self.lock = threading.Lock()
+
+        self.index = OrderedDict()   # cacheKey -> (offset, size, expiresAt), urutan = LRU
+        self.liveBytes = 0
+        self.indexRecords = 0
+        self.map = None
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.compactions = 0
+        self.touches = 0
+        self.droppedWrites = 0
+
+        startTime = time.time()
+        self.load()
+        self.dataFile = open(self.dataPath, "ab")
+        self.indexFile = open(self.indexPath, "ab")
+        self.dataSize = os.path.getsize(self.dataPath)
+        logging.info(
+            f"Disk cache {directory}: {len(self.index)} entry ({self.liveBytes}B) dimuat "
+            f"dalam {(time.time() - startTime) * 1000:.1f} ms"
+        )
+
+        with self.lock:
+            self.compactIfNeededLocked()
+
+        self.writeQueue = queue.Queue(maxsize=DISK_CACHE_WRITE_QUEUE)
+        self.writer = threading.Thread(target=self.writerLoop, name="Disk-Cache-Writer", daemon=True)
+        self.writer.start()
+
+    # Bangun ulang index dari file index, entry kedaluwarsa / di luar file data dilewati
+    def load(self):
+        if not os.path.exists(self.indexPath):
+            return
+        dataSize = os.path.getsize(self.dataPath) if os.path.exists(self.dataPath) else 0
+        with open(self.indexPath, "rb") as indexFile:
+            raw = indexFile.read()
+
+        now = time.time()
+        pos = 0
+        while pos + DISK_INDEX_RECORD.size <= len(raw):
+            offset, size, expiresAt, keyLen = DISK_INDEX_RECORD.unpack_from(raw, pos)
+            pos += DISK_INDEX_RECORD.size
+            if pos + keyLen > len(raw):
+                # Record terakhir terpotong (proses mati saat menulis)
+                break
+            cacheKey = decodeCacheKey(raw[pos:pos + keyLen])
+            pos += keyLen
+            self.indexRecords += 1
+
+            old = self.index.pop(cacheKey, None)
+            if old is not None:
+                self.liveBytes -= old[1]
+            if size == 0 or expiresAt <= now:
+                continue
+            if offset + DISK_RECORD_HEADER.size + keyLen + size > dataSize:
+                continue
+            self.index[cacheKey] = (offset, size, expiresAt)
+            self.liveBytes += size
+
+    # Return (response, sisa TTL) atau None
+    def get(self, cacheKey):
+        with self.lock:
+            entry = self.index.get(cacheKey)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            offset, size, expiresAt = entry
+            ttl = expiresAt - time.time()
+            response = self.readLocked(cacheKey, offset, size) if ttl > 0 else None
+            if response is None:
+                self.removeLocked(cacheKey)
+                self.misses += 1
+                return None
+
+            self.index.move_to_end(cacheKey)
+            self.hits += 1
+            return response, ttl
+
+    # Antrekan response untuk ditulis, False kalau terlalu besar / antrean penuh
+    def put(self, cacheKey, response: bytes, ttl: float) -> bool:
+        if len(response) > self.maxBytes:
+            return False
+        return self.enqueue(("put", cacheKey, response, ttl))
+
+    # Perpanjang umur entry (hasil revalidasi 304): cukup record index baru, body tidak ditulis ulang.
+    # response dipakai kalau entry ternyata sudah tidak ada di disk
+    def touch(self, cacheKey, response: bytes, ttl: float) -> bool:
+        return self.enqueue(("touch", cacheKey, response, ttl))
+
+    def enqueue(self, job) -> bool:
+        try:
+            self.writeQueue.put_nowait(job)
+            return True
+        except queue.Full:
+            self.droppedWrites += 1
+            return False
+
+    def writerLoop(self):
+        while True:
+            job = self.writeQueue.get()
+            if job is None:
+                return
+            kind, cacheKey, response, ttl = job
+            try:
+                with self.lock:
+                    if kind == "touch" and self.touchLocked(cacheKey, ttl):
+                        continue
+                    if len(response) <= self.maxBytes:
+                        self.putLocked(cacheKey, response, ttl)
+            except OSError as e:
+                logging.error(f"Disk cache gagal menulis: {e}")
+
+    def touchLocked(self, cacheKey, ttl: float) -> bool:
+        entry = self.index.get(cacheKey)
+        if entry is None:
+            return False
+        offset, size, _ = entry
+        expiresAt = time.time() + ttl
+        keyBytes = encodeCacheKey(cacheKey)
+        self.indexFile.write(DISK_INDEX_RECORD.pack(offset, size, expiresAt, len(keyBytes)) + keyBytes)
+        self.indexFile.flush()
+        self.indexRecords += 1
+        self.index[cacheKey] = (offset, size, expiresAt)
+        self.index.move_to_end(cacheKey)
+        self.touches += 1
+        self.compactIfNeededLocked()
+        return True
+
+    def putLocked(self, cacheKey, response: bytes, ttl: float):
+        size = len(response)
+        keyBytes = encodeCacheKey(cacheKey)
+
+        old = self.index.pop(cacheKey, None)
+        if old is not None:
+            self.liveBytes -= old[1]
+
+        # Buang entry paling lama dipakai sampai muat
+        while self.index and self.liveBytes + size > self.maxBytes:
+            oldestKey = next(iter(self.index))
+            self.removeLocked(oldestKey)
+            self.evictions += 1
+
+        expiresAt = time.time() + ttl
+        offset = self.dataSize
+        # File data ditulis dulu, index menyusul, supaya index tidak menunjuk data yang belum ada
+        self.dataFile.write(DISK_RECORD_HEADER.pack(size, len(keyBytes)) + keyBytes)
+        self.dataFile.write(response)
+        self.dataFile.flush()
+        self.indexFile.write(DISK_INDEX_RECORD.pack(offset, size, expiresAt, len(keyBytes)) + keyBytes)
+        self.indexFile.flush()
+
+        self.dataSize += DISK_RECORD_HEADER.size + len(keyBytes) + size
+        self.indexRecords += 1
+        self.index[cacheKey] = (offset, size, expiresAt)
+        self.liveBytes += size
+        self.writes += 1
+        self.compactIfNeededLocked()
+
+    # Compaction kalau file data penuh sampah, atau index membengkak karena touch/hapus berulang
+    def compactIfNeededLocked(self):
+        if (self.dataSize > self.maxBytes * DISK_CACHE_COMPACT_RATIO
+                or self.indexRecords > len(self.index) * DISK_INDEX_COMPACT_RECORDS + 1024):
+            self.compactLocked()
+
+    # Baca response lewat mmap, None kalau record tidak cocok dengan key (file rusak / tertimpa)
+    def readLocked(self, cacheKey, offset: int, size: int):
+        keyBytes = encodeCacheKey(cacheKey)
+        start = offset + DISK_RECORD_HEADER.size + len(keyBytes)
+        if self.map is None or len(self.map) < start + size:
+            # File data sudah bertambah sejak mmap terakhir
+            if self.map is not None:
+                self.map.close()
+            self.map = None
+            if self.dataSize == 0:
+                return None
+            with open(self.dataPath, "rb") as dataFile:
+                self.map = mmap.mmap(dataFile.fileno(), 0, access=mmap.ACCESS_READ)
+            if len(self.map) < start + size:
+                return None
+
+        recordSize, keyLen = DISK_RECORD_HEADER.unpack_from(self.map, offset)
+        if recordSize != size or self.map[offset + DISK_RECORD_HEADER.size:start] != keyBytes:
+            return None
+        return self.map[start:start + size]
+
+    def removeLocked(self, cacheKey):
+        entry = self.index.pop(cacheKey, None)
+        if entry is None:
+            return
+        self.liveBytes -= entry[1]
+        keyBytes = encodeCacheKey(cacheKey)
+        self.indexFile.write(DISK_INDEX_RECORD.pack(0, 0, 0.0, len(keyBytes)) + keyBytes)
+        self.indexFile.flush()
+        self.indexRecords += 1
+
+    # Tulis ulang entry yang masih hidup ke file baru (urutan LRU dipertahankan)
+    def compactLocked(self):
+        now = time.time()
+        tmpData = self.dataPath + ".tmp"
+        tmpIndex = self.indexPath + ".tmp"
+        newIndex = OrderedDict()
+        offset = 0
+
+        with open(tmpData, "wb") as dataFile, open(tmpIndex, "wb") as indexFile:
+            for cacheKey, (oldOffset, size, expiresAt) in self.index.items():
+                if expiresAt <= now:
+                    continue
+                response = self.readLocked(cacheKey, oldOffset, size)
+                if response is None:
+                    continue
+                keyBytes = encodeCacheKey(cacheKey)
+                dataFile.write(DISK_RECORD_HEADER.pack(size, len(keyBytes)) + keyBytes)
+                dataFile.write(response)
+                indexFile.write(DISK_INDEX_RECORD.pack(offset, size, expiresAt, len(keyBytes)) + keyBytes)
+                newIndex[cacheKey] = (offset, size, expiresAt)
+                offset += DISK_RECORD_HEADER.size + len(keyBytes) + size
+
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        self.dataFile.close()
+        self.indexFile.close()
+
+        # Kalau proses mati di antara dua replace, record yang tidak cocok ditolak readLocked
+        os.replace(tmpData, self.dataPath)
+        os.replace(tmpIndex, self.indexPath)
+
+        self.dataFile = open(self.dataPath, "ab")
+        self.indexFile = open(self.indexPath, "ab")
+        self.index = newIndex
+        self.liveBytes = sum(size for _, size, _ in newIndex.values())
+        self.dataSize = offset
+        self.indexRecords = len(newIndex)
+        self.compactions += 1
+
+    # Tunggu antrean tulis habis, lalu tutup file
+    def close(self):
+        self.writeQueue.put(None)
+        self.writer.join()
+        with self.lock:
+            if self.map is not None:
+                self.map.close()
+                self.map = None
+            self.dataFile.close()
+            self.indexFile.close()
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "entries": len(self.index),
+                "bytes": self.liveBytes,
+                "file_bytes": self.dataSize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "writes": self.writes,
+                "evictions": self.evictions,
+                "compactions": self.compactions,
+                "touches": self.touches,
+                "dropped_writes": self.droppedWrites,
+            }
+
+
+# Window stale (detik) sebuah response: stale-while-revalidate dan stale-if-error.
+# Directive di Cache-Control menang atas default, must-revalidate mematikan keduanya
+def staleWindows(headers: dict, defaultGrace: float, defaultIfError: float):
+    directives = parseCacheControl(headers)
+    if "must-revalidate" in directives or "proxy-revalidate" in directives:
+        return 0.0, 0.0
+
+    windows = []
+    for directive, default in (("stale-while-revalidate", defaultGrace), ("stale-if-error", defaultIfError)):
+        try:
+            windows.append(max(0.0, float(directives[directive])))
+        except (KeyError, ValueError):
+            windows.append(default)
+    return windows[0], windows[1]
+
+
+# Cache response HTTP: LRU dengan budget byte + TTL per entry,
+# opsional di atas DiskCache (miss di memori dicari di disk lalu dipromosikan)
+class ProxyCache:
+    def __init__(self, maxBytes: int = CACHE_MAX_BYTES, defaultTTL: float = CACHE_DEFAULT_TTL,
+                 diskCache: DiskCache = None, staleGrace: float = CACHE_STALE_GRACE,
+                 staleIfError: float = CACHE_STALE_IF_ERROR):
+        self.maxBytes = maxBytes
+        self.defaultTTL = defaultTTL
+        self.diskCache = diskCache
+        self.staleGrace = staleGrace
+        self.staleIfError = staleIfError
+        self.entries = OrderedDict()   # cacheKey -> entry (urutan = LRU)
+        self.totalBytes = 0
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.diskHits = 0
+        self.staleHits = 0
+        self.staleIfErrorHits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.uncacheable = 0
+
+    # Return (response, "fresh" | "stale") atau (None, None).
+    # "stale" = sudah kedaluwarsa tapi masih dalam window stale-while-revalidate
+    def get(self, cacheKey):
+        cached = self.getMemory(cacheKey)
+        if cached is not None:
+            return cached
+        return self.promoteFromDisk(cacheKey, self.loadFromDisk(cacheKey))
+
+    # Versi asyncio dari get: baca tier disk (mmap + page fault) di thread pool, bukan di event loop
+    async def getAsync(self, cacheKey):
+        cached = self.getMemory(cacheKey)
+        if cached is not None:
+            return cached
+        found = await asyncio.get_running_loop().run_in_executor(None, self.loadFromDisk, cacheKey)
+        return self.promoteFromDisk(cacheKey, found)
+
+    # Cek tier memori. None = perlu dicari di disk
+    def getMemory(self, cacheKey):
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(cacheKey)
+            if entry is not None:
+                if entry["expiresAt"] > now:
+                    self.entries.move_to_end(cacheKey)
+                    self.hits += 1
+                    return entry["response"], "fresh"
+
+                if entry["staleUntil"] > now:
+                    self.entries.move_to_end(cacheKey)
+                    self.staleHits += 1
+                    return entry["response"], "stale"
+
+                # Entry masih disimpan selama window stale-if-error
+                if entry["errorUntil"] <= now:
+                    self.removeLocked(cacheKey)
+                    self.expirations += 1
+
+            if self.diskCache is None:
+                self.misses += 1
+                return None, None
+        return None
+
+    # Return (response, sisa TTL, headers) dari disk atau None
+    def loadFromDisk(self, cacheKey):
+        found = self.diskCache.get(cacheKey)
+        if found is None:
+            return None
+        response, ttl = found
+        return response, ttl, parseResponseHead(response)[1]
+
+    def promoteFromDisk(self, cacheKey, found):
+        with self.lock:
+            if found is None:
+                self.misses += 1
+                return None, None
+
+            response, ttl, headers = found
+            self.storeLocked(cacheKey, response, headers, ttl)
+            self.diskHits += 1
+            return response, "fresh"
+
+    # Salinan lama untuk dilayani saat upstream error (stale-if-error), None kalau tidak ada
+    def getStaleIfError(self, cacheKey):
+        with self.lock:
+            entry = self.entries.get(cacheKey)
+            if entry is None or entry["errorUntil"] <= time.monotonic():
+                return None
+            self.staleIfErrorHits += 1
+            return entry["response"]
+
+    def hasStaleIfError(self, cacheKey) -> bool:
+        with self.lock:
+            entry = self.entries.get(cacheKey)
+            return entry is not None and entry["errorUntil"] > time.monotonic()
+
+    # (ETag, Last-Modified) entry untuk request kondisional
+    def validators(self, cacheKey):
+        with self.lock:
+            entry = self.entries.get(cacheKey)
+            if entry is None:
+                return None, None
+            return entry["etag"], entry["lastModified"]
+
+    # Simpan response kalau boleh di-cache, return True kalau tersimpan
+    def put(self, cacheKey, response: bytes) -> bool:
+        statusCode, headers = parseResponseHead(response)
+        ttl = responseTTL(statusCode, headers, self.defaultTTL)
+
+        with self.lock:
+            if ttl is None or len(response) > self.maxBytes:
+                self.uncacheable += 1
+                return False
+            self.storeLocked(cacheKey, response, headers, ttl)
+
+        if self.diskCache is not None:
+            self.diskCache.put(cacheKey, response, ttl)
+        return True
+
+    # Origin membalas 304: entry tetap dipakai, header cache dari 304 memperbarui umurnya
+    def refresh(self, cacheKey, notModifiedHeaders: dict) -> bool:
+        with self.lock:
+            entry = self.entries.get(cacheKey)
+            if entry is None:
+                return False
+
+            response = entry["response"]
+            _, headers = parseResponseHead(response)
+            for name in ("cache-control", "expires", "date", "etag", "last-modified"):
+                if name in notModifiedHeaders:
+                    headers[name] = notModifiedHeaders[name]
+
+            ttl = responseTTL(200, headers, self.defaultTTL)
+            if ttl is None:
+                self.removeLocked(cacheKey)
+                return False
+
+            grace, ifError = staleWindows(headers, self.staleGrace, self.staleIfError)
+            now = time.monotonic()
+            entry["expiresAt"] = now + ttl
+            entry["staleUntil"] = now + ttl + grace
+            entry["errorUntil"] = now + ttl + max(grace, ifError)
+
+        if self.diskCache is not None:
+            self.diskCache.touch(cacheKey, response, ttl)
+        return True
+
+    def storeLocked(self, cacheKey, response: bytes, headers: dict, ttl: float):
+        size = len(response)
+        if size > self.maxBytes:
+            return
+
+        self.removeLocked(cacheKey)
+
+        # Buang entry paling lama dipakai sampai muat
+        while self.entries and self.totalBytes + size > self.maxBytes:
+            oldestKey = next(iter(self.entries))
+            self.removeLocked(oldestKey)
+            self.evictions += 1
+
+        grace, ifError = staleWindows(headers, self.staleGrace, self.staleIfError)
+        now = time.monotonic()
+        self.entries[cacheKey] = {
+            "response": response,
+            "size": size,
+            "expiresAt": now + ttl,
+            "staleUntil": now + ttl + grace,
+            "errorUntil": now + ttl + max(grace, ifError),
+            "etag": headers.get("etag"),
+            "lastModified": headers.get("last-modified"),
+        }
+        self.totalBytes += size
+
+    def removeLocked(self, cacheKey):
+        entry = self.entries.pop(cacheKey, None)
+        if entry is not None:
+            self.totalBytes -= entry["size"]
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "bytes": self.totalBytes,
+                "max_bytes": self.maxBytes,
+                "hits": self.hits,
+                "disk_hits": self.diskHits,
+                "stale_hits": self.staleHits,
+                "stale_if_error": self.staleIfErrorHits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "uncacheable": self.uncacheable,
+            }
+
+
 class ProxyServer:
-    def __init__(self):
+    def __init__(self, cacheMaxBytes: int = CACHE_MAX_BYTES, cacheTTL: float = CACHE_DEFAULT_TTL,
+                 cacheMaxObject: int = CACHE_MAX_OBJECT_BYTES, engine: str = "asyncio",
+                 backends: BackendPool = None, diskCache: DiskCache = None,
+                 staleGrace: float = CACHE_STALE_GRACE, staleIfError: float = CACHE_STALE_IF_ERROR):
+        self.engine = engine
+
+        # Web Server tujuan (default satu backend dari konfigurasi WEB_SERVER_*)
+        self.backends = backends or BackendPool([Backend(WEB_SERVER_HOST, WEB_SERVER_TCP_PORT, WEB_SERVER_UDP_PORT)])
+
         # Cache HTTP
-        self.cache = {}
-        self.cache_lock = threading.Lock()
+        self.cache = ProxyCache(cacheMaxBytes, cacheTTL, diskCache, staleGrace, staleIfError)
+        self.cacheMaxObject = min(cacheMaxObject, cacheMaxBytes)
 
-        # Thread pool untuk TCP worker
+        # Revalidasi background entry stale, satu refresh per key
+        self.refreshing = set()
+        self.refreshLock = threading.Lock()
+        self.refreshExecutor = ThreadPoolExecutor(max_workers=REFRESH_WORKERS)
+        self.refreshTasks = set()   # referensi task refresh (engine asyncio)
+        self.refreshUpdated = 0
+        self.refreshNotModified = 0
+        self.refreshFailed = 0
+
+        # Thread pool untuk TCP worker (engine threads) + jumlah koneksi yang belum dapat worker
         self.executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+        self.queuedClients = 0
+        self.queuedClientsLock = threading.Lock()
+
+        # Fetch upstream yang sedang berjalan, dibagi ke request lain dengan key sama
+        self.inflight = AsyncSingleFlight() if engine == "asyncio" else SingleFlight()
+
+        # Pool koneksi keep-alive per upstream (UpstreamPool atau AsyncUpstreamPool, sesuai engine)
+        self.upstreamPools = {}
+        self.upstreamPoolsLock = threading.Lock()
+
+        # Session UDP per alamat client
+        self.udpSessions = UdpSessionTable()
+
+        self.metrics = MetricsRegistry()
+        self.registerMetrics()
+
+    def registerMetrics(self):
+        m = self.metrics
+        m.describe("proxy_http_requests_total", "counter", "Request HTTP per status cache dan status code")
+        m.describe("proxy_http_request_duration_seconds", "histogram", "Latency request HTTP per status cache")
+        m.describe("proxy_upstream_requests_total", "counter", "Request ke backend per hasil")
+        m.describe("proxy_upstream_duration_seconds", "histogram", "Latency request ke backend")
+        m.describe("proxy_udp_packets_total", "counter", "Datagram UDP yang diteruskan per arah")
+        m.describe("proxy_udp_bytes_total", "counter", "Byte UDP yang diteruskan per arah")
+        m.describe("proxy_udp_dropped_total", "counter", "Datagram UDP yang di-drop proxy")
+        m.describe("proxy_udp_reply_seconds", "histogram", "Jeda datagram terakhir ke upstream sampai balasan")
+
+        def cacheGauges():
+            st = self.cache.stats()
+            lookups = st["hits"] + st["disk_hits"] + st["stale_hits"] + st["misses"]
+            served = st["hits"] + st["disk_hits"] + st["stale_hits"]
+            return [
+                ((("kind", "entries"),), st["entries"]),
+                ((("kind", "bytes"),), st["bytes"]),
+                ((("kind", "hit_ratio"),), round(served / lookups, 4) if lookups else 0.0),
+            ]
+
+        m.gauge("proxy_cache", "Isi cache memori dan hit ratio", cacheGauges)
+        if self.engine == "threads":
+            m.gauge("proxy_executor_queue_depth", "Koneksi TCP yang menunggu worker",
+                    lambda: [((), self.queuedClients)])
+        m.gauge("proxy_singleflight_inflight", "Fetch upstream yang sedang berjalan",
+                lambda: [((), self.inflight.stats()["in_flight"])])
+        m.gauge("proxy_udp_sessions_active", "Session UDP aktif",
+                lambda: [((), len(self.udpSessions.sessions))])
+        m.gauge("proxy_backend_up", "1 kalau backend tersedia (sehat dan tidak di-eject)",
+                lambda: [((("backend", b["backend"]),), int(b["available"])) for b in self.backends.stats()])
+        m.gauge("proxy_backend_active", "Request / session UDP yang sedang berjalan per backend",
+                lambda: [((("backend", b["backend"]),), b["active"]) for b in self.backends.stats()])
+
+    def recordRequest(self, cacheStatus: str, statusCode, startTime: float):
+        labels = (("cache", cacheStatus), ("status", str(statusCode or 0)))
+        self.metrics.inc("proxy_http_requests_total", labels)
+        self.metrics.observe("proxy_http_request_duration_seconds", (("cache", cacheStatus),), time.time() - startTime)
+
+    def getUpstreamPool(self, host: str, port: int):
+        with self.upstreamPoolsLock:
+            pool = self.upstreamPools.get((host, port))
+            if pool is None:
+                poolClass = AsyncUpstreamPool if self.engine == "asyncio" else UpstreamPool
+                pool = poolClass(host, port)
+                self.upstreamPools[(host, port)] = pool
+            return pool
+
+    # Kirim request ke upstream lewat pool dan teruskan response ke callback.
+    # Koneksi reuse yang ternyata sudah basi (ditutup web server sebelum header balasan)
+    # dicoba ulang sekali dengan koneksi baru
+    def forwardUpstream(self, rawRequest: bytes, method: str, host: str, port: int, onHead, onChunk):
+        pool = self.getUpstreamPool(host, port)
+        upstreamRequest = setHeader(rawRequest, "Connection", "keep-alive")
+
+        for attempt in range(2):
+            upstreamSock, reused = pool.acquire()
+            headSeen = []
+
+            def markHead(head, statusCode, headers):
+                headSeen.append(True)
+                onHead(head, statusCode, headers)
+
+            try:
+                upstreamSock.sendall(upstreamRequest)
+                reusable = relayHTTPResponse(upstreamSock, method, markHead, onChunk)
+            except ConnectionAbortedError:
+                # Dibatalkan dari sisi client, bukan kesalahan upstream
+                pool.discard(upstreamSock)
+                raise
+            except (ConnectionError, BrokenPipeError) as e:
+                pool.discard(upstreamSock)
+                if reused and attempt == 0 and not headSeen and method in ("GET", "HEAD"):
+                    continue
+                raise OSError(f"Koneksi upstream terputus: {e}")
+            except Exception:
+                pool.discard(upstreamSock)
+                raise
+
+            if reusable is None:
+                pool.discard(upstreamSock)
+                if reused and attempt == 0:
+                    continue
+                raise OSError("Upstream menutup koneksi tanpa response")
+
+            if reusable:
+                pool.release(upstreamSock)
+            else:
+                pool.discard(upstreamSock)
+            return
+
+        raise OSError("Upstream menutup koneksi tanpa response")
 
     # Bagian TCP 
+    # Pilih backend (policy load balancing) lalu forward. Kegagalan koneksi/timeout dan status
+    # 502/503/504 dihitung untuk ejection pasif; GET/HEAD yang gagal sebelum ada header dicoba ke backend lain
+    def forwardToBackend(self, rawRequest: bytes, method: str, path: str, onHead, onChunk, progress: dict):
+        tried = []
+        while True:
+            backend = self.backends.choose(path, exclude=tried)
+            if backend is None:
+                if tried:
+                    raise lastError
+                raise OSError("Tidak ada backend yang sehat")
+            tried.append(backend)
+            progress["backend"] = backend
+            statusSeen = []
+
+            def markHead(head, statusCode, headers):
+                statusSeen.append(statusCode)
+                onHead(head, statusCode, headers)
+
+            self.backends.acquire(backend)
+            backendLabels = (("backend", backend.name),)
+            upstreamStart = time.time()
+            try:
+                self.forwardUpstream(rawRequest, method, backend.host, backend.tcpPort, markHead, onChunk)
+            except ConnectionAbortedError:
+                raise
+            except OSError as e:
+                self.backends.markFailure(backend)
+                self.metrics.inc("proxy_upstream_requests_total", backendLabels + (("result", "error"),))
+                if statusSeen or method not in ("GET", "HEAD") or len(tried) >= BACKEND_MAX_TRIES:
+                    raise
+                logging.warning(f"[LB] {method} {path} gagal di {backend.name} ({e!r}), coba backend lain")
+                lastError = e
+                continue
+            finally:
+                self.backends.release(backend)
+
+            self.metrics.observe("proxy_upstream_duration_seconds", backendLabels, time.time() - upstreamStart)
+            if statusSeen and statusSeen[0] in (502, 503, 504):
+                self.backends.markFailure(backend)
+                self.metrics.inc("proxy_upstream_requests_total", backendLabels + (("result", "5xx"),))
+            else:
+                self.backends.markSuccess(backend)
+                self.metrics.inc("proxy_upstream_requests_total", backendLabels + (("result", "ok"),))
+            return
+
     def startTCPProxy(self):
         # Proxy TCP di port 8080 untuk HTTP
         serverSocket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -51,10 +1763,18 @@ class ProxyServer:
             while True:
                 clientSocket, clientAddress = serverSocket.accept()
                 # Submit ke thread pool
-                self.executor.submit(self.handleTCPClient, clientSocket, clientAddress)
+                with self.queuedClientsLock:
+                    self.queuedClients += 1
+                self.executor.submit(self.runTCPClient, clientSocket, clientAddress)
         finally:
             serverSocket.close()
 
+    def runTCPClient(self, clientSocket: socket.socket, clientAddress):
+        # Koneksi sudah dapat worker, tidak lagi dihitung sebagai antrean
+        with self.queuedClientsLock:
+            self.queuedClients -= 1
+        self.handleTCPClient(clientSocket, clientAddress)
+
     def handleTCPClient(self, clientSocket: socket.socket, clientAddress):
         # Menangani satu koneksi TCP dari client (HTTP)
         startTime = time.time()
@@ -70,86 +1790,237 @@ class ProxyServer:
 
             # Parse request line (baris pertama)
             try:
-                requestText = rawRequest.decode("utf-8", errors="ignore")
-                requestLine = requestText.split("\r\n", 1)[0]
-                parts = requestLine.split()
-                if len(parts) < 3:
-                    raise ValueError("Invalid request line")
-
-                method, path, version = parts[0], parts[1], parts[2]
+                method, path, version, requestHeaders = parseHTTPRequest(rawRequest)
             except Exception as e:
                 logging.warning(f"[TCP] Gagal parse request dari {clientIP}:{clientPort}: {e}")
                 self.sendHTTPError(clientSocket, "400 Bad Request", "Invalid HTTP request")
+                self.recordRequest("NONE", 400, startTime)
                 return
 
-            # Key cache sederhana: (method, path)
-            cacheKey = (method, path)
+            cacheKey = makeCacheKey(method, path, requestHeaders)
 
-            # Cek cache
-            with self.cache_lock:
-                cachedResponse = self.cache.get(cacheKey)
+            # Cek cache (hanya GET). Entry stale langsung dilayani, revalidasi jalan di background
+            cachedResponse, cacheState = self.cache.get(cacheKey) if method == "GET" else (None, None)
 
             if cachedResponse:
-                cacheStatus = "HIT"
+                cacheStatus = "HIT" if cacheState == "fresh" else "STALE"
+                if cacheState == "stale":
+                    self.scheduleRefresh(cacheKey, rawRequest, path)
                 clientSocket.sendall(cachedResponse)
                 elapsed = time.time() - startTime
                 logging.info(
-                    f"[TCP] {cacheStatus} | {clientIP}:{clientPort} -> "
-                    f"{WEB_SERVER_HOST}:{WEB_SERVER_TCP_PORT} {method} {path} "
+                    f"[TCP] {cacheStatus} | {clientIP}:{clientPort} -> cache {method} {path} "
                     f"| size={len(cachedResponse)}B | t={elapsed:.4f}s"
                 )
+                self.recordRequest(cacheStatus, responseStatus(cachedResponse), startTime)
                 return
 
             cacheStatus = "MISS"
+            progress = {"headSent": False, "bytes": 0, "backend": None, "status": None}
 
-            # Teruskan ke Web Server
+            # Teruskan ke Web Server (lewat pool koneksi keep-alive), response di-stream ke client.
+            # MISS bersamaan untuk key yang sama cukup satu fetch (single-flight)
             try:
-                upstreamSock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                upstreamSock.settimeout(SOCKET_TIMEOUT)
-                upstreamSock.connect((WEB_SERVER_HOST, WEB_SERVER_TCP_PORT))
-
-                upstreamSock.sendall(rawRequest)
-
-                # Baca seluruh response
-                responseChunks = []
-                while True:
-                    chunk = upstreamSock.recv(4096)
-                    if not chunk:
-                        break
-                    responseChunks.append(chunk)
-
-                upstreamSock.close()
+                if method == "GET":
+                    responseData, shared = self.inflight.do(
+                        cacheKey,
+                        lambda release: self.streamUpstream(clientSocket, rawRequest, method, path, cacheKey,
+                                                            progress, release)
+                    )
+                    if shared:
+                        cacheStatus = "MISS-SHARED"
+                        if responseData is not None:
+                            clientSocket.sendall(responseData)
+                            progress["bytes"] = len(responseData)
+                            progress["status"] = responseStatus(responseData)
+                        else:
+                            # Response leader tidak di-cache (terlalu besar / tidak bisa di-cache), stream sendiri
+                            self.streamUpstream(clientSocket, rawRequest, method, path, None, progress)
+                else:
+                    self.streamUpstream(clientSocket, rawRequest, method, path, None, progress)
+            except ConnectionAbortedError:
+                logging.warning(f"[TCP] Client {clientIP}:{clientPort} menutup koneksi di tengah response {path}")
+                # 499 = client menutup koneksi (konvensi nginx)
+                self.recordRequest(cacheStatus, 499, startTime)
+                return
             except socket.timeout:
                 logging.error(f"[TCP] Timeout koneksi ke Web Server dari {clientIP}:{clientPort}")
-                self.sendHTTPError(clientSocket, "504 Gateway Timeout",
-                                     "Gateway Timeout when contacting upstream server")
+                if not progress["headSent"]:
+                    self.sendStaleOrError(clientSocket, clientAddress, method, path, cacheKey,
+                                          "504 Gateway Timeout", "Gateway Timeout when contacting upstream server",
+                                          cacheStatus, startTime)
+                else:
+                    self.recordRequest(cacheStatus, progress["status"], startTime)
                 return
             except OSError as e:
                 logging.error(f"[TCP] Error koneksi ke Web Server: {e}")
-                self.sendHTTPError(clientSocket, "502 Bad Gateway",
-                                     "Bad Gateway when contacting upstream server")
+                # Kalau header sudah terkirim, client cukup melihat koneksi terputus
+                if not progress["headSent"]:
+                    self.sendStaleOrError(clientSocket, clientAddress, method, path, cacheKey,
+                                          "502 Bad Gateway", "Bad Gateway when contacting upstream server",
+                                          cacheStatus, startTime)
+                else:
+                    self.recordRequest(cacheStatus, progress["status"], startTime)
                 return
 
-            responseData = b"".join(responseChunks)
-
-            # Simpan ke cache
-            with self.cache_lock:
-                self.cache[cacheKey] = responseData
-
-            # Kirim ke client
-            clientSocket.sendall(responseData)
-
             elapsed = time.time() - startTime
 
+            upstreamName = progress["backend"].name if progress["backend"] else "single-flight"
             logging.info(
                 f"[TCP] {cacheStatus} | {clientIP}:{clientPort} -> "
-                f"{WEB_SERVER_HOST}:{WEB_SERVER_TCP_PORT} {method} {path} "
-                f"| size={len(responseData)}B | t={elapsed:.4f}s"
+                f"{upstreamName} {method} {path} "
+                f"| size={progress['bytes']}B | t={elapsed:.4f}s"
             )
+            self.recordRequest(cacheStatus, progress["status"], startTime)
 
         finally:
             clientSocket.close()
 
+    # Stream response upstream ke client sambil menyalin (tee) ke buffer cache.
+    # Return response utuh kalau muat di batas cache (dan sudah disimpan ke cache),
+    # None kalau terlalu besar / tidak bisa di-cache (cacheKey None).
+    # Dipanggil leader single-flight: cache sudah terisi sebelum waiter dilepas, dan begitu tee
+    # dimatikan waiter langsung dilepas lewat release() supaya fetch sendiri
+    def streamUpstream(self, clientSocket: socket.socket, rawRequest: bytes, method: str, path: str,
+                       cacheKey, progress: dict, release=None):
+        tee = [] if cacheKey is not None else None
+        teeSize = 0
+        clientOpen = True
+
+        def sendToClient(data: bytes):
+            nonlocal clientOpen
+            if not clientOpen:
+                return
+            try:
+                clientSocket.sendall(data)
+                progress["bytes"] += len(data)
+            except OSError:
+                # Client pergi; kalau masih tee ke cache, body tetap dibaca sampai habis
+                clientOpen = False
+
+        def dropTee():
+            nonlocal tee
+            if tee is not None and release is not None:
+                release()
+            tee = None
+
+        def keepTee(data: bytes):
+            nonlocal teeSize
+            if tee is None:
+                return
+            teeSize += len(data)
+            if teeSize > self.cacheMaxObject:
+                dropTee()
+            else:
+                tee.append(data)
+
+        def onHead(head, statusCode, headers):
+            # Origin error tapi masih ada salinan stale-if-error: jangan teruskan error ke client
+            if statusCode in (500, 502, 503, 504) and cacheKey is not None and self.cache.hasStaleIfError(cacheKey):
+                raise OSError(f"Upstream membalas {statusCode}")
+            # Koneksi client tetap ditutup setelah satu response
+            head = clientResponseHead(head, headers)
+            if not self.isTeeable(statusCode, headers):
+                dropTee()
+            keepTee(head)
+            progress["headSent"] = True
+            progress["status"] = statusCode
+            sendToClient(head)
+
+        def onChunk(chunk):
+            keepTee(chunk)
+            sendToClient(chunk)
+            if not clientOpen and tee is None:
+                raise ConnectionAbortedError("Client menutup koneksi")
+
+        self.forwardToBackend(rawRequest, method, path, onHead, onChunk, progress)
+
+        if tee is None:
+            return None
+        responseData = b"".join(tee)
+        self.cache.put(cacheKey, responseData)
+        return responseData
+
+    # Response perlu disalin ke cache? Tidak kalau pasti tidak bisa di-cache atau lebih besar dari batas objek
+    def isTeeable(self, statusCode, headers: dict) -> bool:
+        if responseTTL(statusCode, headers, self.cache.defaultTTL) is None:
+            return False
+        try:
+            return int(headers.get("content-length", 0)) <= self.cacheMaxObject
+        except ValueError:
+            return True
+
+    # Stale-if-error: upstream gagal sebelum header terkirim, layani salinan lama kalau masih ada
+    def sendStaleOrError(self, sock: socket.socket, clientAddress, method: str, path: str, cacheKey,
+                         status: str, message: str, cacheStatus: str, startTime: float):
+        staleResponse = self.cache.getStaleIfError(cacheKey) if method == "GET" else None
+        if staleResponse is None:
+            self.sendHTTPError(sock, status, message)
+            self.recordRequest(cacheStatus, int(status.split()[0]), startTime)
+            return
+
+        self.recordRequest("STALE-IF-ERROR", responseStatus(staleResponse), startTime)
+        try:
+            sock.sendall(staleResponse)
+        except OSError:
+            return
+        logging.info(
+            f"[TCP] STALE-IF-ERROR | {clientAddress[0]}:{clientAddress[1]} -> cache {method} {path} "
+            f"| size={len(staleResponse)}B | upstream={status}"
+        )
+
+    # Jadwalkan revalidasi entry stale (sekali per key)
+    def scheduleRefresh(self, cacheKey, rawRequest: bytes, path: str):
+        with self.refreshLock:
+            if cacheKey in self.refreshing:
+                return
+            self.refreshing.add(cacheKey)
+
+        etag, lastModified = self.cache.validators(cacheKey)
+        request = makeConditionalRequest(rawRequest, etag, lastModified)
+
+        if self.engine == "asyncio":
+            task = asyncio.ensure_future(self.refreshEntryAsync(cacheKey, request, path))
+            self.refreshTasks.add(task)
+            task.add_done_callback(self.refreshTasks.discard)
+        else:
+            self.refreshExecutor.submit(self.refreshEntry, cacheKey, request, path)
+
+    def refreshEntry(self, cacheKey, request: bytes, path: str):
+        parts = []
+        progress = {"backend": None}
+        try:
+            self.forwardToBackend(request, "GET", path,
+                                  lambda head, statusCode, headers: parts.append(clientResponseHead(head, headers)),
+                                  parts.append, progress)
+            self.finishRefresh(cacheKey, path, b"".join(parts), progress)
+        except Exception as e:
+            self.finishRefresh(cacheKey, path, None, progress, e)
+
+    # Terapkan hasil revalidasi: 304 memperpanjang entry, 200 menggantinya, selain itu entry stale dibiarkan
+    def finishRefresh(self, cacheKey, path: str, response, progress: dict, error=None):
+        statusCode = parseResponseHead(response)[0] if response else None
+        upstreamName = progress["backend"].name if progress["backend"] else "-"
+
+        with self.refreshLock:
+            self.refreshing.discard(cacheKey)
+            if statusCode == 304:
+                self.refreshNotModified += 1
+            elif statusCode == 200:
+                self.refreshUpdated += 1
+            else:
+                self.refreshFailed += 1
+
+        if statusCode == 304:
+            self.cache.refresh(cacheKey, parseResponseHead(response)[1])
+        elif statusCode == 200:
+            self.cache.put(cacheKey, response)
+        else:
+            reason = repr(error) if error else f"status {statusCode}"
+            logging.warning(f"[TCP] REFRESH gagal {path} dari {upstreamName}: {reason}")
+            return
+        logging.info(f"[TCP] REFRESH {statusCode} | {upstreamName} GET {path}")
+
     def recvHTTPRequest(self, sock: socket.socket) -> bytes:
         # Menerima HTTP request sampai header selesai atau timeout
         sock.settimeout(SOCKET_TIMEOUT)
@@ -170,83 +2041,780 @@ class ProxyServer:
 
     def sendHTTPError(self, sock: socket.socket, status: str, message: str):
         # Kirim HTTP error response standar
-        body = f"<html><body><h1>{status}</h1><p>{message}</p></body></html>"
-        response = (
-            f"HTTP/1.1 {status}\r\n"
-            f"Content-Type: text/html; charset=utf-8\r\n"
-            f"Content-Length: {len(body.encode('utf-8'))}\r\n"
-            f"Connection: close\r\n"
-            f"\r\n"
-            f"{body}"
-        )
         try:
-            sock.sendall(response.encode("utf-8"))
+            sock.sendall(buildHTTPError(status, message))
         except OSError:
             pass
 
+    # BAGIAN ADMIN (metrics)
+
+    def startMetricsServer(self, host: str = METRICS_HOST, port: int = METRICS_PORT):
+        adminSocket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        adminSocket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        adminSocket.bind((host, port))
+        adminSocket.listen(16)
+        logging.info(f"[ADMIN] Metrics di http://{host}:{port}/metrics (Prometheus) dan /metrics.json")
+
+        # Scrape jarang dan murah, cukup dilayani berurutan di satu thread
+        while True:
+            conn, addr = adminSocket.accept()
+            conn.settimeout(SOCKET_TIMEOUT)
+            try:
+                method, path, _, _ = parseHTTPRequest(self.recvHTTPRequest(conn))
+                path = path.split("?", 1)[0]
+                if path == "/metrics":
+                    body = self.metrics.renderPrometheus().encode("utf-8")
+                    contentType = "text/plain; version=0.0.4; charset=utf-8"
+                elif path == "/metrics.json":
+                    body = self.metrics.renderJSON().encode("utf-8")
+                    contentType = "application/json"
+                else:
+                    self.sendHTTPError(conn, "404 Not Found", "Gunakan /metrics atau /metrics.json")
+                    continue
+
+                conn.sendall(
+                    f"HTTP/1.1 200 OK\r\n"
+                    f"Content-Type: {contentType}\r\n"
+                    f"Content-Length: {len(body)}\r\n"
+                    f"Connection: close\r\n\r\n".encode("utf-8") + body
+                )
+            except ValueError:
+                self.sendHTTPError(conn, "400 Bad Request", "Invalid HTTP request")
+            except OSError as e:
+                logging.warning(f"[ADMIN] Gagal melayani {addr[0]}:{addr[1]}: {e}")
+            finally:
+                conn.close()
+
     # BAGIAN UDP
 
     def startUDPProxy(self):
         # Menjalankan proxy UDP di port 9090 untuk QoS test
         # Proxy HANYA meneruskan paket ke Web Server UDP (port 9000) tanpa melakukan retransmission.
+        # Tiap client punya socket upstream sendiri (session), semua socket non-blocking
+        # dilayani satu selector sehingga paket hilang tidak menahan client lain.
         udpSocket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        setUdpBuffers(udpSocket)
         udpSocket.bind((PROXY_HOST, PROXY_UDP_PORT))
+        udpSocket.setblocking(False)
+
+        selector = selectors.DefaultSelector()
+        selector.register(udpSocket, selectors.EVENT_READ, None)
 
         logging.info(f"[UDP] Proxy UDP berjalan di {PROXY_HOST}:{PROXY_UDP_PORT}")
 
+        lastSweep = time.monotonic()
         while True:
-            data, clientAddress = udpSocket.recvfrom(65535)
-            recv_time = time.time()
-            clientIP, clientPort = clientAddress
+            for key, _ in selector.select(timeout=UDP_SESSION_SWEEP_INTERVAL):
+                if key.data is None:
+                    self.readUDPClients(udpSocket, selector)
+                else:
+                    self.readUDPUpstream(udpSocket, key.data)
+
+            if time.monotonic() - lastSweep >= UDP_SESSION_SWEEP_INTERVAL:
+                lastSweep = time.monotonic()
+                for session in self.udpSessions.expire():
+                    self.closeUDPSession(session, selector, "expired")
+                for session in self.udpSessions.detachUnavailable():
+                    self.closeUDPSession(session, selector, "backend down")
+
+    def readUDPClients(self, udpSocket: socket.socket, selector):
+        for _ in range(UDP_RECV_BATCH):
+            try:
+                data, clientAddress = udpSocket.recvfrom(65535)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                # ICMP error dari paket sebelumnya, lanjutkan
+                logging.warning(f"[UDP] Error menerima dari client: {e}")
+                continue
+
+            session = self.udpSessions.get(clientAddress)
+            try:
+                if session is None:
+                    session = self.openUDPSession(clientAddress, selector)
+                session.upstream.send(data)
+                session.markSent(len(data))
+                self.metrics.inc("proxy_udp_packets_total", UDP_UPSTREAM_LABELS)
+                self.metrics.inc("proxy_udp_bytes_total", UDP_UPSTREAM_LABELS, len(data))
+            except (BlockingIOError, InterruptedError):
+                # Buffer kirim penuh: paket di-drop, tidak ada retransmission
+                self.metrics.inc("proxy_udp_dropped_total", UDP_UPSTREAM_LABELS)
+                logging.warning(f"[UDP] DROP paket dari {clientAddress[0]}:{clientAddress[1]} (buffer upstream penuh)")
+            except OSError as e:
+                logging.error(f"[UDP] Error forwarding UDP: {e}")
+
+    def readUDPUpstream(self, udpSocket: socket.socket, session: UdpSession):
+        clientIP, clientPort = session.clientAddress[:2]
+        for _ in range(UDP_RECV_BATCH):
+            try:
+                resp = session.upstream.recv(65535)
+            except (BlockingIOError, InterruptedError):
+                return
+            except ConnectionRefusedError:
+                logging.warning(f"[UDP] Web Server UDP menolak paket dari {clientIP}:{clientPort}")
+                continue
+            except OSError as e:
+                logging.error(f"[UDP] Error menerima dari Web Server: {e}")
+                return
 
-            # Forward ke Web Server
+            session.markReceived(len(resp))
             try:
-                upstreamSock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-                upstreamSock.settimeout(SOCKET_TIMEOUT)
+                udpSocket.sendto(resp, session.clientAddress)
+            except (BlockingIOError, InterruptedError):
+                self.metrics.inc("proxy_udp_dropped_total", UDP_DOWNSTREAM_LABELS)
+                logging.warning(f"[UDP] DROP balasan ke {clientIP}:{clientPort} (buffer client penuh)")
+                continue
+            except OSError as e:
+                logging.error(f"[UDP] Error mengirim balasan ke {clientIP}:{clientPort}: {e}")
+                continue
 
-                upstreamSock.sendto(data, (WEB_SERVER_HOST, WEB_SERVER_UDP_PORT))
+            replyTime = time.monotonic() - session.lastSent
+            self.metrics.inc("proxy_udp_packets_total", UDP_DOWNSTREAM_LABELS)
+            self.metrics.inc("proxy_udp_bytes_total", UDP_DOWNSTREAM_LABELS, len(resp))
+            self.metrics.observe("proxy_udp_reply_seconds", (), replyTime)
 
-                # Tunggu balasan dari server
-                try:
-                    resp, server_addr = upstreamSock.recvfrom(65535)
-                    udpSocket.sendto(resp, clientAddress)
+            # Log per paket di level DEBUG supaya tidak membatasi throughput
+            logging.debug(
+                f"[UDP] FORWARD | {clientIP}:{clientPort} -> "
+                f"{session.upstreamAddress[0]}:{session.upstreamAddress[1]} "
+                f"| resp={len(resp)}B | t={replyTime:.4f}s"
+            )
 
-                    elapsed = time.time() - recv_time
+    def openUDPSession(self, clientAddress, selector) -> UdpSession:
+        # Backend dipilih sekali per session (policy hash memakai alamat client)
+        backend = self.backends.choose(f"{clientAddress[0]}:{clientAddress[1]}")
+        if backend is None:
+            raise OSError("Tidak ada backend yang sehat")
 
-                    logging.info(
-                        f"[UDP] FORWARD | {clientIP}:{clientPort} -> "
-                        f"{WEB_SERVER_HOST}:{WEB_SERVER_UDP_PORT} "
-                        f"| size={len(data)}B, resp={len(resp)}B | t={elapsed:.4f}s"
-                    )
-                except socket.timeout:
-                    # Tidak ada response dari server, maka tidak ada retransmission
-                    logging.warning(
-                        f"[UDP] TIMEOUT balasan dari server untuk {clientIP}:{clientPort} "
-                        f"(tidak ada retransmission)"
-                    )
-                finally:
-                    upstreamSock.close()
+        upstreamSock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            upstreamSock.setblocking(False)
+            # connect() supaya kernel hanya menerima balasan dari Web Server ini
+            upstreamSock.connect((backend.host, backend.udpPort))
+        except OSError:
+            upstreamSock.close()
+            raise
+
+        session = UdpSession(clientAddress, backend, upstreamSock)
+        self.backends.acquire(backend)
+        for old in self.udpSessions.add(session):
+            self.closeUDPSession(old, selector, "evicted")
+        selector.register(upstreamSock, selectors.EVENT_READ, session)
+
+        logging.info(
+            f"[UDP] SESSION baru | {clientAddress[0]}:{clientAddress[1]} -> "
+            f"{backend.host}:{backend.udpPort} | aktif={len(self.udpSessions.sessions)}"
+        )
+        return session
+
+    def closeUDPSession(self, session: UdpSession, selector, reason: str):
+        try:
+            selector.unregister(session.upstream)
+        except (KeyError, ValueError):
+            pass
+        session.upstream.close()
+        self.backends.release(session.backend)
+        logUdpSessionClosed(session, reason)
+
+
+    # BAGIAN ASYNCIO
+    # Satu event loop melayani semua client TCP/UDP dan koneksi upstream,
+    # perilaku cache dan error (400/502/504) sama dengan engine thread
+
+    async def runAsync(self):
+        loop = asyncio.get_running_loop()
+
+        tcpServer = await asyncio.start_server(
+            self.handleTCPClientAsync,
+            PROXY_HOST, PROXY_TCP_PORT,
+            reuse_address=True,
+            backlog=1024,
+            limit=65536,
+        )
+        logging.info(f"[TCP] Proxy TCP (asyncio) berjalan di {PROXY_HOST}:{PROXY_TCP_PORT}")
+
+        udpSocket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        setUdpBuffers(udpSocket)
+        udpSocket.bind((PROXY_HOST, PROXY_UDP_PORT))
+        udpTransport, _ = await loop.create_datagram_endpoint(
+            lambda: UDPProxyProtocol(self),
+            sock=udpSocket,
+        )
+        logging.info(f"[UDP] Proxy UDP (asyncio) berjalan di {PROXY_HOST}:{PROXY_UDP_PORT}")
+
+        try:
+            async with tcpServer:
+                await tcpServer.serve_forever()
+        finally:
+            udpTransport.close()
 
+    async def handleTCPClientAsync(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        startTime = time.time()
+        clientIP, clientPort = writer.get_extra_info("peername")[:2]
+
+        try:
+            rawRequest = await self.recvHTTPRequestAsync(reader)
+            if not rawRequest:
+                logging.warning(f"[TCP] Empty request dari {clientIP}:{clientPort}")
+                return
+
+            try:
+                method, path, version, requestHeaders = parseHTTPRequest(rawRequest)
+            except Exception as e:
+                logging.warning(f"[TCP] Gagal parse request dari {clientIP}:{clientPort}: {e}")
+                await self.sendHTTPErrorAsync(writer, "400 Bad Request", "Invalid HTTP request")
+                self.recordRequest("NONE", 400, startTime)
+                return
+
+            cacheKey = makeCacheKey(method, path, requestHeaders)
+
+            # Cek cache (hanya GET). Entry stale langsung dilayani, revalidasi jalan di background
+            cachedResponse, cacheState = await self.cache.getAsync(cacheKey) if method == "GET" else (None, None)
+
+            if cachedResponse:
+                cacheStatus = "HIT" if cacheState == "fresh" else "STALE"
+                if cacheState == "stale":
+                    self.scheduleRefresh(cacheKey, rawRequest, path)
+                writer.write(cachedResponse)
+                await asyncio.wait_for(writer.drain(), SOCKET_TIMEOUT)
+                elapsed = time.time() - startTime
+                logging.info(
+                    f"[TCP] {cacheStatus} | {clientIP}:{clientPort} -> cache {method} {path} "
+                    f"| size={len(cachedResponse)}B | t={elapsed:.4f}s"
+                )
+                self.recordRequest(cacheStatus, responseStatus(cachedResponse), startTime)
+                return
+
+            cacheStatus = "MISS"
+            progress = {"headSent": False, "bytes": 0, "backend": None, "status": None}
+
+            try:
+                if method == "GET":
+                    responseData, shared = await self.inflight.do(
+                        cacheKey,
+                        lambda release: self.streamUpstreamAsync(writer, rawRequest, method, path, cacheKey,
+                                                                 progress, release)
+                    )
+                    if shared:
+                        cacheStatus = "MISS-SHARED"
+                        if responseData is not None:
+                            writer.write(responseData)
+                            await asyncio.wait_for(writer.drain(), SOCKET_TIMEOUT)
+                            progress["bytes"] = len(responseData)
+                            progress["status"] = responseStatus(responseData)
+                        else:
+                            # Response leader tidak di-cache (terlalu besar / tidak bisa di-cache), stream sendiri
+                            await self.streamUpstreamAsync(writer, rawRequest, method, path, None, progress)
+                else:
+                    await self.streamUpstreamAsync(writer, rawRequest, method, path, None, progress)
+            except ConnectionAbortedError:
+                logging.warning(f"[TCP] Client {clientIP}:{clientPort} menutup koneksi di tengah response {path}")
+                # 499 = client menutup koneksi (konvensi nginx)
+                self.recordRequest(cacheStatus, 499, startTime)
+                return
+            except asyncio.TimeoutError:
+                logging.error(f"[TCP] Timeout koneksi ke Web Server dari {clientIP}:{clientPort}")
+                if not progress["headSent"]:
+                    await self.sendStaleOrErrorAsync(writer, (clientIP, clientPort), method, path, cacheKey,
+                                                     "504 Gateway Timeout",
+                                                     "Gateway Timeout when contacting upstream server",
+                                                     cacheStatus, startTime)
+                else:
+                    self.recordRequest(cacheStatus, progress["status"], startTime)
+                return
             except OSError as e:
-                logging.error(f"[UDP] Error forwarding UDP: {e}")
+                logging.error(f"[TCP] Error koneksi ke Web Server: {e}")
+                if not progress["headSent"]:
+                    await self.sendStaleOrErrorAsync(writer, (clientIP, clientPort), method, path, cacheKey,
+                                                     "502 Bad Gateway",
+                                                     "Bad Gateway when contacting upstream server",
+                                                     cacheStatus, startTime)
+                else:
+                    self.recordRequest(cacheStatus, progress["status"], startTime)
+                return
+
+            elapsed = time.time() - startTime
+
+            upstreamName = progress["backend"].name if progress["backend"] else "single-flight"
+            logging.info(
+                f"[TCP] {cacheStatus} | {clientIP}:{clientPort} -> "
+                f"{upstreamName} {method} {path} "
+                f"| size={progress['bytes']}B | t={elapsed:.4f}s"
+            )
+            self.recordRequest(cacheStatus, progress["status"], startTime)
+
+        except (OSError, asyncio.TimeoutError) as e:
+            # Error di sisi client (koneksi putus / lambat)
+            logging.warning(f"[TCP] Koneksi client {clientIP}:{clientPort} bermasalah: {e!r}")
+        finally:
+            writer.close()
+
+    async def recvHTTPRequestAsync(self, reader: asyncio.StreamReader) -> bytes:
+        # Menerima HTTP request sampai header selesai atau timeout
+        try:
+            return await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), SOCKET_TIMEOUT)
+        except asyncio.IncompleteReadError as e:
+            return e.partial
+        except asyncio.LimitOverrunError:
+            try:
+                return await asyncio.wait_for(reader.read(65536), SOCKET_TIMEOUT)
+            except asyncio.TimeoutError:
+                return b""
+        except asyncio.TimeoutError:
+            # Kalau timeout saat baca request, anggap request kosong
+            return b""
+
+    async def sendHTTPErrorAsync(self, writer: asyncio.StreamWriter, status: str, message: str):
+        try:
+            writer.write(buildHTTPError(status, message))
+            await asyncio.wait_for(writer.drain(), SOCKET_TIMEOUT)
+        except (OSError, asyncio.TimeoutError):
+            pass
+
+    async def sendStaleOrErrorAsync(self, writer: asyncio.StreamWriter, clientAddress, method: str, path: str,
+                                    cacheKey, status: str, message: str, cacheStatus: str, startTime: float):
+        staleResponse = self.cache.getStaleIfError(cacheKey) if method == "GET" else None
+        if staleResponse is None:
+            await self.sendHTTPErrorAsync(writer, status, message)
+            self.recordRequest(cacheStatus, int(status.split()[0]), startTime)
+            return
+
+        self.recordRequest("STALE-IF-ERROR", responseStatus(staleResponse), startTime)
+
+        try:
+            writer.write(staleResponse)
+            await asyncio.wait_for(writer.drain(), SOCKET_TIMEOUT)
+        except (OSError, asyncio.TimeoutError):
+            return
+        logging.info(
+            f"[TCP] STALE-IF-ERROR | {clientAddress[0]}:{clientAddress[1]} -> cache {method} {path} "
+            f"| size={len(staleResponse)}B | upstream={status}"
+        )
+
+    async def refreshEntryAsync(self, cacheKey, request: bytes, path: str):
+        parts = []
+        progress = {"backend": None}
+
+        async def onHead(head, statusCode, headers):
+            parts.append(clientResponseHead(head, headers))
+
+        async def onChunk(chunk):
+            parts.append(chunk)
+
+        try:
+            await self.forwardToBackendAsync(request, "GET", path, onHead, onChunk, progress)
+            self.finishRefresh(cacheKey, path, b"".join(parts), progress)
+        except Exception as e:
+            self.finishRefresh(cacheKey, path, None, progress, e)
+
+    # Versi asyncio dari forwardUpstream
+    async def forwardUpstreamAsync(self, rawRequest: bytes, method: str, host: str, port: int, onHead, onChunk):
+        pool = self.getUpstreamPool(host, port)
+        upstreamRequest = setHeader(rawRequest, "Connection", "keep-alive")
+
+        for attempt in range(2):
+            reader, upstreamWriter, reused = await pool.acquire()
+            headSeen = []
+
+            async def markHead(head, statusCode, headers):
+                headSeen.append(True)
+                await onHead(head, statusCode, headers)
+
+            try:
+                upstreamWriter.write(upstreamRequest)
+                await asyncio.wait_for(upstreamWriter.drain(), SOCKET_TIMEOUT)
+                reusable = await relayHTTPResponseAsync(reader, method, markHead, onChunk)
+            except ConnectionAbortedError:
+                pool.discard(upstreamWriter)
+                raise
+            except ConnectionError as e:
+                pool.discard(upstreamWriter)
+                if reused and attempt == 0 and not headSeen and method in ("GET", "HEAD"):
+                    continue
+                raise OSError(f"Koneksi upstream terputus: {e}")
+            except BaseException:
+                pool.discard(upstreamWriter)
+                raise
+
+            if reusable is None:
+                pool.discard(upstreamWriter)
+                if reused and attempt == 0:
+                    continue
+                raise OSError("Upstream menutup koneksi tanpa response")
+
+            if reusable:
+                pool.release(reader, upstreamWriter)
+            else:
+                pool.discard(upstreamWriter)
+            return
+
+        raise OSError("Upstream menutup koneksi tanpa response")
+
+    # Versi asyncio dari forwardToBackend
+    async def forwardToBackendAsync(self, rawRequest: bytes, method: str, path: str, onHead, onChunk, progress: dict):
+        tried = []
+        while True:
+            backend = self.backends.choose(path, exclude=tried)
+            if backend is None:
+                if tried:
+                    raise lastError
+                raise OSError("Tidak ada backend yang sehat")
+            tried.append(backend)
+            progress["backend"] = backend
+            statusSeen = []
+
+            async def markHead(head, statusCode, headers):
+                statusSeen.append(statusCode)
+                await onHead(head, statusCode, headers)
+
+            self.backends.acquire(backend)
+            backendLabels = (("backend", backend.name),)
+            upstreamStart = time.time()
+            try:
+                await self.forwardUpstreamAsync(rawRequest, method, backend.host, backend.tcpPort, markHead, onChunk)
+            except ConnectionAbortedError:
+                raise
+            except (OSError, asyncio.TimeoutError) as e:
+                self.backends.markFailure(backend)
+                self.metrics.inc("proxy_upstream_requests_total", backendLabels + (("result", "error"),))
+                if statusSeen or method not in ("GET", "HEAD") or len(tried) >= BACKEND_MAX_TRIES:
+                    raise
+                logging.warning(f"[LB] {method} {path} gagal di {backend.name} ({e!r}), coba backend lain")
+                lastError = e
+                continue
+            finally:
+                self.backends.release(backend)
+
+            self.metrics.observe("proxy_upstream_duration_seconds", backendLabels, time.time() - upstreamStart)
+            if statusSeen and statusSeen[0] in (502, 503, 504):
+                self.backends.markFailure(backend)
+                self.metrics.inc("proxy_upstream_requests_total", backendLabels + (("result", "5xx"),))
+            else:
+                self.backends.markSuccess(backend)
+                self.metrics.inc("proxy_upstream_requests_total", backendLabels + (("result", "ok"),))
+            return
+
+    # Versi asyncio dari streamUpstream (stream ke client + tee ke cache)
+    async def streamUpstreamAsync(self, writer: asyncio.StreamWriter, rawRequest: bytes, method: str, path: str,
+                                  cacheKey, progress: dict, release=None):
+        tee = [] if cacheKey is not None else None
+        teeSize = 0
+        clientOpen = True
+
+        async def sendToClient(data: bytes):
+            nonlocal clientOpen
+            if not clientOpen:
+                return
+            try:
+                writer.write(data)
+                await asyncio.wait_for(writer.drain(), SOCKET_TIMEOUT)
+                progress["bytes"] += len(data)
+            except (OSError, asyncio.TimeoutError):
+                # Client pergi; kalau masih tee ke cache, body tetap dibaca sampai habis
+                clientOpen = False
+
+        def dropTee():
+            nonlocal tee
+            if tee is not None and release is not None:
+                release()
+            tee = None
+
+        def keepTee(data: bytes):
+            nonlocal teeSize
+            if tee is None:
+                return
+            teeSize += len(data)
+            if teeSize > self.cacheMaxObject:
+                dropTee()
+            else:
+                tee.append(data)
+
+        async def onHead(head, statusCode, headers):
+            if statusCode in (500, 502, 503, 504) and cacheKey is not None and self.cache.hasStaleIfError(cacheKey):
+                raise OSError(f"Upstream membalas {statusCode}")
+            head = clientResponseHead(head, headers)
+            if not self.isTeeable(statusCode, headers):
+                dropTee()
+            keepTee(head)
+            progress["headSent"] = True
+            progress["status"] = statusCode
+            await sendToClient(head)
+
+        async def onChunk(chunk):
+            keepTee(chunk)
+            await sendToClient(chunk)
+            if not clientOpen and tee is None:
+                raise ConnectionAbortedError("Client menutup koneksi")
+
+        await self.forwardToBackendAsync(rawRequest, method, path, onHead, onChunk, progress)
+
+        if tee is None:
+            return None
+        responseData = b"".join(tee)
+        self.cache.put(cacheKey, responseData)
+        return responseData
+
+    def logStats(self):
+        for (host, port), pool in self.upstreamPools.items():
+            pst = pool.stats()
+            logging.info(
+                f"Upstream {host}:{port}: idle={pst['idle']} | created={pst['created']} | "
+                f"reused={pst['reused']} | discarded={pst['discarded']}"
+            )
+        for bst in self.backends.stats():
+            logging.info(
+                f"Backend {bst['backend']}: available={bst['available']} | requests={bst['requests']} | "
+                f"errors={bst['errors']} | ejections={bst['ejections']}"
+            )
+        ust = self.udpSessions.stats()
+        logging.info(
+            f"UDP sessions: active={ust['active']} | opened={ust['opened']} | "
+            f"expired={ust['expired']} | evicted={ust['evicted']}"
+        )
+        sst = self.inflight.stats()
+        logging.info(f"Single-flight: leaders={sst['leaders']} | shared={sst['shared']}")
+        st = self.cache.stats()
+        logging.info(
+            f"Cache: entries={st['entries']} | bytes={st['bytes']} | hits={st['hits']} | "
+            f"disk_hits={st['disk_hits']} | stale_hits={st['stale_hits']} | stale_if_error={st['stale_if_error']} | "
+            f"misses={st['misses']} | evictions={st['evictions']} | "
+            f"expirations={st['expirations']} | uncacheable={st['uncacheable']}"
+        )
+        logging.info(
+            f"Refresh: updated={self.refreshUpdated} | not_modified={self.refreshNotModified} | "
+            f"failed={self.refreshFailed}"
+        )
+        if self.cache.diskCache is not None:
+            dst = self.cache.diskCache.stats()
+            logging.info(
+                f"Disk cache: entries={dst['entries']} | bytes={dst['bytes']} | file_bytes={dst['file_bytes']} | "
+                f"hits={dst['hits']} | misses={dst['misses']} | writes={dst['writes']} | "
+                f"evictions={dst['evictions']} | compactions={dst['compactions']} | "
+                f"touches={dst['touches']} | dropped_writes={dst['dropped_writes']}"
+            )
+
+
+# Socket UDP proxy (asyncio): tiap client punya session dengan transport upstream sendiri,
+# balasan upstream langsung dikirim balik ke client dari callback
+class UDPProxyProtocol(asyncio.DatagramProtocol):
+    def __init__(self, proxy: ProxyServer):
+        self.proxy = proxy
+        self.sessions = proxy.udpSessions
+        self.transport = None
+        self.sweeper = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.sweeper = asyncio.ensure_future(self.sweepSessions())
+
+    def connection_lost(self, exc):
+        if self.sweeper is not None:
+            self.sweeper.cancel()
+        for session in list(self.sessions.sessions.values()):
+            self.closeSession(session, "closed")
+
+    def datagram_received(self, data, addr):
+        session = self.sessions.get(addr)
+        if session is None:
+            session = self.openSession(addr)
+            if session is None:
+                return
+
+        if session.upstream is None:
+            # Endpoint upstream masih dibuat
+            session.pending.append(data)
+            return
+
+        session.upstream.sendto(data)
+        session.markSent(len(data))
+        self.proxy.metrics.inc("proxy_udp_packets_total", UDP_UPSTREAM_LABELS)
+        self.proxy.metrics.inc("proxy_udp_bytes_total", UDP_UPSTREAM_LABELS, len(data))
+
+    def error_received(self, exc):
+        logging.warning(f"[UDP] Error menerima dari client: {exc}")
+
+    def openSession(self, clientAddress):
+        backend = self.proxy.backends.choose(f"{clientAddress[0]}:{clientAddress[1]}")
+        if backend is None:
+            logging.error("[UDP] Error forwarding UDP: Tidak ada backend yang sehat")
+            return None
+
+        session = UdpSession(clientAddress, backend)
+        self.proxy.backends.acquire(backend)
+        for old in self.sessions.add(session):
+            self.closeSession(old, "evicted")
+        asyncio.ensure_future(self.connectSession(session))
+        return session
+
+    async def connectSession(self, session: UdpSession):
+        clientIP, clientPort = session.clientAddress[:2]
+        loop = asyncio.get_running_loop()
+        try:
+            upstream, _ = await loop.create_datagram_endpoint(
+                lambda: UDPUpstreamProtocol(self.transport, session, self.proxy.metrics),
+                remote_addr=session.upstreamAddress,
+            )
+        except OSError as e:
+            logging.error(f"[UDP] Error forwarding UDP: {e}")
+            if self.sessions.sessions.get(session.clientAddress) is session:
+                self.sessions.remove(session.clientAddress)
+                self.proxy.backends.release(session.backend)
+            return
+
+        if self.sessions.sessions.get(session.clientAddress) is not session:
+            # Session sudah dibuang sebelum upstream siap
+            upstream.close()
+            return
+
+        session.upstream = upstream
+        logging.info(
+            f"[UDP] SESSION baru | {clientIP}:{clientPort} -> "
+            f"{session.upstreamAddress[0]}:{session.upstreamAddress[1]} | aktif={len(self.sessions.sessions)}"
+        )
+        for data in session.pending:
+            upstream.sendto(data)
+            session.markSent(len(data))
+            self.proxy.metrics.inc("proxy_udp_packets_total", UDP_UPSTREAM_LABELS)
+            self.proxy.metrics.inc("proxy_udp_bytes_total", UDP_UPSTREAM_LABELS, len(data))
+        session.pending = []
+
+    def closeSession(self, session: UdpSession, reason: str):
+        if session.upstream is not None:
+            session.upstream.close()
+        self.proxy.backends.release(session.backend)
+        logUdpSessionClosed(session, reason)
+
+    async def sweepSessions(self):
+        while True:
+            await asyncio.sleep(UDP_SESSION_SWEEP_INTERVAL)
+            for session in self.sessions.expire():
+                self.closeSession(session, "expired")
+            for session in self.sessions.detachUnavailable():
+                self.closeSession(session, "backend down")
+
+
+# Sisi upstream sebuah session UDP: balasan Web Server diteruskan ke client
+class UDPUpstreamProtocol(asyncio.DatagramProtocol):
+    def __init__(self, clientTransport: asyncio.DatagramTransport, session: UdpSession, metrics: MetricsRegistry):
+        self.clientTransport = clientTransport
+        self.session = session
+        self.metrics = metrics
+
+    def datagram_received(self, data, addr):
+        session = self.session
+        replyTime = time.monotonic() - session.lastSent
+        session.markReceived(len(data))
+        self.clientTransport.sendto(data, session.clientAddress)
+        self.metrics.inc("proxy_udp_packets_total", UDP_DOWNSTREAM_LABELS)
+        self.metrics.inc("proxy_udp_bytes_total", UDP_DOWNSTREAM_LABELS, len(data))
+        self.metrics.observe("proxy_udp_reply_seconds", (), replyTime)
+
+        # Log per paket di level DEBUG supaya tidak membatasi throughput
+        logging.debug(
+            f"[UDP] FORWARD | {session.clientAddress[0]}:{session.clientAddress[1]} -> "
+            f"{session.upstreamAddress[0]}:{session.upstreamAddress[1]} "
+            f"| resp={len(data)}B | t={replyTime:.4f}s"
+        )
+
+    def error_received(self, exc):
+        clientIP, clientPort = self.session.clientAddress[:2]
+        logging.warning(f"[UDP] Web Server UDP menolak paket dari {clientIP}:{clientPort}: {exc}")
 
 
 # MAIN
 
-if __name__ == "__main__":
-    proxy = ProxyServer()
+def main():
+    parser = argparse.ArgumentParser(
+        description="Proxy TCP (HTTP + cache) dan UDP untuk Tugas Besar Jaringan Komputer"
+    )
+    parser.add_argument("--cache-size", type=int, default=CACHE_MAX_BYTES // (1024 * 1024),
+                        help="Budget cache HTTP dalam MB (default: 64)")
+    parser.add_argument("--cache-ttl", type=float, default=CACHE_DEFAULT_TTL,
+                        help="TTL default entry cache tanpa Cache-Control/Expires, detik (default: 60)")
+    parser.add_argument("--cache-max-object", type=int, default=CACHE_MAX_OBJECT_BYTES // (1024 * 1024),
+                        help="Ukuran response maksimum (MB) yang disimpan ke cache, lebih besar di-stream saja (default: 8)")
+    parser.add_argument("--stale-grace", type=float, default=CACHE_STALE_GRACE,
+                        help="Detik entry kedaluwarsa tetap dilayani sambil di-revalidate di background (default: 30)")
+    parser.add_argument("--stale-if-error", type=float, default=CACHE_STALE_IF_ERROR,
+                        help="Detik entry kedaluwarsa tetap dilayani saat upstream error (default: 300)")
+    parser.add_argument("--disk-cache", default=None, metavar="DIR",
+                        help="Aktifkan cache tier kedua di disk pada direktori ini (bertahan setelah restart)")
+    parser.add_argument("--disk-cache-size", type=int, default=DISK_CACHE_MAX_BYTES // (1024 * 1024),
+                        help="Budget cache disk dalam MB (default: 512)")
+    parser.add_argument("--engine", choices=["asyncio", "threads"], default="asyncio",
+                        help="Engine proxy: asyncio (satu event loop) atau threads (thread pool) (default: asyncio)")
+    parser.add_argument("--metrics-host", default=METRICS_HOST,
+                        help="Host admin port metrics (default: 127.0.0.1)")
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT,
+                        help="Port admin metrics (/metrics, /metrics.json); 0 = nonaktif (default: 9100)")
+    parser.add_argument("--backend", type=parseBackend, action="append", default=None,
+                        help="Web Server tujuan host:tcpPort[:udpPort], bisa diulang "
+                             f"(default: {WEB_SERVER_HOST}:{WEB_SERVER_TCP_PORT}:{WEB_SERVER_UDP_PORT})")
+    parser.add_argument("--lb-policy", choices=LB_POLICIES, default="roundrobin",
+                        help="Policy load balancing: roundrobin, leastconn, hash (path HTTP / alamat client UDP) "
+                             "(default: roundrobin)")
+    parser.add_argument("--health-interval", type=float, default=HEALTH_CHECK_INTERVAL,
+                        help="Interval health check aktif ke backend, detik; 0 = nonaktif (default: 2)")
+    parser.add_argument("--health-path", default=HEALTH_CHECK_PATH,
+                        help="Path yang di-GET untuk health check (default: /)")
+    args = parser.parse_args()
+
+    backends = BackendPool(
+        args.backend or [Backend(WEB_SERVER_HOST, WEB_SERVER_TCP_PORT, WEB_SERVER_UDP_PORT)],
+        args.lb_policy
+    )
+    if args.health_interval > 0:
+        backends.startHealthChecks(args.health_interval, args.health_path)
+
+    logging.info(
+        f"Backend ({args.lb_policy}): " + ", ".join(f"{b.name}/udp:{b.udpPort}" for b in backends.backends)
+    )
 
-    # Jalankan TCP dan UDP proxy di thread terpisah
-    tcp_thread = threading.Thread(target=proxy.startTCPProxy, daemon=True)
-    udp_thread = threading.Thread(target=proxy.startUDPProxy, daemon=True)
+    diskCache = None
+    if args.disk_cache:
+        diskCache = DiskCache(args.disk_cache, args.disk_cache_size * 1024 * 1024)
 
-    tcp_thread.start()
-    udp_thread.start()
+    proxy = ProxyServer(
+        args.cache_size * 1024 * 1024,
+        args.cache_ttl,
+        args.cache_max_object * 1024 * 1024,
+        args.engine,
+        backends,
+        diskCache,
+        args.stale_grace,
+        args.stale_if_error
+    )
 
-    logging.info("Proxy Server berjalan (TCP dan UDP). Tekan Ctrl+C untuk berhenti.")
+    if args.metrics_port:
+        threading.Thread(
+            target=proxy.startMetricsServer,
+            args=(args.metrics_host, args.metrics_port),
+            name="Metrics-Admin",
+            daemon=True
+        ).start()
 
     try:
-        while True:
-            time.sleep(1)
+        if args.engine == "asyncio":
+            logging.info("Proxy Server berjalan (TCP dan UDP, asyncio). Tekan Ctrl+C untuk berhenti.")
+            asyncio.run(proxy.runAsync())
+        else:
+            # Jalankan TCP dan UDP proxy di thread terpisah
+            tcp_thread = threading.Thread(target=proxy.startTCPProxy, daemon=True)
+            udp_thread = threading.Thread(target=proxy.startUDPProxy, daemon=True)
+
+            tcp_thread.start()
+            udp_thread.start()
+
+            logging.info("Proxy Server berjalan (TCP dan UDP). Tekan Ctrl+C untuk berhenti.")
+
+            while True:
+                time.sleep(1)
     except KeyboardInterrupt:
-        logging.info("Proxy Server dihentikan.")
\ No newline at end of file
+        proxy.logStats()
+        if diskCache is not None:
+            diskCache.close()
+        logging.info("Proxy Server dihentikan.")
+
+
+if __name__ == "__main__":
+    main()
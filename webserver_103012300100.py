@@ -1,11 +1,20 @@
 import socket
 import threading
+import asyncio
+import queue
+import signal
 import os
 import time
 import logging
 import mimetypes
 import argparse
+import json
+import sys
+import stat
+import gzip
+from collections import OrderedDict
 from datetime import datetime
+from email.utils import formatdate, parsedate_to_datetime
 
 # konstanta, bakal diubah sesuai kebutuhan
 DOCUMENT_ROOT = "./www"      # buat akses ke source
@@ -13,6 +22,43 @@ HTTP_PORT_DEFAULT = 8000
 UDP_PORT_DEFAULT = 9000
 clientSocket_TIMEOUT = 5.0  
 
+# Mode pool: jumlah worker tetap + antrean koneksi terbatas
+POOL_WORKERS_DEFAULT = 16
+POOL_QUEUE_DEFAULT = 128
+POOL_RETRY_AFTER = 1          # detik, dikirim di header Retry-After saat 503
+POOL_STATS_INTERVAL = 10.0    # detik, interval log statistik pool
+
+# Cache file statis di memori
+FILE_CACHE_MAX_BYTES = 64 * 1024 * 1024   # budget total isi file yang di-cache
+FILE_CACHE_REVALIDATE = 1.0               # detik antar cek stat(); 0 = cek tiap request
+SENDFILE_THRESHOLD = 1024 * 1024          # file >= ini dikirim zero-copy via sendfile, tidak di-cache
+
+# Kompresi gzip (Accept-Encoding)
+GZIP_CACHE_MAX_BYTES = 16 * 1024 * 1024   # budget varian terkompresi; 0 = gzip nonaktif
+GZIP_MIN_SIZE = 256                       # file lebih kecil dari ini tidak dikompres
+GZIP_LEVEL = 6
+COMPRESSIBLE_TYPES = (
+    "application/javascript",
+    "application/json",
+    "application/xml",
+    "image/svg+xml",
+)
+
+# Access log asinkron: format + tulis di thread terpisah
+ACCESS_LOG_QUEUE_SIZE = 10000   # record yang menunggu ditulis; kalau penuh record dibuang
+ACCESS_LOG_DROP_REPORT = 10.0   # detik, interval laporan record yang dibuang
+
+# UDP Echo
+UDP_BUFFER_SIZE = 65535
+UDP_STATS_INTERVAL = 10.0      # detik, interval log counter UDP Echo
+
+# Prefork: beberapa proses worker berbagi port lewat SO_REUSEPORT
+WORKER_RESTART_BACKOFF = 1.0   # detik, jeda restart kalau worker langsung mati setelah start
+
+# HTTP/1.1 persistent connection
+KEEPALIVE_TIMEOUT = 5.0        # detik, batas idle menunggu request berikutnya
+KEEPALIVE_MAX_REQUESTS = 100   # maksimum request per koneksi sebelum ditutup
+
 
 # Format timestamp dengan milidetik
 def formatTimestamp(timeStamp: float) -> str:
@@ -30,47 +76,130 @@ def prepLogging():
 
 
 # Persipan reponse HTTP
-def prepHttpResponse(statusCode: int, body: bytes, contentType: str = "text/plain"):
+def prepHttpResponse(statusCode: int, body: bytes, contentType: str = "text/plain",
+                     extraHeaders: dict = None, headerBlock: bytes = None, keepAlive: bool = False):
+    # headerBlock = header yang sudah dibangun sebelumnya (dari cache file)
+    if headerBlock is None:
+        headerBlock = buildHeaderBlock(statusCode, contentType, len(body), extraHeaders)
+    return headerBlock + connectionHeader(keepAlive) + body
+
+
+# Header Connection + baris kosong penutup header
+def connectionHeader(keepAlive: bool) -> bytes:
+    if keepAlive:
+        return (
+            f"Connection: keep-alive\r\n"
+            f"Keep-Alive: timeout={int(KEEPALIVE_TIMEOUT)}, max={KEEPALIVE_MAX_REQUESTS}\r\n"
+            f"\r\n"
+        ).encode("utf-8")
+    return b"Connection: close\r\n\r\n"
+
+
+# Status line + header entity, tanpa header Connection dan baris kosong penutup
+# contentType / contentLength None = header tidak dikirim (misal untuk 304)
+def buildHeaderBlock(statusCode: int, contentType: str, contentLength: int, extraHeaders: dict = None) -> bytes:
     # Standar pesan kayak API RESPONSE "Postman"
     messageCons = {
         200: "OK",
+        206: "Partial Content",
+        304: "Not Modified",
+        400: "Bad Request",
         404: "Not Found",
+        416: "Range Not Satisfiable",
         500: "Internal Server Error",
+        503: "Service Unavailable",
     }
     message = messageCons.get(statusCode, "OK")
-    headers = [
-        f"HTTP/1.1 {statusCode} {message}",
-        f"Content-Type: {contentType}",
-        f"Content-Length: {len(body)}",
-        "Connection: close",
-        "",
-        ""
-    ]
-    byteHeader = "\r\n".join(headers).encode("utf-8")
-    return byteHeader + body
+    headers = [f"HTTP/1.1 {statusCode} {message}"]
+    if contentType is not None:
+        headers.append(f"Content-Type: {contentType}")
+    if contentLength is not None:
+        headers.append(f"Content-Length: {contentLength}")
+    for name, value in (extraHeaders or {}).items():
+        headers.append(f"{name}: {value}")
+    headers.append("")
+    return "\r\n".join(headers).encode("utf-8")
 
 # Baca HTTP request dari client socket
-def readHttpRequest(conn: socket.socket) -> str:
+# pending = sisa data dari request sebelumnya (pipelining), idle = menunggu request berikutnya
+# Return (header request, sisa buffer setelah header)
+def readHttpRequest(conn: socket.socket, pending: bytes = b"", idle: bool = False):
     # Set batas waktu maksimum menunggu data dari client
-    conn.settimeout(clientSocket_TIMEOUT)
+    conn.settimeout(KEEPALIVE_TIMEOUT if idle else clientSocket_TIMEOUT)
 
-    buffer = b""
+    buffer = pending
     try:
         # atau ukuran header mencapai batas maksimum (8 KB)
         while b"\r\n\r\n" not in buffer and len(buffer) < 8192:
-            received = conn.recv(1024)
+            received = conn.recv(4096)
             if not received:
                 break
             buffer += received
 
     except socket.timeout:
-        logging.warning("Waktu tunggu habis saat menerima request HTTP")
+        # Idle di koneksi keep-alive itu normal, bukan error
+        if buffer or not idle:
+            logging.warning("Waktu tunggu habis saat menerima request HTTP")
 
     except Exception as err:
         logging.error(f"Terjadi kesalahan saat menerima request: {err}")
 
+    headerEnd = buffer.find(b"\r\n\r\n")
+    if headerEnd == -1:
+        rawRequest, rest = buffer, b""
+    else:
+        rawRequest, rest = buffer[:headerEnd + 4], buffer[headerEnd + 4:]
+
     # Decode byte ke string tanpa memicu error karakter
-    return buffer.decode("iso-8859-1", errors="replace")
+    return rawRequest.decode("iso-8859-1", errors="replace"), rest
+
+
+# Content-Length request, None kalau tidak valid (negatif / bukan angka)
+def parseContentLength(requestHeaders: dict):
+    value = requestHeaders.get("content-length", "0").strip()
+    if not (value.isascii() and value.isdigit()):
+        return None
+    return int(value)
+
+
+# Buang body request (sepanjang Content-Length) supaya request berikutnya tetap sejajar
+def discardRequestBody(conn: socket.socket, pending: bytes, remaining: int) -> bytes:
+    if len(pending) >= remaining:
+        return pending[remaining:]
+
+    remaining -= len(pending)
+    while remaining > 0:
+        received = conn.recv(min(remaining, 65536))
+        if not received:
+            break
+        remaining -= len(received)
+    return b""
+
+
+# Ambil header request jadi dict (nama header huruf kecil)
+def parsRequestHeaders(rawRequest: str) -> dict:
+    requestHeaders = {}
+    for line in rawRequest.split("\r\n")[1:]:
+        name, sep, value = line.partition(":")
+        if sep:
+            requestHeaders[name.strip().lower()] = value.strip()
+    return requestHeaders
+
+
+# HTTP/1.1 default keep-alive, HTTP/1.0 hanya kalau minta "Connection: keep-alive"
+def wantsKeepAlive(rawRequest: str, requestHeaders: dict) -> bool:
+    if not rawRequest.endswith("\r\n\r\n"):
+        return False
+
+    tokens = rawRequest.split("\r\n", 1)[0].split()
+    version = tokens[2] if len(tokens) >= 3 else "HTTP/1.0"
+    connection = requestHeaders.get("connection", "").lower()
+
+    if "close" in connection:
+        return False
+    if version == "HTTP/1.1":
+        return True
+    return "keep-alive" in connection
 
 
 # Ngambil path
@@ -91,68 +220,672 @@ def parsRequestPath(rawRequest: str) -> str:
     return urlPath
 
 
-# Ambil file (kode_status, isi_file_dalam_bytes, tipe_konten, ukuran_file_bytes)
-def getFileContent(path: str):
+# Cache file statis: LRU dengan budget byte, divalidasi ulang pakai mtime/size dari stat()
+class StaticFileCache:
+    def __init__(self, maxBytes: int = FILE_CACHE_MAX_BYTES, revalidateInterval: float = FILE_CACHE_REVALIDATE,
+                 sendfileThreshold: int = SENDFILE_THRESHOLD):
+        self.maxBytes = maxBytes
+        self.revalidateInterval = revalidateInterval
+        self.sendfileThreshold = sendfileThreshold
+        self.entries = OrderedDict()   # fullPath -> entry (urutan = LRU)
+        self.totalBytes = 0
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, fullPath: str):
+        with self.lock:
+            entry = self.entries.get(fullPath)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(fullPath)
+
+        # Cek ulang ke disk hanya kalau interval revalidasi sudah lewat
+        now = time.monotonic()
+        if now - entry["checkedAt"] >= self.revalidateInterval:
+            try:
+                st = os.stat(fullPath)
+            except OSError:
+                self.invalidate(fullPath)
+                return None
+
+            if st.st_mtime_ns != entry["mtime"] or st.st_size != entry["size"]:
+                self.invalidate(fullPath)
+                return None
+            entry["checkedAt"] = now
+
+        with self.lock:
+            self.hits += 1
+        return entry
+
+    def put(self, fullPath: str, entry: dict):
+        size = entry["size"]
+        if size > self.maxBytes:
+            return
+
+        with self.lock:
+            old = self.entries.pop(fullPath, None)
+            if old is not None:
+                self.totalBytes -= old["size"]
+
+            # Buang entry paling lama dipakai sampai muat
+            while self.entries and self.totalBytes + size > self.maxBytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.totalBytes -= evicted["size"]
+                self.evictions += 1
+
+            self.entries[fullPath] = entry
+            self.totalBytes += size
+
+    def invalidate(self, fullPath: str):
+        with self.lock:
+            old = self.entries.pop(fullPath, None)
+            if old is not None:
+                self.totalBytes -= old["size"]
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "bytes": self.totalBytes,
+                "max_bytes": self.maxBytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+fileCache = StaticFileCache()
+
+
+# Cache varian gzip, key = identitas file (path, mtime, size) + identitas file .gz di sebelahnya
+# jadi tidak perlu revalidasi; varian dari versi file lama otomatis tergeser LRU
+class CompressedVariantCache:
+    def __init__(self, maxBytes: int = GZIP_CACHE_MAX_BYTES):
+        self.maxBytes = maxBytes
+        self.entries = OrderedDict()   # (fullPath, mtime, size, (gzMtime, gzSize) | None) -> entry gzip
+        self.totalBytes = 0
+        self.lock = threading.Lock()
+
+    def get(self, key: tuple):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def put(self, key: tuple, entry: dict):
+        # Entry stream (dari file .gz besar) tidak memakan memori body
+        cost = len(entry["body"]) if entry["body"] is not None else 0
+        if cost > self.maxBytes:
+            return
+
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None and old["body"] is not None:
+                self.totalBytes -= len(old["body"])
+
+            while self.entries and self.totalBytes + cost > self.maxBytes:
+                _, evicted = self.entries.popitem(last=False)
+                if evicted["body"] is not None:
+                    self.totalBytes -= len(evicted["body"])
+
+            self.entries[key] = entry
+            self.totalBytes += cost
+
+
+gzipCache = CompressedVariantCache()
+
+
+def isCompressible(contentType: str) -> bool:
+    return contentType.startswith("text/") or contentType in COMPRESSIBLE_TYPES
+
+
+# Validator cache untuk conditional GET: ETag dari mtime+size, Last-Modified dari mtime
+# etagSuffix membedakan ETag varian gzip dari varian asli
+def makeValidators(mtime: int, size: int, contentType: str, etagSuffix: str = "") -> dict:
+    validators = {
+        "ETag": f'"{mtime:x}-{size:x}{etagSuffix}"',
+        "Last-Modified": formatdate(mtime / 1e9, usegmt=True),
+        "Accept-Ranges": "bytes",
+    }
+    if isCompressible(contentType):
+        validators["Vary"] = "Accept-Encoding"
+    return validators
+
+
+def makeFileEntry(status: int, body: bytes, contentType: str, mtime: int = 0, fullPath: str = None) -> dict:
+    validators = makeValidators(mtime, len(body), contentType) if status == 200 else {}
+    return {
+        "status": status,
+        "body": body,
+        "filePath": None,
+        "fullPath": fullPath,
+        "contentType": contentType,
+        "size": len(body),
+        "mtime": mtime,
+        "validators": validators,
+        "header": buildHeaderBlock(status, contentType, len(body), validators),
+        "checkedAt": time.monotonic(),
+    }
+
+
+# Entry untuk file besar: body tidak dibaca, isi dikirim langsung dari file descriptor
+def makeStreamEntry(fullPath: str, contentType: str, st: os.stat_result) -> dict:
+    validators = makeValidators(st.st_mtime_ns, st.st_size, contentType)
+    return {
+        "status": 200,
+        "body": None,
+        "filePath": fullPath,
+        "fullPath": fullPath,
+        "contentType": contentType,
+        "size": st.st_size,
+        "mtime": st.st_mtime_ns,
+        "validators": validators,
+        "header": buildHeaderBlock(200, contentType, st.st_size, validators),
+        "checkedAt": time.monotonic(),
+    }
+
+
+# Varian gzip dari entry asli: body terkompresi di memori, atau file .gz besar via sendfile
+def makeGzipEntry(entry: dict, body: bytes = None, gzPath: str = None, gzSize: int = 0,
+                  etagSuffix: str = "-gz") -> dict:
+    size = len(body) if body is not None else gzSize
+    validators = makeValidators(entry["mtime"], entry["size"], entry["contentType"], etagSuffix)
+    validators["Content-Encoding"] = "gzip"
+    return {
+        "status": 200,
+        "body": body,
+        "filePath": gzPath if body is None else None,
+        "fullPath": entry["fullPath"],
+        "contentType": entry["contentType"],
+        "size": size,
+        "mtime": entry["mtime"],
+        "validators": validators,
+        "header": buildHeaderBlock(200, entry["contentType"], size, validators),
+        "checkedAt": time.monotonic(),
+    }
+
+
+# Client menerima gzip kalau ada token gzip (atau *) dengan q > 0
+def acceptsGzip(requestHeaders: dict) -> bool:
+    for token in requestHeaders.get("accept-encoding", "").split(","):
+        coding, _, params = token.strip().partition(";")
+        if coding.strip().lower() not in ("gzip", "*"):
+            continue
+        params = params.replace(" ", "")
+        if params.startswith("q="):
+            try:
+                return float(params[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+
+# Pilih varian gzip kalau client mendukung: file .gz di sebelahnya dulu, kalau tidak ada kompres sekali lalu cache
+def negotiateEncoding(entry: dict, requestHeaders: dict) -> dict:
+    if (entry["status"] != 200 or gzipCache.maxBytes <= 0
+            or not isCompressible(entry["contentType"]) or not acceptsGzip(requestHeaders)):
+        return entry
+
+    gzPath = entry["fullPath"] + ".gz"
+    try:
+        gzStat = os.stat(gzPath)
+    except OSError:
+        gzStat = None
+    if gzStat is not None and not (stat.S_ISREG(gzStat.st_mode) and gzStat.st_mtime_ns >= entry["mtime"]):
+        gzStat = None
+
+    # File .gz yang diperbarui menghasilkan key (dan ETag) baru, varian lama tergeser LRU
+    gzIdentity = (gzStat.st_mtime_ns, gzStat.st_size) if gzStat is not None else None
+    key = (entry["fullPath"], entry["mtime"], entry["size"], gzIdentity)
+    variant = gzipCache.get(key)
+    if variant is not None:
+        return variant
+
+    try:
+        if gzStat is not None:
+            etagSuffix = f"-gz-{gzStat.st_mtime_ns:x}-{gzStat.st_size:x}"
+            if gzStat.st_size >= fileCache.sendfileThreshold:
+                variant = makeGzipEntry(entry, gzPath=gzPath, gzSize=gzStat.st_size, etagSuffix=etagSuffix)
+            else:
+                with open(gzPath, "rb") as f:
+                    variant = makeGzipEntry(entry, f.read(), etagSuffix=etagSuffix)
+        elif entry["body"] is not None and entry["size"] >= GZIP_MIN_SIZE:
+            variant = makeGzipEntry(entry, gzip.compress(entry["body"], GZIP_LEVEL, mtime=0))
+        else:
+            return entry
+    except OSError as e:
+        logging.error(f"Gagal menyiapkan varian gzip {gzPath}: {e}")
+        return entry
+
+    gzipCache.put(key, variant)
+    return variant
+
+
+NOT_FOUND_ENTRY = makeFileEntry(404, b"<h1>404 Not Found</h1>", "text/html")
+SERVER_ERROR_ENTRY = makeFileEntry(500, b"<h1>500 Internal Server Error</h1>", "text/html")
+BAD_REQUEST_ENTRY = makeFileEntry(400, b"<h1>400 Bad Request</h1>", "text/html")
+
+
+# Ambil entry file (status, body, contentType, size, header siap kirim), lewat cache
+def getStaticFile(path: str) -> dict:
     # Membersihkan path untuk mencegah akses ke direktori di luar root (directory traversal)
     safePath = os.path.normpath(path.lstrip("/"))
     fullPath = os.path.join(DOCUMENT_ROOT, safePath)
 
-    if not os.path.isfile(fullPath):
-        body = b"<h1>404 Not Found</h1>"
-        return 404, body, "text/html", len(body)
+    entry = fileCache.get(fullPath)
+    if entry is not None:
+        return entry
 
     try:
-        with open(fullPath, "rb") as f:
-            body = f.read()
+        st = os.stat(fullPath)
+    except OSError:
+        return NOT_FOUND_ENTRY
+    if not stat.S_ISREG(st.st_mode):
+        return NOT_FOUND_ENTRY
 
-        contentType, _ = mimetypes.guess_type(fullPath)
-        if contentType is None:
-            contentType = "application/octet-stream"
+    contentType, _ = mimetypes.guess_type(fullPath)
+    if contentType is None:
+        contentType = "application/octet-stream"
 
-        return 200, body, contentType, len(body)
+    # File besar lewat jalur zero-copy, tidak pernah dibaca ke memori
+    if st.st_size >= fileCache.sendfileThreshold:
+        return makeStreamEntry(fullPath, contentType, st)
+
+    try:
+        with open(fullPath, "rb") as f:
+            body = f.read()
 
     except Exception as e:
         logging.error(f"Gagal membaca file {fullPath}: {e}")
-        body = b"<h1>500 Internal Server Error</h1>"
-        return 500, body, "text/html", len(body)
+        return SERVER_ERROR_ENTRY
 
+    entry = makeFileEntry(200, body, contentType, st.st_mtime_ns, fullPath)
+    # Kalau file berubah saat dibaca, jangan disimpan ke cache
+    if len(body) == st.st_size:
+        fileCache.put(fullPath, entry)
+    return entry
 
-# Tnganin satu koneksi HTTP 
-def HandleHttpClient(conn: socket.socket, addr, modeTag: str, acceptedTime: float):
 
-    processStart = time.time()
-    try:
-        rawRequest = readHttpRequest(conn)
-        requestPath = parsRequestPath(rawRequest)
+# If-None-Match didahulukan, If-Modified-Since hanya dipakai kalau tidak ada If-None-Match
+def isNotModified(entry: dict, requestHeaders: dict) -> bool:
+    etag = entry["validators"]["ETag"]
 
-        status, payload, mime_type, payload_size = getFileContent(requestPath)
+    ifNoneMatch = requestHeaders.get("if-none-match")
+    if ifNoneMatch is not None:
+        tags = [tag.strip() for tag in ifNoneMatch.split(",")]
+        return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
 
-        httpResponse = prepHttpResponse(status, payload, mime_type)
-        sendBegin = time.time()
-        conn.sendall(httpResponse)
-        sendFinish = time.time()
+    ifModifiedSince = requestHeaders.get("if-modified-since")
+    if ifModifiedSince:
+        try:
+            since = parsedate_to_datetime(ifModifiedSince).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return entry["mtime"] // 1_000_000_000 <= since
 
-        endTime = sendFinish
-        processingDuration = endTime - processStart
-        connectionDuration = endTime - acceptedTime
+    return False
 
-        # Logging lengkap untuk keperluan analisis performa dan threading
-        logging.info(
+
+# Hasil parseByteRange untuk range yang valid tapi tidak bisa dipenuhi (416)
+RANGE_UNSATISFIABLE = "unsatisfiable"
+
+
+# Parse header Range (satu range byte saja). Return (start, end) inklusif,
+# None kalau header diabaikan (tidak valid), RANGE_UNSATISFIABLE kalau di luar ukuran file
+def parseByteRange(rangeHeader: str, size: int):
+    unit, _, spec = rangeHeader.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+
+    first, sep, last = spec.strip().partition("-")
+    first, last = first.strip(), last.strip()
+    if not sep or (first and not first.isdigit()) or (last and not last.isdigit()):
+        return None
+
+    if first == "":
+        # Suffix range: "bytes=-500" = 500 byte terakhir, "bytes=-0" tidak bisa dipenuhi
+        if last == "":
+            return None
+        suffix = int(last)
+        if suffix == 0 or size == 0:
+            return RANGE_UNSATISFIABLE
+        return max(0, size - suffix), size - 1
+
+    start = int(first)
+    # Range terbalik (start > end) tidak valid secara sintaks, jadi diabaikan
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        return RANGE_UNSATISFIABLE
+    end = min(int(last), size - 1) if last else size - 1
+    return start, end
+
+
+# Pilih response untuk request: entry apa adanya (200), 304, 206 atau 416
+def prepFileResponse(entry: dict, requestHeaders: dict) -> dict:
+    if entry["status"] != 200:
+        return entry
+
+    validators = entry["validators"]
+    if isNotModified(entry, requestHeaders):
+        return {
+            "status": 304,
+            "body": b"",
+            "filePath": None,
+            "size": 0,
+            "header": buildHeaderBlock(304, None, None, validators),
+        }
+
+    rangeHeader = requestHeaders.get("range")
+    if not rangeHeader:
+        return entry
+
+    # If-Range: range hanya dipakai kalau file belum berubah
+    ifRange = requestHeaders.get("if-range")
+    if ifRange and ifRange not in (validators["ETag"], validators["Last-Modified"]):
+        return entry
+
+    size = entry["size"]
+    byteRange = parseByteRange(rangeHeader, size)
+    if byteRange == RANGE_UNSATISFIABLE:
+        return {
+            "status": 416,
+            "body": b"",
+            "filePath": None,
+            "size": 0,
+            "header": buildHeaderBlock(416, entry["contentType"], 0, {"Content-Range": f"bytes */{size}"}),
+        }
+    if byteRange is None:
+        return entry
+
+    start, end = byteRange
+    length = end - start + 1
+    partialHeaders = dict(validators)
+    partialHeaders["Content-Range"] = f"bytes {start}-{end}/{size}"
+    body = entry["body"]
+    return {
+        "status": 206,
+        "body": body[start:end + 1] if body is not None else None,
+        "filePath": entry["filePath"],
+        "offset": start if body is None else 0,
+        "size": length,
+        "header": buildHeaderBlock(206, entry["contentType"], length, partialHeaders),
+    }
+
+
+# Kirim entry ke client. File besar: header dulu, lalu isi via socket.sendfile
+# (os.sendfile kalau tersedia, otomatis fallback ke send() kalau tidak)
+def sendFileEntry(conn: socket.socket, entry: dict, keepAlive: bool = False):
+    if entry["body"] is not None:
+        conn.sendall(prepHttpResponse(entry["status"], entry["body"], headerBlock=entry["header"], keepAlive=keepAlive))
+        return
+
+    conn.sendall(prepHttpResponse(entry["status"], b"", headerBlock=entry["header"], keepAlive=keepAlive))
+    with open(entry["filePath"], "rb") as f:
+        conn.sendfile(f, entry.get("offset", 0), entry["size"])
+
+
+# Versi asyncio dari sendFileEntry, pakai loop.sendfile (fallback read/write bawaan asyncio)
+async def sendFileEntryAsync(writer: asyncio.StreamWriter, entry: dict, keepAlive: bool = False):
+    if entry["body"] is not None:
+        writer.write(prepHttpResponse(entry["status"], entry["body"], headerBlock=entry["header"], keepAlive=keepAlive))
+        await asyncio.wait_for(writer.drain(), clientSocket_TIMEOUT)
+        return
+
+    writer.write(prepHttpResponse(entry["status"], b"", headerBlock=entry["header"], keepAlive=keepAlive))
+    await asyncio.wait_for(writer.drain(), clientSocket_TIMEOUT)
+    with open(entry["filePath"], "rb") as f:
+        await asyncio.get_running_loop().sendfile(writer.transport, f, entry.get("offset", 0), entry["size"])
+
+
+# Ambil file (kode_status, isi_file_dalam_bytes, tipe_konten, ukuran_file_bytes)
+def getFileContent(path: str):
+    entry = getStaticFile(path)
+    body = entry["body"]
+    if body is None:
+        with open(entry["filePath"], "rb") as f:
+            body = f.read()
+    return entry["status"], body, entry["contentType"], entry["size"]
+
+
+# Pipeline access log: hot path cuma memasukkan field mentah ke antrean,
+# thread writer yang memformat (teks atau JSON lines) dan menulis.
+# sampleEvery = tulis 1 dari N record, errorsOnly = hanya record error; record error selalu ditulis
+class AccessLogPipeline:
+    def __init__(self, logFormat: str = "text", sampleEvery: int = 1, errorsOnly: bool = False,
+                 outputPath: str = None, queueSize: int = ACCESS_LOG_QUEUE_SIZE):
+        self.logFormat = logFormat
+        self.sampleEvery = max(1, sampleEvery)
+        self.errorsOnly = errorsOnly
+        self.outputPath = outputPath
+        self.pending = queue.Queue(maxsize=queueSize)
+
+        self.output = None
+        self.writer = None
+        self.seen = 0
+        self.dropped = 0
+
+    def start(self):
+        if self.outputPath:
+            self.output = open(self.outputPath, "a", buffering=1024 * 1024, encoding="utf-8")
+        elif self.logFormat == "json":
+            self.output = sys.stderr
+
+        self.writer = threading.Thread(target=self.writerLoop, daemon=True, name="Access-Log-Writer")
+        self.writer.start()
+
+    def stop(self):
+        if self.writer is None:
+            return
+        self.pending.put(None)
+        self.writer.join(timeout=2.0)
+        self.writer = None
+        if self.output is not None and self.output is not sys.stderr:
+            self.output.close()
+
+    def submit(self, record: dict, isError: bool = False):
+        if self.sample(isError):
+            self.enqueue(record, isError)
+
+    # Cek sampling dulu supaya hot path bisa skip menyiapkan record sama sekali
+    def sample(self, isError: bool = False) -> bool:
+        if isError:
+            return True
+        if self.errorsOnly:
+            return False
+        if self.sampleEvery > 1:
+            # Counter tanpa lock: sampling tidak perlu presisi antar thread
+            self.seen += 1
+            return self.seen % self.sampleEvery == 0
+        return True
+
+    def enqueue(self, record: dict, isError: bool = False):
+        record["thread"] = threading.current_thread().name
+        record["error"] = isError
+
+        # Sebelum start() (misal dipanggil sebagai modul), tulis langsung
+        if self.writer is None:
+            self.write(record)
+            return
+
+        try:
+            self.pending.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def writerLoop(self):
+        reportedDrops = 0
+        lastReport = time.monotonic()
+        while True:
+            record = self.pending.get()
+            if record is None:
+                break
+            try:
+                self.write(record)
+            except Exception as err:
+                logging.error(f"Gagal menulis access log: {err}")
+
+            now = time.monotonic()
+            if self.dropped > reportedDrops and now - lastReport >= ACCESS_LOG_DROP_REPORT:
+                logging.warning("Access log: %d record dibuang karena antrean penuh", self.dropped - reportedDrops)
+                reportedDrops = self.dropped
+                lastReport = now
+
+        if self.output is not None:
+            self.output.flush()
+
+    def write(self, record: dict):
+        if self.logFormat == "json":
+            out = self.output if self.output is not None else sys.stderr
+            out.write(json.dumps(record, separators=(",", ":")) + "\n")
+            return
+
+        msg = formatAccessRecord(record)
+        if self.output is not None:
+            self.output.write(
+                f"{formatTimestamp(record['ts'])} [INFO] [{record['thread']}] {msg}\n"
+            )
+            return
+
+        # Format teks lewat handler logging biasa, threadName & waktu ikut record asli
+        logRecord = logging.LogRecord("root", logging.INFO, __file__, 0, msg, None, None)
+        logRecord.threadName = record["thread"]
+        logRecord.created = record["ts"]
+        logRecord.msecs = (record["ts"] % 1) * 1000
+        logging.getLogger().handle(logRecord)
+
+
+# Ubah record mentah jadi baris log teks (format sama seperti sebelumnya)
+def formatAccessRecord(record: dict) -> str:
+    kind = record["kind"]
+    if kind == "accept":
+        return "HTTP %s | koneksi diterima dari %s:%d pada %s" % (
+            record["mode"],
+            record["client_ip"], record["client_port"],
+            formatTimestamp(record["accepted_at"]),
+        )
+
+    if kind == "http":
+        return (
             "HTTP %s | client=%s:%d | path=%s | status=%d | file_size=%d | "
             "accepted_at=%s | start_proc=%s | finished_at=%s | "
-            "proc_duration=%.3f s | conn_total=%.3f s",
-            modeTag,
-            addr[0], addr[1],
-            requestPath,
-            status,
-            payload_size,
-            formatTimestamp(acceptedTime),
-            formatTimestamp(processStart),
-            formatTimestamp(endTime),
-            processingDuration,
-            connectionDuration,
+            "proc_duration=%.3f s | conn_total=%.3f s"
+        ) % (
+            record["mode"],
+            record["client_ip"], record["client_port"],
+            record["path"],
+            record["status"],
+            record["file_size"],
+            formatTimestamp(record["accepted_at"]),
+            formatTimestamp(record["start_proc"]),
+            formatTimestamp(record["finished_at"]),
+            record["proc_duration"],
+            record["conn_total"],
         )
 
+    return (
+        "UDP Echo | from=%s:%d | size=%d bytes | "
+        "recv_at=%s | send_at=%s | server_proc=%.6f s"
+    ) % (
+        record["client_ip"], record["client_port"],
+        record["size"],
+        formatTimestamp(record["recv_at"]),
+        formatTimestamp(record["send_at"]),
+        record["server_proc"],
+    )
+
+
+accessLog = AccessLogPipeline()
+
+
+def logHttpAccept(modeTag: str, addr, acceptedTime: float):
+    accessLog.submit({
+        "ts": acceptedTime,
+        "kind": "accept",
+        "mode": modeTag,
+        "client_ip": addr[0],
+        "client_port": addr[1],
+        "accepted_at": acceptedTime,
+    })
+
+
+# Logging lengkap untuk keperluan analisis performa dan threading
+def logHttpRequest(modeTag: str, addr, requestPath: str, status: int, payload_size: int,
+                   acceptedTime: float, processStart: float, endTime: float):
+    accessLog.submit({
+        "ts": endTime,
+        "kind": "http",
+        "mode": modeTag,
+        "client_ip": addr[0],
+        "client_port": addr[1],
+        "path": requestPath,
+        "status": status,
+        "file_size": payload_size,
+        "accepted_at": acceptedTime,
+        "start_proc": processStart,
+        "finished_at": endTime,
+        "proc_duration": endTime - processStart,
+        "conn_total": endTime - acceptedTime,
+    }, isError=status >= 400)
+
+
+# Tnganin satu koneksi HTTP (bisa beberapa request kalau keep-alive / pipelining)
+# canKeepAlive: callback opsional, return False kalau koneksi harus ditutup setelah request ini
+def HandleHttpClient(conn: socket.socket, addr, modeTag: str, acceptedTime: float, canKeepAlive=None):
+
+    pending = b""
+    handled = 0
+    try:
+        while True:
+            processStart = time.time()
+            rawRequest, pending = readHttpRequest(conn, pending, idle=handled > 0)
+            if not rawRequest:
+                # Client menutup koneksi / idle timeout
+                break
+            if handled > 0:
+                processStart = time.time()
+
+            requestPath = parsRequestPath(rawRequest)
+            requestHeaders = parsRequestHeaders(rawRequest)
+            contentLength = parseContentLength(requestHeaders)
+            if contentLength is None:
+                # Batas request berikutnya tidak bisa ditentukan: jawab 400 lalu tutup koneksi
+                sendFileEntry(conn, BAD_REQUEST_ENTRY)
+                logHttpRequest(
+                    modeTag, addr, requestPath, 400, BAD_REQUEST_ENTRY["size"],
+                    acceptedTime, processStart, time.time()
+                )
+                break
+            pending = discardRequestBody(conn, pending, contentLength)
+            handled += 1
+
+            keepAlive = (
+                wantsKeepAlive(rawRequest, requestHeaders)
+                and handled < KEEPALIVE_MAX_REQUESTS
+                and (canKeepAlive is None or canKeepAlive())
+            )
+
+            entry = negotiateEncoding(getStaticFile(requestPath), requestHeaders)
+            entry = prepFileResponse(entry, requestHeaders)
+            status, payload_size = entry["status"], entry["size"]
+
+            sendFileEntry(conn, entry, keepAlive)
+            sendFinish = time.time()
+
+            logHttpRequest(
+                modeTag, addr, requestPath, status, payload_size,
+                acceptedTime, processStart, sendFinish
+            )
+
+            if not keepAlive:
+                break
+
     except Exception as err:
         logging.error(f"Terjadi kesalahan saat memproses client {addr}: {err}")
     finally:
@@ -162,42 +895,278 @@ def HandleHttpClient(conn: socket.socket, addr, modeTag: str, acceptedTime: floa
             pass
 
 
-# mode single sama threaded
-def startHttpServer(host: str, port: int, mode: str):
+# MODE POOL:
+# Worker tetap + antrean terbatas. Kalau antrean penuh, koneksi langsung dijawab 503
+class HttpWorkerPool:
+    def __init__(self, workerCount: int, queueSize: int, modeTag: str):
+        self.modeTag = modeTag
+        self.queueSize = queueSize
+        self.pending = queue.Queue(maxsize=queueSize)
+
+        # Statistik buat sizing pool
+        self.statsLock = threading.Lock()
+        self.served = 0
+        self.rejected = 0
+        self.peakDepth = 0
+
+        for idx in range(workerCount):
+            threading.Thread(
+                target=self.workerLoop,
+                daemon=True,
+                name=f"HTTP-Worker-{idx}"
+            ).start()
+
+        threading.Thread(
+            target=self.statsReporter,
+            daemon=True,
+            name="HTTP-Pool-Stats"
+        ).start()
+
+    def workerLoop(self):
+        while True:
+            clientSocket, clientAddress, acceptedTime = self.pending.get()
+            try:
+                # Koneksi keep-alive dilepas kalau ada koneksi lain yang antre
+                HandleHttpClient(clientSocket, clientAddress, self.modeTag, acceptedTime, self.pending.empty)
+            finally:
+                with self.statsLock:
+                    self.served += 1
+                self.pending.task_done()
+
+    # Return False kalau koneksi ditolak (antrean penuh)
+    def submit(self, clientSocket: socket.socket, clientAddress, acceptedTime: float) -> bool:
+        try:
+            self.pending.put_nowait((clientSocket, clientAddress, acceptedTime))
+        except queue.Full:
+            with self.statsLock:
+                self.rejected += 1
+            rejectHttpClient(clientSocket)
+            logging.warning(
+                "HTTP %s | antrean penuh (%d), 503 dikirim ke %s:%d",
+                self.modeTag, self.queueSize, clientAddress[0], clientAddress[1]
+            )
+            return False
+
+        depth = self.pending.qsize()
+        with self.statsLock:
+            if depth > self.peakDepth:
+                self.peakDepth = depth
+        return True
+
+    def stats(self) -> dict:
+        with self.statsLock:
+            return {
+                "queue_depth": self.pending.qsize(),
+                "queue_size": self.queueSize,
+                "peak_depth": self.peakDepth,
+                "served": self.served,
+                "rejected": self.rejected,
+            }
+
+    def statsReporter(self):
+        while True:
+            time.sleep(POOL_STATS_INTERVAL)
+            st = self.stats()
+            logging.info(
+                "HTTP %s | queue_depth=%d/%d | peak_depth=%d | served=%d | rejected=%d",
+                self.modeTag,
+                st["queue_depth"], st["queue_size"],
+                st["peak_depth"],
+                st["served"],
+                st["rejected"],
+            )
+
+
+# Load shedding: jawab 503 secepatnya tanpa memproses request
+def rejectHttpClient(conn: socket.socket):
+    body = b"<h1>503 Service Unavailable</h1>"
+    response = prepHttpResponse(503, body, "text/html", {"Retry-After": POOL_RETRY_AFTER})
+    try:
+        conn.settimeout(0.5)
+        conn.sendall(response)
+        conn.shutdown(socket.SHUT_WR)
+
+        # Buang request yang sudah masuk supaya close() tidak mengirim RST
+        conn.setblocking(False)
+        try:
+            conn.recv(8192)
+        except (BlockingIOError, OSError):
+            pass
+    except OSError:
+        pass
+    finally:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+# Versi asyncio dari readHttpRequest (non-blocking, dipakai mode async)
+# Buffer pipelining ditangani StreamReader, jadi cukup return header request
+async def readHttpRequestAsync(reader: asyncio.StreamReader, idle: bool = False) -> str:
+    buffer = b""
+    try:
+        buffer = await asyncio.wait_for(
+            reader.readuntil(b"\r\n\r\n"),
+            KEEPALIVE_TIMEOUT if idle else clientSocket_TIMEOUT
+        )
+
+    except asyncio.IncompleteReadError as err:
+        # Koneksi ditutup sebelum header lengkap
+        buffer = err.partial
+
+    except asyncio.LimitOverrunError:
+        # Header melebihi batas 8 KB, proses apa adanya lalu tutup koneksi
+        try:
+            buffer = await asyncio.wait_for(reader.read(8192), clientSocket_TIMEOUT)
+        except asyncio.TimeoutError:
+            logging.warning("Waktu tunggu habis saat menerima request HTTP")
+
+    except asyncio.TimeoutError:
+        if not idle:
+            logging.warning("Waktu tunggu habis saat menerima request HTTP")
+
+    except Exception as err:
+        logging.error(f"Terjadi kesalahan saat menerima request: {err}")
+
+    return buffer.decode("iso-8859-1", errors="replace")
+
+
+# Versi asyncio dari discardRequestBody
+async def discardRequestBodyAsync(reader: asyncio.StreamReader, remaining: int):
+    while remaining > 0:
+        received = await asyncio.wait_for(reader.read(min(remaining, 65536)), clientSocket_TIMEOUT)
+        if not received:
+            break
+        remaining -= len(received)
+
+
+# Tanganin satu koneksi HTTP di event loop (semantik sama dengan HandleHttpClient)
+async def HandleHttpClientAsync(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, modeTag: str):
+    acceptedTime = time.time()
+    addr = writer.get_extra_info("peername")
+
+    logHttpAccept(modeTag, addr, acceptedTime)
+
+    loop = asyncio.get_running_loop()
+    handled = 0
+    try:
+        while True:
+            processStart = time.time()
+            rawRequest = await readHttpRequestAsync(reader, idle=handled > 0)
+            if not rawRequest:
+                break
+            if handled > 0:
+                processStart = time.time()
+
+            requestPath = parsRequestPath(rawRequest)
+            requestHeaders = parsRequestHeaders(rawRequest)
+            contentLength = parseContentLength(requestHeaders)
+            if contentLength is None:
+                # Batas request berikutnya tidak bisa ditentukan: jawab 400 lalu tutup koneksi
+                await sendFileEntryAsync(writer, BAD_REQUEST_ENTRY)
+                logHttpRequest(
+                    modeTag, addr, requestPath, 400, BAD_REQUEST_ENTRY["size"],
+                    acceptedTime, processStart, time.time()
+                )
+                break
+            await discardRequestBodyAsync(reader, contentLength)
+            handled += 1
+
+            keepAlive = wantsKeepAlive(rawRequest, requestHeaders) and handled < KEEPALIVE_MAX_REQUESTS
+
+            # Baca file dan kompres gzip di thread pool supaya event loop tidak ikut terblokir
+            entry = await loop.run_in_executor(
+                None, lambda: negotiateEncoding(getStaticFile(requestPath), requestHeaders)
+            )
+            entry = prepFileResponse(entry, requestHeaders)
+            status, payload_size = entry["status"], entry["size"]
+
+            await sendFileEntryAsync(writer, entry, keepAlive)
+            sendFinish = time.time()
+
+            logHttpRequest(
+                modeTag, addr, requestPath, status, payload_size,
+                acceptedTime, processStart, sendFinish
+            )
+
+            if not keepAlive:
+                break
+
+    except Exception as err:
+        logging.error(f"Terjadi kesalahan saat memproses client {addr}: {err}")
+    finally:
+        try:
+            writer.close()
+            await writer.wait_closed()
+        except Exception:
+            pass
+
+
+# MODE ASYNC:
+# Semua koneksi dilayani satu event loop non-blocking, tanpa thread per koneksi
+async def runAsyncHttpServer(serverSocket: socket.socket, modeTag: str):
+    server = await asyncio.start_server(
+        lambda r, w: HandleHttpClientAsync(r, w, modeTag),
+        sock=serverSocket,
+        backlog=1024,
+        limit=8192,
+    )
+    async with server:
+        await server.serve_forever()
+
+
+# mode single, threaded, pool sama async
+def startHttpServer(host: str, port: int, mode: str,
+                    poolWorkers: int = POOL_WORKERS_DEFAULT, poolQueue: int = POOL_QUEUE_DEFAULT,
+                    reusePort: bool = False):
     # Pastikan direktori root dokumen tersedia
     os.makedirs(DOCUMENT_ROOT, exist_ok=True)
 
     # Inisialisasi socket TCP server
     serverSocket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     serverSocket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reusePort:
+        # Kernel membagi koneksi ke semua proses yang bind port yang sama
+        serverSocket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
     serverSocket.bind((host, port))
     serverSocket.listen(50)
 
     modeTag = f"mode={mode}"
     logging.info("HTTP server berjalan di %s:%d (%s)", host, port, modeTag)
 
+    workerPool = None
+    if mode == "pool":
+        workerPool = HttpWorkerPool(poolWorkers, poolQueue, modeTag)
+        logging.info("HTTP %s | workers=%d | queue_size=%d", modeTag, poolWorkers, poolQueue)
+
     try:
+        if mode == "async":
+            serverSocket.setblocking(False)
+            asyncio.run(runAsyncHttpServer(serverSocket, modeTag))
+            return
+
         while True:
             clientSocket, clientAddress = serverSocket.accept()
             acceptedTime = time.time()
 
-            logging.info(
-                "HTTP %s | koneksi diterima dari %s:%d pada %s",
-                modeTag,
-                clientAddress[0],
-                clientAddress[1],
-                formatTimestamp(acceptedTime)
-            )
+            logHttpAccept(modeTag, clientAddress, acceptedTime)
 
             if mode == "single":
                 # MODE SINGLE:
-                # Koneksi diproses langsung dan bersifat blocking
+                # Koneksi diproses langsung dan bersifat blocking,
+                # keep-alive dimatikan supaya satu client tidak menahan yang lain
                 HandleHttpClient(
                     clientSocket,
                     clientAddress,
                     modeTag,
-                    acceptedTime
+                    acceptedTime,
+                    lambda: False
                 )
+            elif mode == "pool":
+                # MODE POOL:
+                # Koneksi masuk antrean, diambil worker yang tersedia
+                workerPool.submit(clientSocket, clientAddress, acceptedTime)
             else:
                 # MODE THREADED:
                 # Setiap koneksi diproses oleh thread baru
@@ -216,45 +1185,257 @@ def startHttpServer(host: str, port: int, mode: str):
 
 
 # Server QoS
-def udpEchoServer(host: str, port: int):
+# Beberapa thread penerima (tiap thread socket sendiri via SO_REUSEPORT kalau ada),
+# recvfrom_into ke buffer yang dialokasikan sekali, dan counter untuk membedakan
+# loss jaringan dari paket yang dibuang kernel karena server kewalahan
+class UdpEchoEngine:
+    def __init__(self, host: str, port: int, threads: int = 1, rcvbuf: int = 0, sndbuf: int = 0,
+                 reusePort: bool = False):
+        self.host = host
+        self.port = port
+        self.threads = max(1, threads)
+        self.rcvbuf = rcvbuf
+        self.sndbuf = sndbuf
 
-    serverSocket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    serverSocket.bind((host, port))
-    logging.info("UDP Echo server berjalan di %s:%d", host, port)
+        # Socket per thread butuh SO_REUSEPORT; kalau tidak ada, semua thread berbagi satu socket
+        self.reusePort = reusePort or (self.threads > 1 and hasattr(socket, "SO_REUSEPORT"))
+        self.sockets = []
+
+        # Counter per thread [received, echoed, send_errors], hanya ditulis thread pemiliknya
+        self.counters = []
+
+    def openSocket(self) -> socket.socket:
+        serverSocket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        if self.reusePort:
+            serverSocket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        if self.rcvbuf:
+            serverSocket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.rcvbuf)
+        if self.sndbuf:
+            serverSocket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.sndbuf)
+        serverSocket.bind((self.host, self.port))
+        self.sockets.append(serverSocket)
+        return serverSocket
+
+    def serveForever(self):
+        firstSocket = self.openSocket()
+        logging.info(
+            "UDP Echo server berjalan di %s:%d | threads=%d | rcvbuf=%d | sndbuf=%d",
+            self.host, self.port, self.threads,
+            firstSocket.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF),
+            firstSocket.getsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF),
+        )
+
+        for idx in range(1, self.threads):
+            sock = self.openSocket() if self.reusePort else firstSocket
+            threading.Thread(
+                target=self.receiverLoop,
+                args=(sock,),
+                daemon=True,
+                name=f"UDP-Echo-{idx}"
+            ).start()
+
+        threading.Thread(target=self.statsReporter, daemon=True, name="UDP-Echo-Stats").start()
+
+        try:
+            self.receiverLoop(firstSocket)
+        finally:
+            for sock in self.sockets:
+                sock.close()
+
+    def receiverLoop(self, sock: socket.socket):
+        counters = [0, 0, 0]
+        self.counters.append(counters)
+
+        buffer = bytearray(UDP_BUFFER_SIZE)
+        view = memoryview(buffer)
 
-    try:
         while True:
-            packet, client_addr = serverSocket.recvfrom(65535)
-            receivedAt = time.time()
+            size, client_addr = sock.recvfrom_into(buffer)
+            counters[0] += 1
+
+            logThis = accessLog.sample()
+            if logThis:
+                receivedAt = time.time()
 
             # Kirim kembali paket ke pengirim (echo)
-            serverSocket.sendto(packet, client_addr)
-            sentAt = time.time()
+            try:
+                sock.sendto(view[:size], client_addr)
+            except OSError:
+                counters[2] += 1
+                continue
+            counters[1] += 1
+
+            if logThis:
+                sentAt = time.time()
+                # Logging singkat untuk keperluan analisis (diformat di thread access log)
+                accessLog.enqueue({
+                    "ts": sentAt,
+                    "kind": "udp",
+                    "client_ip": client_addr[0],
+                    "client_port": client_addr[1],
+                    "size": size,
+                    "recv_at": receivedAt,
+                    "send_at": sentAt,
+                    # Waktu pemrosesan di sisi server
+                    "server_proc": sentAt - receivedAt,
+                })
 
-            # Waktu pemrosesan di sisi server
-            processingDuration = sentAt - receivedAt
+    # Paket yang dibuang kernel (buffer penerima penuh) untuk port ini, dari /proc/net/udp.
+    # None kalau tidak tersedia (non-Linux)
+    def kernelDrops(self):
+        portHex = f":{self.port:04X}"
+        drops = 0
+        try:
+            with open("/proc/net/udp") as f:
+                next(f)
+                for line in f:
+                    fields = line.split()
+                    if fields[1].endswith(portHex):
+                        drops += int(fields[-1])
+        except (OSError, ValueError, IndexError, StopIteration):
+            return None
+        return drops
+
+    def stats(self) -> dict:
+        return {
+            "received": sum(c[0] for c in self.counters),
+            "echoed": sum(c[1] for c in self.counters),
+            "send_errors": sum(c[2] for c in self.counters),
+            "kernel_drops": self.kernelDrops(),
+        }
 
-            # Logging singkat untuk keperluan analisis
+    def statsReporter(self):
+        last = self.stats()
+        while True:
+            time.sleep(UDP_STATS_INTERVAL)
+            st = self.stats()
+            if st == last:
+                continue
             logging.info(
-                "UDP Echo | from=%s:%d | size=%d bytes | "
-                "recv_at=%s | send_at=%s | server_proc=%.6f s",
-                client_addr[0], client_addr[1],
-                len(packet),
-                formatTimestamp(receivedAt),
-                formatTimestamp(sentAt),
-                processingDuration
+                "UDP Echo stats | received=%d | echoed=%d | send_errors=%d | kernel_drops=%s | rate=%.0f pps",
+                st["received"], st["echoed"], st["send_errors"],
+                "n/a" if st["kernel_drops"] is None else st["kernel_drops"],
+                (st["received"] - last["received"]) / UDP_STATS_INTERVAL,
             )
+            last = st
 
+
+def udpEchoServer(host: str, port: int, reusePort: bool = False,
+                  threads: int = 1, rcvbuf: int = 0, sndbuf: int = 0):
+    engine = UdpEchoEngine(host, port, threads, rcvbuf, sndbuf, reusePort)
+    try:
+        engine.serveForever()
     except KeyboardInterrupt:
         logging.info("UDP Echo server dihentikan (KeyboardInterrupt)")
+
+
+
+# Jalankan UDP Echo (thread) + HTTP server di proses ini
+def runServerProcess(args, reusePort: bool = False):
+    # Thread access log dibuat di sini supaya tiap worker prefork punya sendiri
+    global accessLog
+    outputPath = args.access_log
+    if outputPath and reusePort:
+        base, ext = os.path.splitext(outputPath)
+        outputPath = f"{base}.{os.getpid()}{ext}"
+    accessLog = AccessLogPipeline(args.log_format, args.log_sample, args.log_errors_only, outputPath)
+    accessLog.start()
+
+    # Jalankan UDP server di thread terpisah
+    udpThread = threading.Thread(
+        target=udpEchoServer,
+        args=(args.host, args.udp_port, reusePort, args.udp_threads, args.udp_rcvbuf, args.udp_sndbuf),
+        daemon=True,
+        name="UDP-Echo-Thread"
+    )
+    udpThread.start()
+
+    try:
+        startHttpServer(
+            args.host, args.http_port, args.mode,
+            args.pool_workers, args.pool_queue, reusePort
+        )
     finally:
-        serverSocket.close()
+        # Sinyal berikutnya (misal SIGTERM dari supervisor) jangan memotong flush access log
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        accessLog.stop()
+
+
+# Fork satu worker, return pid-nya (di proses anak fungsi ini tidak pernah return)
+def spawnWorker(args, idx: int) -> int:
+    pid = os.fork()
+    if pid != 0:
+        return pid
+
+    exitCode = 0
+    try:
+        # SIGTERM dari supervisor = berhenti bersih seperti Ctrl+C
+        signal.signal(signal.SIGTERM, stopOnSignal)
+        threading.current_thread().name = f"Worker-{idx}"
+        runServerProcess(args, reusePort=True)
+    except Exception as err:
+        logging.error(f"Worker-{idx} berhenti karena error: {err}")
+        exitCode = 1
+    finally:
+        os._exit(exitCode)
+
+
+def stopOnSignal(signum, frame):
+    raise KeyboardInterrupt
 
 
+# MODE PREFORK:
+# Supervisor fork N worker, restart worker yang crash, dan hentikan semua saat Ctrl+C
+def runPreforkServer(args):
+    if not hasattr(os, "fork") or not hasattr(socket, "SO_REUSEPORT"):
+        logging.warning("--workers butuh fork() dan SO_REUSEPORT, server jalan sebagai satu proses")
+        runServerProcess(args)
+        return
+
+    workers = {}   # pid -> (index worker, waktu start)
+    for idx in range(args.workers):
+        workers[spawnWorker(args, idx)] = (idx, time.monotonic())
+
+    signal.signal(signal.SIGTERM, stopOnSignal)
+    logging.info("Supervisor: %d worker berjalan (pid=%s)", len(workers), ", ".join(map(str, workers)))
+
+    try:
+        while workers:
+            pid, status = os.wait()
+            if pid not in workers:
+                continue
+            idx, startedAt = workers.pop(pid)
+
+            if os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0:
+                logging.info("Supervisor: Worker-%d (pid=%d) berhenti normal", idx, pid)
+                continue
+
+            logging.warning("Supervisor: Worker-%d (pid=%d) crash (status=%d), dijalankan ulang", idx, pid, status)
+            if time.monotonic() - startedAt < WORKER_RESTART_BACKOFF:
+                time.sleep(WORKER_RESTART_BACKOFF)
+            workers[spawnWorker(args, idx)] = (idx, time.monotonic())
+
+    except KeyboardInterrupt:
+        logging.info("Supervisor: menghentikan %d worker", len(workers))
+    finally:
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in workers:
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+
 
 # main
 
 def main():
+    global fileCache, gzipCache, KEEPALIVE_TIMEOUT, KEEPALIVE_MAX_REQUESTS
     prepLogging()
 
     parser = argparse.ArgumentParser(
@@ -265,23 +1446,58 @@ def main():
     parser.add_argument("--udp-port", type=int, default=UDP_PORT_DEFAULT, help="Port UDP Echo (default: 9000)")
     parser.add_argument(
         "--mode",
-        choices=["single", "threaded"],
+        choices=["single", "threaded", "pool", "async"],
         default="threaded",
-        help="Mode HTTP server: single atau threaded (default: threaded)",
+        help="Mode HTTP server: single, threaded, pool atau async (default: threaded)",
     )
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Jumlah proses worker (prefork + SO_REUSEPORT), 1 = satu proses (default: 1)")
+    parser.add_argument("--pool-workers", type=int, default=POOL_WORKERS_DEFAULT,
+                        help="Jumlah worker untuk mode pool (default: 16)")
+    parser.add_argument("--pool-queue", type=int, default=POOL_QUEUE_DEFAULT,
+                        help="Panjang antrean koneksi mode pool sebelum 503 (default: 128)")
+    parser.add_argument("--cache-size", type=int, default=FILE_CACHE_MAX_BYTES // (1024 * 1024),
+                        help="Budget cache file statis dalam MB, 0 = nonaktif (default: 64)")
+    parser.add_argument("--cache-revalidate", type=float, default=FILE_CACHE_REVALIDATE,
+                        help="Interval cek ulang mtime/size file yang di-cache, detik (default: 1.0)")
+    parser.add_argument("--sendfile-threshold", type=int, default=SENDFILE_THRESHOLD // 1024,
+                        help="Ukuran file (KB) mulai dikirim zero-copy via sendfile (default: 1024)")
+    parser.add_argument("--gzip-cache-size", type=int, default=GZIP_CACHE_MAX_BYTES // (1024 * 1024),
+                        help="Budget cache varian gzip dalam MB, 0 = gzip nonaktif (default: 16)")
+    parser.add_argument("--udp-threads", type=int, default=1,
+                        help="Jumlah thread penerima UDP Echo (default: 1)")
+    parser.add_argument("--udp-rcvbuf", type=int, default=0,
+                        help="SO_RCVBUF socket UDP dalam byte, 0 = default OS")
+    parser.add_argument("--udp-sndbuf", type=int, default=0,
+                        help="SO_SNDBUF socket UDP dalam byte, 0 = default OS")
+    parser.add_argument("--log-format", choices=["text", "json"], default="text",
+                        help="Format access log: text atau json (JSON lines) (default: text)")
+    parser.add_argument("--log-sample", type=int, default=1,
+                        help="Tulis 1 dari N record access log, error selalu ditulis (default: 1)")
+    parser.add_argument("--log-errors-only", action="store_true",
+                        help="Hanya tulis access log untuk response error (status >= 400)")
+    parser.add_argument("--access-log", default=None,
+                        help="File tujuan access log (default: stderr)")
+    parser.add_argument("--keepalive-timeout", type=float, default=KEEPALIVE_TIMEOUT,
+                        help="Batas idle koneksi keep-alive, detik (default: 5.0)")
+    parser.add_argument("--keepalive-max", type=int, default=KEEPALIVE_MAX_REQUESTS,
+                        help="Maksimum request per koneksi keep-alive (default: 100)")
 
     args = parser.parse_args()
 
-    # Jalankan UDP server di thread terpisah
-    udpThread = threading.Thread(
-        target=udpEchoServer,
-        args=(args.host, args.udp_port),
-        daemon=True,
-        name="UDP-Echo-Thread"
+    KEEPALIVE_TIMEOUT = args.keepalive_timeout
+    KEEPALIVE_MAX_REQUESTS = args.keepalive_max
+    fileCache = StaticFileCache(
+        args.cache_size * 1024 * 1024,
+        args.cache_revalidate,
+        args.sendfile_threshold * 1024
     )
-    udpThread.start()
-    
-    startHttpServer(args.host, args.http_port, args.mode)
+    gzipCache = CompressedVariantCache(args.gzip_cache_size * 1024 * 1024)
+
+    if args.workers > 1:
+        runPreforkServer(args)
+    else:
+        runServerProcess(args)
 
 
 if __name__ == "__main__":